@@ -0,0 +1,155 @@
+# backend/answer_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.vector.embedding_provider import normalize_query
+
+# Opt-in: set ANSWER_CACHE_ENABLED=true to serve repeated first-turn questions from cache.
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(6 * 3600)))
+ANSWER_CACHE_MAX_PER_FIGURE = int(os.getenv("ANSWER_CACHE_MAX_PER_FIGURE", "200"))
+
+# Written offline by backend/tools/pregenerate_answers.py and loaded at startup.
+WARM_ANSWERS_PATH = os.getenv("WARM_ANSWERS_PATH", "/data/warm_answers.json")
+WARM_ANSWERS_TTL_SECONDS = float(os.getenv("WARM_ANSWERS_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def figure_fingerprint(persona_prompt: Optional[str], context_version: str, collection: str = "") -> str:
+    """
+    Identifies everything a cached answer depends on besides the question. When the
+    persona prompt is edited, the context is re-ingested or the server switches to
+    another collection generation, old answers stop matching.
+    """
+    return hashlib.sha256(f"{persona_prompt or ''}\x00{context_version}\x00{collection}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    normalized: str
+    embedding: Optional[np.ndarray]
+    answer: str
+    fingerprint: str
+    expires_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Per-figure cache of first-turn answers.
+
+    A question hits when its normalized text matches a cached one exactly, or when its
+    embedding's cosine similarity to a cached question is at least `threshold`. Each
+    figure holds at most `max_per_figure` answers; the oldest are dropped first.
+    """
+
+    def __init__(self, enabled: bool = ANSWER_CACHE_ENABLED, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS, max_per_figure: int = ANSWER_CACHE_MAX_PER_FIGURE):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_per_figure = max_per_figure
+        self.hits = 0
+        self.misses = 0
+        self._figures: Dict[str, List[CachedAnswer]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _live_entries(self, figure_slug: str, fingerprint: str) -> List[CachedAnswer]:
+        now = time.monotonic()
+        entries = [e for e in self._figures.get(figure_slug, []) if e.expires_at > now and e.fingerprint == fingerprint]
+        self._figures[figure_slug] = entries
+        return entries
+
+    def lookup(self, figure_slug: str, question: str, fingerprint: str, query_embedding=None) -> Optional[str]:
+        with self._lock:
+            entries = self._live_entries(figure_slug, fingerprint)
+            normalized = normalize_query(question)
+            answer = next((e.answer for e in entries if e.normalized == normalized), None)
+
+            query = self._unit(query_embedding)
+            if answer is None and query is not None:
+                candidates = [e for e in entries if e.embedding is not None and e.embedding.shape == query.shape]
+                if candidates:
+                    similarities = np.vstack([e.embedding for e in candidates]) @ query
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        answer = candidates[best].answer
+
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def store(self, figure_slug: str, question: str, answer: str, fingerprint: str,
+              query_embedding=None, ttl_seconds: Optional[float] = None):
+        if not answer:
+            return
+        entry = CachedAnswer(
+            question=question,
+            normalized=normalize_query(question),
+            embedding=self._unit(query_embedding),
+            answer=answer,
+            fingerprint=fingerprint,
+            expires_at=time.monotonic() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds),
+        )
+        with self._lock:
+            entries = [e for e in self._live_entries(figure_slug, fingerprint) if e.normalized != entry.normalized]
+            entries.append(entry)
+            self._figures[figure_slug] = entries[-self.max_per_figure:]
+
+    def load_warm_answers(self, path: str = WARM_ANSWERS_PATH, ttl_seconds: float = WARM_ANSWERS_TTL_SECONDS) -> int:
+        """
+        Seeds the cache from a pre-generated warm answer set. Entries keep the fingerprint
+        they were generated under, so a set built before a persona edit or re-ingest never
+        matches. Returns the number of answers loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            warm_set = json.load(f)
+        answers = warm_set.get("answers", [])
+        for item in answers:
+            self.store(item["figure_slug"], item["question"], item["answer"], item["fingerprint"],
+                       item.get("embedding"), ttl_seconds=ttl_seconds)
+        print(f"[ANSWER-CACHE] Loaded {len(answers)} warm answers from {path}")
+        return len(answers)
+
+    def invalidate(self, figure_slug: Optional[str] = None):
+        with self._lock:
+            if figure_slug is None:
+                self._figures.clear()
+            else:
+                self._figures.pop(figure_slug, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "figures": len(self._figures),
+                "size": sum(len(entries) for entries in self._figures.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+answer_cache = SemanticAnswerCache()
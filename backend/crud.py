@@ -89,13 +89,39 @@ def get_messages_by_user(db: Session, user_id: int, limit: int = 50):
 
 
 def get_messages_by_thread(db: Session, thread_id: int, limit: int = 50):
+    """
+    Get a thread's conversation messages, oldest first. Rolling summary rows are left out.
+    """
     return db.query(models.Chat)\
-             .filter(models.Chat.thread_id == thread_id)\
-             .order_by(models.Chat.timestamp.asc())\
+             .filter(models.Chat.thread_id == thread_id, models.Chat.role != "summary")\
+             .order_by(models.Chat.timestamp.asc(), models.Chat.id.asc())\
              .limit(limit)\
              .all()
 
 
+def get_latest_summary(db: Session, thread_id: int):
+    """
+    Get the newest rolling summary of a thread, or None. Its summary_of points at the
+    last message it covers.
+    """
+    return db.query(models.Chat)\
+             .filter(models.Chat.thread_id == thread_id, models.Chat.role == "summary")\
+             .order_by(models.Chat.id.desc())\
+             .first()
+
+
+def get_messages_after(db: Session, thread_id: int, after_id: int = None):
+    """
+    Get a thread's conversation messages newer than message `after_id` (all of them if
+    None), oldest first. Summary rows are left out.
+    """
+    query = db.query(models.Chat)\
+              .filter(models.Chat.thread_id == thread_id, models.Chat.role != "summary")
+    if after_id is not None:
+        query = query.filter(models.Chat.id > after_id)
+    return query.order_by(models.Chat.id.asc()).all()
+
+
 def get_messages_by_user(db: Session, user_id: int, limit: int = 50):
     """
     Retrieve chat messages for a specific user, ordered by timestamp ascending.
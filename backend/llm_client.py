@@ -0,0 +1,59 @@
+# backend/llm_client.py
+
+import os
+
+import httpx
+from fastapi import Request
+from openai import AsyncOpenAI
+
+# Connection pool shared by every request in the process. Keep-alive connections are
+# reused, so the TLS handshake with the API is paid once rather than per burst.
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "120"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Per-call timeouts (seconds) for the chat completion endpoints.
+CHAT_TIMEOUT = float(os.getenv("OPENAI_CHAT_TIMEOUT", "60"))
+
+
+def http2_available() -> bool:
+    """httpx only speaks HTTP/2 when the optional h2 package is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=http2_available(),
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(CHAT_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    )
+
+
+def create_openai_client(http_client: httpx.AsyncClient = None) -> AsyncOpenAI:
+    """Builds the process-wide AsyncOpenAI client on top of a tuned httpx pool."""
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=http_client or create_http_client(),
+        max_retries=OPENAI_MAX_RETRIES,
+    )
+
+
+def get_openai_client(request: Request) -> AsyncOpenAI:
+    """
+    FastAPI dependency returning the client the app lifespan created. Created here on
+    first use if the app was started without its lifespan (e.g. a bare TestClient).
+    """
+    client = getattr(request.app.state, "openai_client", None)
+    if client is None:
+        client = request.app.state.openai_client = create_openai_client()
+    return client
@@ -12,6 +12,7 @@ from fastapi.responses import FileResponse, RedirectResponse, HTMLResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import timedelta
+from contextlib import asynccontextmanager
 
 # Local Imports
 from backend import crud, schemas, models
@@ -26,9 +27,58 @@ from utils.security import (
     get_current_user,
 )
 from backend.routers import figures, chat
+from backend.answer_cache import answer_cache
+from backend.llm_client import create_openai_client, http2_available
+from backend.vector import chroma_client
+from backend.vector.embedding_provider import provider as embedding_provider, query_cache, get_embedding_dimension
+from backend.vector.embedding_batcher import batcher as embedding_batcher
+from backend.vector.context_retriever import RETRIEVAL_ENGINE, RETRIEVAL_MODE
+from backend.vector.lexical_index import get_lexical_index
+from backend.vector.numpy_index import get_numpy_index
+from backend.vector.retrieval_cache import retrieval_cache
+
+# Set EMBEDDING_WARMUP=lazy to skip the startup warm-up and load the model on first use instead.
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "background").lower()
+
+
+# --- App Lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One AsyncOpenAI client (and connection pool) for every router in this process.
+    app.state.openai_client = create_openai_client()
+    print(f"[OPENAI] Shared client ready (HTTP/2: {'on' if http2_available() else 'off'})")
+
+    # The embedding model loads in a background thread so login, pages and
+    # health checks are served straight away. Lexical-only retrieval never needs it.
+    if RETRIEVAL_MODE in ("lexical", "hybrid"):
+        try:
+            get_lexical_index()
+        except Exception as e:
+            print(f"⚠️ Could not build the lexical index: {e}")
+
+    if RETRIEVAL_MODE != "lexical":
+        if EMBEDDING_WARMUP == "background":
+            embedding_provider.start_background_warmup()
+        if RETRIEVAL_ENGINE == "numpy":
+            try:
+                get_numpy_index()
+            except FileNotFoundError as e:
+                print(f"⚠️ NumPy retrieval index not found ({e}). Run backend/tools/build_numpy_index.py.")
+        else:
+            # Opens the collection handle once and pulls the HNSW index into memory.
+            chroma_client.start_background_warmup(get_embedding_dimension())
+
+    if answer_cache.enabled:
+        try:
+            answer_cache.load_warm_answers()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Could not load the warm answer set: {e}")
+    yield
+    await app.state.openai_client.close()
+
 
 # --- App Initialization ---
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS Middleware ---
 app.add_middleware(
@@ -83,6 +133,25 @@ def list_user_threads(
     return crud.get_threads_by_user(db, user_id)
 
 
+# === HEALTH ===
+
+@app.get("/health")
+def health():
+    """
+    Liveness check. Reports the embedding model state ('cold', 'warming', 'ready' or 'failed')
+    without triggering a model load.
+    """
+    return {
+        "status": "ok",
+        "embeddings": embedding_provider.state(),
+        "vector_store": {"engine": RETRIEVAL_ENGINE, "mode": RETRIEVAL_MODE, **chroma_client.warmup_state},
+        "query_embedding_cache": query_cache.stats(),
+        "embedding_batcher": embedding_batcher.stats(),
+        "retrieval_cache": retrieval_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+    }
+
+
 # === PAGE SERVING AND OTHER ROUTES ===
 
 @app.get("/", response_class=FileResponse)
@@ -0,0 +1,22 @@
+# backend/prompting.py
+
+from typing import List, Optional
+
+DEFAULT_FIGURE_PROMPT = "You are a helpful historical guide."
+
+
+def build_figure_messages(persona_prompt: Optional[str], context_text: str, history: List[dict]) -> List[dict]:
+    """
+    Builds the chat messages sent to the model for a figure conversation: the persona
+    prompt, the retrieved context (if any), then the thread's messages in order.
+
+    Args:
+        persona_prompt: The figure's persona_prompt; falls back to a generic guide.
+        context_text: Retrieved historical context joined into one string.
+        history: Thread messages as {"role", "content"} dicts, oldest first.
+    """
+    messages = [{"role": "system", "content": persona_prompt or DEFAULT_FIGURE_PROMPT}]
+    if context_text:
+        messages.append({"role": "system", "content": f"Relevant historical context:\n{context_text}"})
+    messages.extend(history)
+    return messages
@@ -3,23 +3,23 @@ from sqlalchemy.orm import Session
 from backend.database import get_db_chat, get_chroma_retriever
 from backend.models import Chat
 from ..schemas import AskRequest, AskResponse
-from openai import OpenAI
-import os
+from openai import AsyncOpenAI
 from datetime import datetime
 from backend.models import HistoricalFigure
 from backend.database import get_db_figure
+from backend.llm_client import CHAT_TIMEOUT, get_openai_client
+from backend.token_budget import count_message_tokens, log_token_usage, prompt_budget, trim_messages
 
 router = APIRouter()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 
 @router.post("/ask/", response_model=AskResponse)
-def ask_question(
+async def ask_question(
     request: AskRequest,
     db_chat: Session = Depends(get_db_chat),
     db_figure: Session = Depends(get_db_figure),
-    retriever=Depends(get_chroma_retriever)
+    retriever=Depends(get_chroma_retriever),
+    client: AsyncOpenAI = Depends(get_openai_client)
 ):
     """
     Handles a user question for a specific historical figure.
@@ -52,13 +52,16 @@ def ask_question(
     for chunk in context_chunks:
         messages.append({"role": "system", "content": chunk})
     messages.append({"role": "user", "content": request.message})
+    messages = trim_messages(messages, prompt_budget("gpt-4o"), "gpt-4o")
 
     # Ask GPT
-    completion = client.chat.completions.create(
+    completion = await client.chat.completions.create(
         model="gpt-4o",
-        messages=messages
+        messages=messages,
+        timeout=CHAT_TIMEOUT
     )
     answer = completion.choices[0].message.content.strip()
+    log_token_usage("ask", "gpt-4o", count_message_tokens(messages, "gpt-4o"), answer, completion.usage)
 
     # Save to chat DB
     chat_entry = Chat(
@@ -1,29 +1,33 @@
 # backend/routers/chat.py
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Form
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from typing import Optional
-from openai import OpenAI
-import os
+from openai import AsyncOpenAI
 
 from backend import models, schemas, crud
 from backend.database import get_db_chat
+from backend.llm_client import CHAT_TIMEOUT, get_openai_client
+from backend.summarizer import conversation_history, summarize_in_background
+from backend.token_budget import count_message_tokens, log_token_usage, prompt_budget, trim_messages
 
 router = APIRouter(
     tags=["Chat"]
 )
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+CHAT_MODEL = "gpt-4o-mini"
 
 
 @router.post("/chat/complete", response_class=RedirectResponse)
-def chat_complete(
+async def chat_complete(
         request: Request,
+        background_tasks: BackgroundTasks,
         db: Session = Depends(get_db_chat),
         user_id: int = Form(...),
         message: str = Form(...),
         thread_id: Optional[int] = Form(None),
+        client: AsyncOpenAI = Depends(get_openai_client),
 ):
     """
     Handles chat form submission from an existing thread page.
@@ -35,20 +39,24 @@ def chat_complete(
     user_msg_schema = schemas.ChatMessageCreate(user_id=user_id, role="user", message=message, thread_id=thread_id)
     crud.create_chat_message(db, user_msg_schema)
 
-    messages = crud.get_messages_by_thread(db, thread_id)
     formatted_messages = [{"role": "system", "content": "You are a helpful and accurate historical guide."}]
-    formatted_messages.extend([{"role": m.role, "content": m.message} for m in messages])
+    formatted_messages.extend(conversation_history(db, thread_id))
+    formatted_messages = trim_messages(formatted_messages, prompt_budget(CHAT_MODEL), CHAT_MODEL)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    response = await client.chat.completions.create(
+        model=CHAT_MODEL,
         messages=formatted_messages,
-        temperature=0.7
+        temperature=0.7,
+        timeout=CHAT_TIMEOUT
     )
     answer = response.choices[0].message.content
+    log_token_usage("chat/complete", CHAT_MODEL, count_message_tokens(formatted_messages, CHAT_MODEL),
+                    answer, response.usage)
 
     assistant_msg_schema = schemas.ChatMessageCreate(user_id=user_id, role="assistant", message=answer,
                                                      thread_id=thread_id)
     crud.create_chat_message(db, assistant_msg_schema)
+    background_tasks.add_task(summarize_in_background, thread_id, client)
 
     return RedirectResponse(url=f"/thread/{thread_id}", status_code=303)
 
@@ -1,16 +1,30 @@
+import json
 import os
-from openai import OpenAI
-from fastapi import APIRouter, Depends, HTTPException, Request, Query, Form
-from fastapi.responses import HTMLResponse
+import time
+from dataclasses import dataclass, field
+
+import httpx
+from openai import AsyncOpenAI, OpenAIError
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Query, Form
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import AsyncIterator, Literal, Optional, List
 
 from backend import models, schemas, crud
-from backend.database import get_db_chat
+from backend.database import SessionLocal, get_db_chat
 from backend.figures_database import FigureSessionLocal
-from backend.vector.context_retriever import search_figure_context
-from pydantic import BaseModel
+from backend.answer_cache import answer_cache, figure_fingerprint
+from backend.llm_client import CHAT_TIMEOUT, get_openai_client
+from backend.prompting import build_figure_messages
+from backend.summarizer import conversation_history, summarize_in_background
+from backend.token_budget import count_message_tokens, count_tokens, log_token_usage, prompt_budget, trim_messages
+from backend.vector.chroma_client import served_collection_name
+from backend.vector.context_packer import CONTEXT_CANDIDATES, format_context, pack_context
+from backend.vector.context_retriever import RETRIEVAL_MODE, search_figure_context_async, search_figure_context_batch
+from backend.vector.embedding_batcher import batcher as embedding_batcher
+from backend.vector.retrieval_cache import retrieval_cache
+from pydantic import BaseModel, Field
 
 # --- Initialization ---
 router = APIRouter(
@@ -19,7 +33,8 @@ router = APIRouter(
 )
 
 templates = Jinja2Templates(directory="frontend/templates")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+FIGURE_CHAT_MODEL = os.getenv("FIGURE_CHAT_MODEL", "gpt-4o")
 
 
 def get_figure_db():
@@ -30,12 +45,30 @@ def get_figure_db():
         db.close()
 
 
-class SearchQuery(BaseModel):
+# Upper bound on results per query; a batch group asks Chroma for its largest top_k.
+MAX_SEARCH_TOP_K = 50
+# Same values as context_retriever.RETRIEVAL_MODES; anything else is a 422.
+SearchMode = Literal["dense", "lexical", "hybrid"]
+
+
+class BatchSearchItem(BaseModel):
+    # Unknown fields are rejected so a per-query 'mode' in a batch fails loudly instead of being ignored.
+    model_config = {"extra": "forbid"}
+
     query: str
-    top_k: int = 5
+    top_k: int = Field(5, ge=1, le=MAX_SEARCH_TOP_K)
     figure_slug: str
 
 
+class SearchQuery(BatchSearchItem):
+    mode: Optional[SearchMode] = None  # defaults to RETRIEVAL_MODE
+
+
+class BatchSearchQuery(BaseModel):
+    queries: List[BatchSearchItem] = Field(..., max_length=256)
+    mode: Optional[SearchMode] = None  # applies to every query in the batch
+
+
 @router.get("/ask", response_class=HTMLResponse)
 def get_ask_figure_page(
         request: Request,
@@ -76,15 +109,26 @@ def get_ask_figure_page(
 
 
 
-@router.post("/ask", response_class=HTMLResponse)
-async def ask_figure_submit(
-        request: Request,
-        figure_slug: str = Form(...),
-        user_id: int = Form(...),
-        message: str = Form(...),
-        thread_id: Optional[int] = Form(None),
-        db: Session = Depends(get_db_chat)
-):
+@dataclass
+class FigureTurn:
+    """A visitor's question, stored, with either a cached answer or the prompt to answer it."""
+    figure: models.HistoricalFigure
+    thread: models.Thread
+    reply: Optional[str] = None
+    messages: List[dict] = field(default_factory=list)
+    context_text: str = ""
+    use_answer_cache: bool = False
+    fingerprint: str = ""
+    query_embedding: Optional[List[float]] = None
+    prompt_tokens: int = 0
+
+
+async def start_figure_turn(db: Session, figure_slug: str, user_id: int, message: str,
+                            thread_id: Optional[int]) -> FigureTurn:
+    """
+    Stores the user's message (creating the thread if needed), then either finds a cached
+    answer or retrieves context and builds the messages for the model.
+    """
     fig_db = FigureSessionLocal()
     figure = fig_db.query(models.HistoricalFigure).filter(models.HistoricalFigure.slug == figure_slug).first()
     fig_db.close()
@@ -105,42 +149,166 @@ async def ask_figure_submit(
         thread = crud.create_thread(db, thread=thread_data)
         thread_id = thread.id
 
+    # Only questions with no earlier history in the thread are answered from / stored in the answer cache.
+    is_first_turn = not crud.get_messages_by_thread(db, thread_id, limit=1)
+
     crud.create_chat_message(db, schemas.ChatMessageCreate(
         user_id=user_id, role="user", message=message, thread_id=thread_id
     ))
 
-    system_prompt = figure.persona_prompt or "You are a helpful historical guide."
-    context_chunks = search_figure_context(query=message, figure_slug=figure_slug)
-    context_text = "\n\n".join([chunk["content"] for chunk in context_chunks]) if context_chunks else ""
-
-    all_messages = crud.get_messages_by_thread(db, thread_id)
-    formatted_messages = [{"role": "system", "content": system_prompt}]
-    if context_text:
-        formatted_messages.append({"role": "system", "content": f"Relevant historical context:\n{context_text}"})
-
-    formatted_messages.extend([{"role": m.role, "content": m.message} for m in all_messages])
-
-    response = client.chat.completions.create(
-        model="gpt-4o", messages=formatted_messages, temperature=0.7
+    turn = FigureTurn(figure=figure, thread=thread, use_answer_cache=answer_cache.enabled and is_first_turn)
+    if turn.use_answer_cache:
+        turn.fingerprint = figure_fingerprint(figure.persona_prompt, retrieval_cache.version.current(),
+                                              served_collection_name())
+        turn.query_embedding = await embedding_batcher.embed(message) if RETRIEVAL_MODE != "lexical" else None
+        turn.reply = answer_cache.lookup(figure_slug, message, turn.fingerprint, turn.query_embedding)
+    if turn.reply is not None:
+        return turn
+
+    candidates = await search_figure_context_async(
+        query=message, figure_slug=figure_slug, top_k=CONTEXT_CANDIDATES, include_embeddings=True
     )
-    reply = response.choices[0].message.content
-
-    crud.create_chat_message(db, schemas.ChatMessageCreate(
-        user_id=user_id, role="assistant", message=reply, thread_id=thread_id
+    context_chunks = pack_context(candidates)
+    turn.context_text = format_context(context_chunks)
+    print(f"[CONTEXT-PACKER] Packed {len(context_chunks)}/{len(candidates)} chunks, "
+          f"~{count_tokens(turn.context_text, FIGURE_CHAT_MODEL)} tokens")
+
+    turn.messages = trim_messages(
+        build_figure_messages(figure.persona_prompt, turn.context_text, conversation_history(db, thread_id)),
+        prompt_budget(FIGURE_CHAT_MODEL), FIGURE_CHAT_MODEL
+    )
+    turn.prompt_tokens = count_message_tokens(turn.messages, FIGURE_CHAT_MODEL)
+    return turn
+
+
+def finish_figure_turn(db: Session, turn: FigureTurn, user_id: int, message: str, reply: str,
+                       served_from_cache: bool = False, complete: bool = True) -> models.Chat:
+    """Stores the assistant's reply; complete answers to first-turn questions also go to the answer cache."""
+    if turn.use_answer_cache and complete and not served_from_cache:
+        answer_cache.store(turn.figure.slug, message, reply, turn.fingerprint, turn.query_embedding)
+    return crud.create_chat_message(db, schemas.ChatMessageCreate(
+        user_id=user_id, role="assistant", message=reply, thread_id=turn.thread.id,
+        model_used="answer-cache" if served_from_cache else FIGURE_CHAT_MODEL
     ))
 
-    updated_messages = crud.get_messages_by_thread(db, thread_id)
+
+@router.post("/ask", response_class=HTMLResponse)
+async def ask_figure_submit(
+        request: Request,
+        background_tasks: BackgroundTasks,
+        figure_slug: str = Form(...),
+        user_id: int = Form(...),
+        message: str = Form(...),
+        thread_id: Optional[int] = Form(None),
+        db: Session = Depends(get_db_chat),
+        client: AsyncOpenAI = Depends(get_openai_client)
+):
+    turn = await start_figure_turn(db, figure_slug, user_id, message, thread_id)
+    background_tasks.add_task(summarize_in_background, turn.thread.id, client)
+
+    served_from_cache = turn.reply is not None
+    reply = turn.reply
+    if reply is None:
+        response = await client.chat.completions.create(
+            model=FIGURE_CHAT_MODEL, messages=turn.messages, temperature=0.7, timeout=CHAT_TIMEOUT
+        )
+        reply = response.choices[0].message.content
+        log_token_usage("figures/ask", FIGURE_CHAT_MODEL, turn.prompt_tokens, reply, response.usage)
+    finish_figure_turn(db, turn, user_id, message, reply, served_from_cache=served_from_cache)
+
+    updated_messages = crud.get_messages_by_thread(db, turn.thread.id)
 
     return templates.TemplateResponse("ask_figure.html", {
         "request": request,
-        "figure": figure,
-        "thread": thread,
+        "figure": turn.figure,
+        "thread": turn.thread,
         "messages": updated_messages,
         "user_id_value": user_id,
-        "context_text": context_text
+        "context_text": turn.context_text
     })
 
 
+# --- Streaming ---
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_figure_reply(turn: FigureTurn, user_id: int, message: str,
+                              client: AsyncOpenAI) -> AsyncIterator[str]:
+    """
+    Yields the reply as server-sent events: 'meta' (thread id), one 'token' per delta,
+    then 'done' with the stored message id, or 'error'. Whatever was generated is stored
+    when the stream ends, including when the visitor disconnects part way.
+
+    The reply is stored through a session of its own: the request's session may be
+    closed before the stream finishes.
+    """
+    yield sse_event("meta", {"thread_id": turn.thread.id})
+
+    db = SessionLocal()
+    if turn.reply is not None:
+        try:
+            yield sse_event("token", {"text": turn.reply})
+        finally:
+            # Stored even if the visitor disconnects right after the token.
+            stored = finish_figure_turn(db, turn, user_id, message, turn.reply, served_from_cache=True)
+            db.close()
+        yield sse_event("done", {"message_id": stored.id})
+        return
+
+    started = time.perf_counter()
+    parts, complete, stored = [], False, None
+    try:
+        stream = await client.chat.completions.create(
+            model=FIGURE_CHAT_MODEL, messages=turn.messages, temperature=0.7, timeout=CHAT_TIMEOUT, stream=True
+        )
+        async with stream:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if not parts:
+                    print(f"[STREAM] First token after {(time.perf_counter() - started) * 1000:.0f} ms")
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+        complete = True
+        log_token_usage("figures/ask/stream", FIGURE_CHAT_MODEL, turn.prompt_tokens, "".join(parts))
+    except (OpenAIError, httpx.HTTPError) as e:
+        print(f"⚠️ [STREAM] Completion failed after {len(parts)} tokens: {e}")
+        yield sse_event("error", {"detail": "The model did not finish its answer."})
+    finally:
+        # Runs on completion, on error and when the client disconnects (the generator is closed).
+        if parts:
+            stored = finish_figure_turn(db, turn, user_id, message, "".join(parts), complete=complete)
+            if not complete:
+                print(f"[STREAM] Stored partial reply ({len(parts)} tokens) for thread {turn.thread.id}")
+        db.close()
+
+    if complete:
+        yield sse_event("done", {"message_id": stored.id if stored else None})
+
+
+@router.post("/ask/stream")
+async def ask_figure_stream(
+        background_tasks: BackgroundTasks,
+        figure_slug: str = Form(...),
+        user_id: int = Form(...),
+        message: str = Form(...),
+        thread_id: Optional[int] = Form(None),
+        db: Session = Depends(get_db_chat),
+        client: AsyncOpenAI = Depends(get_openai_client)
+):
+    """Same as POST /figures/ask, but streams the answer token by token as server-sent events."""
+    turn = await start_figure_turn(db, figure_slug, user_id, message, thread_id)
+    # FastAPI runs these after the stream has finished and the reply is stored.
+    background_tasks.add_task(summarize_in_background, turn.thread.id, client)
+    return StreamingResponse(
+        stream_figure_reply(turn, user_id, message, client),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/", response_model=List[schemas.HistoricalFigureRead])
 def read_all_figures(skip: int = 0, limit: int = 100, db: Session = Depends(get_figure_db)):
     return crud.get_all_figures(db, skip=skip, limit=limit)
@@ -155,10 +323,23 @@ def read_figure_by_slug(slug: str, db: Session = Depends(get_figure_db)):
 
 
 @router.post("/search_context/")
-def search_figure_context_route(query: SearchQuery):
-    results = search_figure_context(
+async def search_figure_context_route(query: SearchQuery):
+    results = await search_figure_context_async(
         query=query.query,
         top_k=query.top_k,
-        figure_slug=query.figure_slug
+        figure_slug=query.figure_slug,
+        mode=query.mode
+    )
+    return results
+
+
+@router.post("/search_context/batch")
+def search_figure_context_batch_route(batch: BatchSearchQuery):
+    """
+    Runs many context searches in one request. Returns one result list per query,
+    in the order the queries were sent.
+    """
+    return search_figure_context_batch(
+        [(q.query, q.figure_slug, q.top_k) for q in batch.queries],
+        mode=batch.mode
     )
-    return results
\ No newline at end of file
@@ -53,7 +53,7 @@ class ChatMessageCreate(BaseModel):
     model_used: Optional[str] = None
     source_page: Optional[str] = None
     thread_id: Optional[int] = None
-    summary_of: Optional[str] = None
+    summary_of: Optional[int] = None
 
 class ChatMessageRead(ChatMessageCreate):
     """
@@ -80,7 +80,7 @@ class ChatMessageCreate(BaseModel):
     model_used: Optional[str] = None
     source_page: Optional[str] = None
     thread_id: Optional[int] = None
-    summary_of: Optional[str] = None
+    summary_of: Optional[int] = None
 
 class ChatMessageRead(ChatMessageCreate):
     """
@@ -0,0 +1,100 @@
+# backend/summarizer.py
+
+import os
+from typing import List, Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAIError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend import crud, models, schemas
+from backend.database import SessionLocal
+from backend.llm_client import CHAT_TIMEOUT
+from backend.token_budget import count_tokens
+
+# Once the unsummarized part of a thread passes this many tokens, its older messages are
+# folded into the thread's rolling summary.
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("SUMMARY_TRIGGER_TOKENS", "1500"))
+# The most recent messages are always sent verbatim (6 = the last three question/answer turns).
+SUMMARY_KEEP_MESSAGES = int(os.getenv("SUMMARY_KEEP_MESSAGES", "6"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "300"))
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a visitor and a historical guide. "
+    "Merge the new messages into the summary. Keep names, dates, places, the visitor's interests "
+    "and any open questions; drop pleasantries. Write plain prose, at most a few short paragraphs."
+)
+
+# Threads with a summary call in flight, so back-to-back turns don't summarize the same messages twice.
+_in_progress = set()
+
+
+def conversation_history(db: Session, thread_id: int) -> List[dict]:
+    """
+    The thread history to send to the model: the latest summary as a system message,
+    then every message it does not cover, oldest first.
+    """
+    summary = crud.get_latest_summary(db, thread_id)
+    messages = crud.get_messages_after(db, thread_id, summary.summary_of if summary else None)
+    history = []
+    if summary:
+        history.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary.message}"})
+    history.extend({"role": m.role, "content": m.message} for m in messages)
+    return history
+
+
+async def summarize_thread(db: Session, thread_id: int, client: AsyncOpenAI,
+                           trigger_tokens: int = SUMMARY_TRIGGER_TOKENS,
+                           keep_messages: int = SUMMARY_KEEP_MESSAGES) -> Optional[models.Chat]:
+    """
+    Folds everything but the last `keep_messages` unsummarized messages into a new
+    summary row, once they add up to `trigger_tokens`. Returns the new row, or None
+    if the thread is still short enough.
+    """
+    summary = crud.get_latest_summary(db, thread_id)
+    messages = crud.get_messages_after(db, thread_id, summary.summary_of if summary else None)
+    pending_tokens = sum(count_tokens(m.message) for m in messages)
+    if pending_tokens < trigger_tokens or len(messages) <= keep_messages:
+        return None
+
+    fold = messages[:len(messages) - keep_messages]
+    transcript = "\n".join(f"{m.role.capitalize()}: {m.message}" for m in fold)
+    previous = summary.message if summary else "(none yet)"
+    response = await client.chat.completions.create(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Summary so far:\n{previous}\n\nNew messages:\n{transcript}"},
+        ],
+        temperature=0.2,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        timeout=CHAT_TIMEOUT,
+    )
+    stored = crud.create_chat_message(db, schemas.ChatMessageCreate(
+        user_id=fold[-1].user_id, role="summary", message=response.choices[0].message.content,
+        model_used=SUMMARY_MODEL, thread_id=thread_id, summary_of=fold[-1].id
+    ))
+    print(f"[SUMMARY] Thread {thread_id}: folded {len(fold)} messages "
+          f"(~{sum(count_tokens(m.message) for m in fold)} tokens) into the summary")
+    return stored
+
+
+async def summarize_in_background(thread_id: int, client: AsyncOpenAI):
+    """
+    BackgroundTasks entry point, run after the response has been sent. Uses its own
+    session. API and database errors are logged, not raised: a missed summary only means
+    the next turn sends more history.
+    """
+    if thread_id is None or thread_id in _in_progress:
+        return
+    _in_progress.add(thread_id)
+    db = SessionLocal()
+    try:
+        await summarize_thread(db, thread_id, client)
+    except (OpenAIError, httpx.HTTPError, SQLAlchemyError) as e:
+        print(f"⚠️ [SUMMARY] Could not summarize thread {thread_id}: {e}")
+    finally:
+        db.close()
+        _in_progress.discard(thread_id)
@@ -0,0 +1,149 @@
+# backend/token_budget.py
+
+import math
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+# Upper bound on prompt tokens per chat request. Keeps latency and cost predictable
+# however much context or history a turn brings along.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# Room left for the answer when a model's context window is the tighter limit.
+COMPLETION_TOKEN_RESERVE = int(os.getenv("COMPLETION_TOKEN_RESERVE", "1024"))
+
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+}
+DEFAULT_CONTEXT_WINDOW = 8_192
+DEFAULT_MODEL = "gpt-4o"
+DEFAULT_ENCODING = "o200k_base"  # the gpt-4o family
+
+# Every chat message costs a few tokens of framing on top of its content, and the reply
+# is primed with a few more (the counting scheme from OpenAI's cookbook).
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """
+    The model's tiktoken encoding, or None when tiktoken isn't installed or its encoding
+    file can't be loaded (tiktoken downloads it on first use), so counting falls back to
+    the estimate instead of failing the request.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        print(f"⚠️ [TOKENS] No tiktoken encoding for {model}, estimating token counts: {e}")
+        return None
+
+
+def tokenizer_available() -> bool:
+    return _encoding(DEFAULT_MODEL) is not None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """
+    Tokens in `text` for `model`. Exact with tiktoken; otherwise a conservative estimate
+    (the larger of words-plus-punctuation and one token per four characters).
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(len(_WORD_RE.findall(text)), math.ceil(len(text) / 4))
+
+
+def count_message_tokens(messages: List[dict], model: str = DEFAULT_MODEL) -> int:
+    """Prompt tokens for a list of chat messages, including per-message framing."""
+    total = REPLY_PRIMING_TOKENS
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content") or "", model)
+        if message.get("name"):
+            total += 1 + count_tokens(message["name"], model)
+    return total
+
+
+def prompt_budget(model: str, budget: int = None) -> int:
+    """The prompt token limit for `model`: PROMPT_TOKEN_BUDGET, or less if its window is smaller."""
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    return min(budget, window - COMPLETION_TOKEN_RESERVE)
+
+
+def truncate_text(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """Cuts `text` down to at most `max_tokens` tokens, on a word boundary when estimating."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    # Binary search on word boundaries for the longest prefix within budget.
+    ends = [m.end() for m in _WORD_RE.finditer(text)]
+    lo, hi = 0, len(ends)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:ends[mid - 1]], model) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:ends[lo - 1]] if lo else ""
+
+
+def trim_messages(messages: List[dict], max_tokens: int, model: str = DEFAULT_MODEL,
+                  keep_last: int = 1) -> List[dict]:
+    """
+    Fits chat messages into `max_tokens`. Drops the oldest conversation messages first
+    (never the first system prompt or the last `keep_last` messages), then shortens the
+    longest remaining system message, usually the retrieved context.
+    """
+    messages = [dict(m) for m in messages]
+    if count_message_tokens(messages, model) <= max_tokens:
+        return messages
+
+    protected_tail = max(len(messages) - keep_last, 0)
+    droppable = [i for i in range(1, protected_tail) if messages[i]["role"] != "system"]
+    for i in droppable:
+        messages[i] = None
+        if count_message_tokens([m for m in messages if m], model) <= max_tokens:
+            break
+    messages = [m for m in messages if m]
+
+    over = count_message_tokens(messages, model) - max_tokens
+    system = [i for i, m in enumerate(messages) if m["role"] == "system" and i > 0]
+    if over > 0 and system:
+        longest = max(system, key=lambda i: count_tokens(messages[i]["content"], model))
+        content = messages[longest]["content"]
+        messages[longest]["content"] = truncate_text(content, count_tokens(content, model) - over, model)
+    return messages
+
+
+def log_token_usage(label: str, model: str, prompt_tokens: int, completion: Optional[str] = None,
+                    usage=None):
+    """
+    Logs the prompt estimate for a request and, once known, the completion size. When
+    the API reports `usage`, the billed counts are logged next to the estimates.
+    """
+    line = f"[TOKENS] {label} ({model}): prompt ~{prompt_tokens}"
+    if completion is not None:
+        line += f", completion ~{count_tokens(completion, model)}"
+    if usage is not None:
+        line += f" (billed {usage.prompt_tokens} + {usage.completion_tokens})"
+    print(line)
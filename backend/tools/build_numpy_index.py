@@ -0,0 +1,23 @@
+"""
+build_numpy_index.py
+
+Exports every vector in the Chroma figure context collection to the memory-mapped
+NumPy index used when RETRIEVAL_ENGINE=numpy. The ingest tools do this after each
+load; run it by hand after editing the collection some other way.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.vector.chroma_client import get_figure_context_collection
+from backend.vector.numpy_index import NUMPY_INDEX_DIR, export_collection_to_numpy_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the NumPy per-figure retrieval index from ChromaDB.")
+    parser.add_argument("--output-dir", default=NUMPY_INDEX_DIR)
+    args = parser.parse_args()
+    export_collection_to_numpy_index(get_figure_context_collection(), args.output_dir)
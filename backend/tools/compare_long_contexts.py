@@ -3,21 +3,32 @@ compare_long_contexts.py
 
 Fetch and compare long-form content from Wikipedia, DBpedia, and manual input.
 Use GPT to rewrite a unified version in a given style and save to figures.db.
+
+Sources are sent whole. --source-token-limit N cuts each one to N tokens, e.g. when a
+full Wikipedia extract would overflow the model's context window; the rewrite then
+only sees the start of each source.
+
+    python -m backend.tools.compare_long_contexts --source-token-limit 2000
 """
 
+import argparse
 import os
+from typing import Optional
+
 import requests
 from dotenv import load_dotenv
 from openai import OpenAI
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from backend.models import FigureContext
+from backend.token_budget import count_tokens, log_token_usage, truncate_text
 from backend.tools.figure_enricher import FigureEnricher
 
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 DATABASE_PATH = "data/figures.db"
+MODEL = "gpt-4o"
 engine = create_engine(f"sqlite:///{DATABASE_PATH}")
 SessionLocal = sessionmaker(bind=engine)
 
@@ -68,7 +79,10 @@ def fetch_dbpedia_abstract(dbpedia_url: str) -> str:
     return ""
 
 
-def rewrite_context_with_gpt(wiki: str, dbpedia: str, manual: str, style_prompt: str) -> str:
+def rewrite_context_with_gpt(wiki: str, dbpedia: str, manual: str, style_prompt: str,
+                             source_token_limit: Optional[int] = None) -> str:
+    if source_token_limit:
+        wiki, dbpedia, manual = (truncate_text(text, source_token_limit, MODEL) for text in (wiki, dbpedia, manual))
     prompt = (
         f"{style_prompt}\n\n"
         "Here are three long texts about a historical figure:\n\n"
@@ -82,11 +96,13 @@ def rewrite_context_with_gpt(wiki: str, dbpedia: str, manual: str, style_prompt:
     )
     try:
         response = client.chat.completions.create(
-            model="gpt-4o",
+            model=MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7
         )
-        return response.choices[0].message.content.strip()
+        rewritten = response.choices[0].message.content.strip()
+        log_token_usage("long context rewrite", MODEL, count_tokens(prompt, MODEL), rewritten, response.usage)
+        return rewritten
     except Exception as e:
         print(f"[GPT error] {e}")
         return ""
@@ -108,7 +124,7 @@ def save_to_context(slug: str, content: str):
     print("✅ Rewritten context saved to DB.")
 
 
-def main():
+def main(source_token_limit: Optional[int] = None):
     name = input("Enter the figure's name: ").strip()
     enricher = FigureEnricher(name)
     data = enricher.enrich()
@@ -130,7 +146,8 @@ def main():
     style = input("Choose style (kids / teen / gen / schol): ").strip().lower()
     style_prompt = get_style_prompt(style)
 
-    rewritten = rewrite_context_with_gpt(wiki_full, dbpedia_abstract, manual_input, style_prompt)
+    rewritten = rewrite_context_with_gpt(wiki_full, dbpedia_abstract, manual_input, style_prompt,
+                                         source_token_limit)
 
     print("\n📝 GPT Rewritten Context\n-------------------------\n")
     print(rewritten)
@@ -140,4 +157,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Rewrite a figure's long-form sources into one context text.")
+    parser.add_argument("--source-token-limit", type=int, default=None,
+                        help="Cut each source to this many tokens before the rewrite (default: no cut).")
+    main(parser.parse_args().source_token_limit)
@@ -12,6 +12,7 @@ from openai import OpenAI
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from backend.models import FigureContext, Base
+from backend.token_budget import count_tokens, log_token_usage
 from backend.tools.figure_enricher import FigureEnricher
 from dotenv import load_dotenv
 
@@ -22,6 +23,7 @@ client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Database setup
 DATABASE_PATH = "data/figures.db"
+MODEL = "gpt-4o"
 engine = create_engine(f"sqlite:///{DATABASE_PATH}")
 SessionLocal = sessionmaker(bind=engine)
 
@@ -88,11 +90,13 @@ def rewrite_summary_with_gpt(wiki_summary: str, dbpedia_summary: str, manual_sum
 
     try:
         response = client.chat.completions.create(
-            model="gpt-4o",
+            model=MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7
         )
-        return response.choices[0].message.content.strip()
+        rewritten = response.choices[0].message.content.strip()
+        log_token_usage("summary rewrite", MODEL, count_tokens(prompt, MODEL), rewritten, response.usage)
+        return rewritten
     except Exception as e:
         print(f"[GPT error] {e}")
         return ""
@@ -0,0 +1,82 @@
+"""
+eval_context_packing.py
+
+Compares the old prompt context (the top-k chunks joined as-is) with the packed
+context on a retrieval eval set, reporting prompt tokens and recall for both.
+
+The eval set is a JSON Lines file, one question per line:
+
+    {"figure_slug": "richard-iii", "question": "Where did you die?", "relevant": ["Bosworth"]}
+
+A question counts as recalled when every "relevant" snippet appears in the context
+that would be sent to the model.
+
+    python backend/tools/eval_context_packing.py --eval-file eval/retrieval.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.token_budget import count_tokens
+from backend.vector.context_packer import (
+    CONTEXT_CANDIDATES, CONTEXT_MAX_DISTANCE, CONTEXT_TOKEN_BUDGET, format_context, pack_context,
+)
+from backend.vector.context_retriever import search_figure_context
+
+
+def recalled(context_text: str, relevant: List[str]) -> bool:
+    text = context_text.lower()
+    return all(snippet.lower() in text for snippet in relevant)
+
+
+def evaluate(examples: List[dict], top_k: int, candidates: int, budget: int, max_distance: Optional[float]) -> dict:
+    totals = {"baseline_tokens": 0, "packed_tokens": 0, "baseline_recall": 0, "packed_recall": 0}
+    for example in examples:
+        results = search_figure_context(example["question"], example["figure_slug"],
+                                        top_k=max(top_k, candidates), include_embeddings=True)
+        baseline = format_context(results[:top_k])
+        packed = format_context(pack_context(results[:candidates], token_budget=budget, max_distance=max_distance))
+
+        totals["baseline_tokens"] += count_tokens(baseline)
+        totals["packed_tokens"] += count_tokens(packed)
+        totals["baseline_recall"] += recalled(baseline, example["relevant"])
+        totals["packed_recall"] += recalled(packed, example["relevant"])
+
+    n = max(len(examples), 1)
+    return {
+        "questions": len(examples),
+        "baseline_avg_tokens": round(totals["baseline_tokens"] / n, 1),
+        "packed_avg_tokens": round(totals["packed_tokens"] / n, 1),
+        "baseline_recall": round(totals["baseline_recall"] / n, 3),
+        "packed_recall": round(totals["packed_recall"] / n, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate prompt-context packing against the plain top-k join.")
+    parser.add_argument("--eval-file", required=True, help="JSON Lines file of figure_slug/question/relevant.")
+    parser.add_argument("--top-k", type=int, default=5, help="Chunks joined by the baseline.")
+    parser.add_argument("--candidates", type=int, default=CONTEXT_CANDIDATES)
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--max-distance", type=float, default=CONTEXT_MAX_DISTANCE,
+                        help="Cosine distance cutoff to try (default: CONTEXT_MAX_DISTANCE, off when unset).")
+    args = parser.parse_args()
+
+    with open(args.eval_file) as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+
+    report = evaluate(examples, args.top_k, args.candidates, args.budget, args.max_distance)
+    for key, value in report.items():
+        print(f"{key:>20}: {value}")
+
+    saved = 1 - report["packed_avg_tokens"] / report["baseline_avg_tokens"] if report["baseline_avg_tokens"] else 0.0
+    print(f"\nPrompt context tokens reduced by {saved:.0%}")
+    if report["packed_recall"] < report["baseline_recall"]:
+        print("⚠️ Packed context recalls fewer questions than the baseline; raise --budget or --max-distance.")
+        sys.exit(1)
+    print("✅ No recall loss against the baseline.")
@@ -0,0 +1,98 @@
+"""
+export_onnx_embedder.py
+
+Exports the sentence-transformers all-MiniLM-L6-v2 encoder to ONNX, writes an
+int8 dynamically-quantized copy next to it, and checks both against the torch
+vectors. Point ONNX_MODEL_DIR at the output directory and set
+EMBEDDING_PROVIDER=onnx to serve embeddings without torch.
+
+Needs torch, transformers and sentence-transformers on the machine running the
+export only; the server just needs onnxruntime and tokenizers.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import numpy as np
+
+from backend.vector.embedding_provider import MODEL_CONFIG, ONNX_MODEL_DIR
+
+SAMPLE_SENTENCES = [
+    "How did you die?",
+    "Who were your children?",
+    "What battles did you fight in?",
+    "Tell me about the Tower of London.",
+]
+
+
+def export(output_dir: str, opset: int = 17):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    model_name = f"sentence-transformers/{MODEL_CONFIG['local']['model_name']}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    # Saves tokenizer.json, which the server loads with the lightweight `tokenizers` package.
+    tokenizer.save_pretrained(output_dir)
+
+    dummy = tokenizer(["export sample"], return_tensors="pt")
+    model_path = os.path.join(output_dir, "model.onnx")
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+        model_path,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "token_type_ids": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"},
+        },
+        opset_version=opset,
+    )
+    print(f"✅ Exported {model_path}")
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantized_path = os.path.join(output_dir, "model-int8.onnx")
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    print(f"✅ Quantized {quantized_path}")
+
+
+def validate(output_dir: str, min_cosine: float):
+    from sentence_transformers import SentenceTransformer
+    from backend.vector.onnx_encoder import OnnxSentenceEncoder
+
+    reference = SentenceTransformer(MODEL_CONFIG["local"]["model_name"]).encode(SAMPLE_SENTENCES)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+
+    ok = True
+    for quantized in (False, True):
+        encoder = OnnxSentenceEncoder(output_dir, quantized=quantized)
+        vectors = encoder.encode(SAMPLE_SENTENCES)
+        cosines = (vectors * reference).sum(axis=1)
+        label = "int8" if quantized else "fp32"
+        print(f"{label}: min cosine vs torch = {cosines.min():.4f}")
+        ok = ok and cosines.min() >= min_cosine
+    if not ok:
+        print(f"❌ ONNX vectors fall below the {min_cosine} cosine tolerance.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export MiniLM to ONNX (+ int8) for the onnx embedding provider.")
+    parser.add_argument("--output-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--skip-validate", action="store_true")
+    args = parser.parse_args()
+
+    export(args.output_dir)
+    if not args.skip_validate:
+        validate(args.output_dir, args.min_cosine)
@@ -0,0 +1,76 @@
+"""
+fake_openai_server.py
+
+A small OpenAI-compatible chat completions server for local development and tests.
+It answers POST /v1/chat/completions, plain or streamed (stream=true), with a canned
+reply split into word tokens. Nothing leaves the machine and nothing is billed.
+
+    uvicorn backend.tools.fake_openai_server:app --port 8010
+    OPENAI_BASE_URL=http://localhost:8010/v1 OPENAI_API_KEY=fake uvicorn backend.main:app
+
+In tests, serve it in-process through httpx.ASGITransport:
+
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()), base_url="http://fake")
+    client = create_openai_client(http_client)   # with OPENAI_BASE_URL=http://fake/v1
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+FAKE_OPENAI_REPLY = os.getenv("FAKE_OPENAI_REPLY")
+FAKE_OPENAI_TOKEN_DELAY = float(os.getenv("FAKE_OPENAI_TOKEN_DELAY", "0.02"))
+
+
+def tokenize(text: str):
+    """Splits a reply into word-sized pieces that join back to the original text."""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def create_app(reply: Optional[str] = FAKE_OPENAI_REPLY, token_delay: float = FAKE_OPENAI_TOKEN_DELAY) -> FastAPI:
+    """
+    Args:
+        reply: Fixed answer text. Defaults to echoing the last message ("Echo: ...").
+        token_delay: Seconds between streamed tokens.
+    """
+    app = FastAPI()
+    app.state.requests = []
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests.append(body)
+        text = reply if reply is not None else f"Echo: {body['messages'][-1]['content']}"
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "fake")}
+
+        if not body.get("stream"):
+            return {**base, "object": "chat.completion", "choices": [{
+                "index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text},
+            }]}
+
+        async def events():
+            def chunk(delta, finish_reason=None):
+                payload = {**base, "object": "chat.completion.chunk",
+                           "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                return f"data: {json.dumps(payload)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokenize(text):
+                if token_delay:
+                    await asyncio.sleep(token_delay)
+                yield chunk({"content": token})
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+app = create_app()
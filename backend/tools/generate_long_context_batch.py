@@ -14,6 +14,7 @@ from openai import OpenAI
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from backend.models import Base, FigureContext
+from backend.token_budget import count_tokens, log_token_usage, truncate_text
 from backend.tools.figure_enricher import FigureEnricher
 
 load_dotenv()
@@ -22,6 +23,9 @@ load_dotenv()
 CSV_PATH = "data/figures_cleaned.csv"
 DATABASE_PATH = "data/figures.db"
 MODEL = "gpt-4o"
+# Wikipedia text sent per figure, counted in tokens: about the old 3000-character cut at
+# ~4 characters per token. DBpedia abstracts are short and are still sent whole.
+SOURCE_TOKEN_LIMIT = 750
 
 # === Init ===
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -81,7 +85,7 @@ def build_prompt(wiki_text: str, dbpedia_text: str, style: str) -> str:
         f"{styles.get(style, styles['gen'])}\n\n"
         "Below is content from two sources about a historical figure.\n"
         "Please write a new, well-structured long-form summary suitable for an educational website.\n\n"
-        f"Wikipedia content:\n{wiki_text[:3000] or '[None]'}\n\n"
+        f"Wikipedia content:\n{truncate_text(wiki_text, SOURCE_TOKEN_LIMIT, MODEL) or '[None]'}\n\n"
         f"DBpedia content:\n{dbpedia_text or '[None]'}"
     )
 
@@ -111,6 +115,7 @@ def process_figure(name: str, main_site: str, style: str, session):
             temperature=0.7
         )
         content = response.choices[0].message.content.strip()
+        log_token_usage(name, MODEL, count_tokens(prompt, MODEL), content, response.usage)
 
         context_entry = FigureContext(
             figure_slug=data["slug"],
@@ -0,0 +1,174 @@
+"""
+hnsw_sweep.py
+
+Builds in-memory copies of the figure context collection with different HNSW
+settings and reports, for each, recall@k against exact brute-force search and the
+p50/p95 query latency. Use it to choose the CHROMA_HNSW_* values in chroma_client.
+
+Queries are corpus vectors with a little noise added, filtered by figure_slug the
+same way the chatbot queries.
+
+    python backend/tools/hnsw_sweep.py --m 8 16 32 --search-ef 10 50 100
+    python backend/tools/hnsw_sweep.py --synthetic 20000 --dim 384   # no collection needed
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+import uuid
+from typing import List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.vector.chroma_client import (
+    HNSW_CONSTRUCTION_EF, HNSW_M, HNSW_SEARCH_EF, HNSW_SPACE, hnsw_metadata,
+)
+
+
+def load_collection_corpus(collection):
+    """Reads every embedding and its figure_slug from a Chroma collection."""
+    data = collection.get(include=["embeddings", "metadatas"])
+    embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+    slugs = [(meta or {}).get("figure_slug", "") for meta in data["metadatas"]]
+    return embeddings, slugs
+
+
+def synthetic_corpus(size: int, dim: int, figures: int, seed: int = 0):
+    """Random unit vectors spread over `figures` slugs, for sweeping without real data."""
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((size, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    slugs = [f"figure-{i % figures}" for i in range(size)]
+    return embeddings, slugs
+
+
+def make_queries(embeddings: np.ndarray, slugs: List[str], count: int, noise: float = 0.1, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(embeddings), size=min(count, len(embeddings)), replace=False)
+    queries = embeddings[picks] + noise * rng.standard_normal((len(picks), embeddings.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries, [slugs[i] for i in picks]
+
+
+def brute_force_top_k(embeddings: np.ndarray, slugs: List[str], queries: np.ndarray,
+                      query_slugs: List[Optional[str]], k: int) -> List[set]:
+    """
+    Exact cosine top-k per query, restricted to the query's figure when it has one.
+    Every provider's embeddings are unit length, so this is the ranking l2, ip and
+    cosine spaces all converge to.
+    """
+    normed = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    slug_array = np.asarray(slugs)
+    truth = []
+    for query, slug in zip(queries, query_slugs):
+        rows = np.flatnonzero(slug_array == slug) if slug is not None else np.arange(len(normed))
+        scores = normed[rows] @ query
+        truth.append({int(i) for i in rows[np.argsort(-scores)[:k]]})
+    return truth
+
+
+def build_variant(client, embeddings: np.ndarray, slugs: List[str], metadata: dict):
+    """Creates a throwaway collection with the given HNSW metadata and loads the corpus."""
+    collection = client.create_collection(name=f"hnsw-sweep-{uuid.uuid4().hex[:12]}", metadata=metadata)
+    batch = client.get_max_batch_size()
+    started = time.perf_counter()
+    for start in range(0, len(embeddings), batch):
+        end = min(start + batch, len(embeddings))
+        collection.add(
+            ids=[str(i) for i in range(start, end)],
+            embeddings=embeddings[start:end].tolist(),
+            metadatas=[{"figure_slug": slug} for slug in slugs[start:end]],
+        )
+    return collection, time.perf_counter() - started
+
+
+def measure(collection, queries: np.ndarray, query_slugs: List[Optional[str]], truth: List[set], k: int) -> dict:
+    recalls, latencies = [], []
+    for query, slug, expected in zip(queries, query_slugs, truth):
+        started = time.perf_counter()
+        response = collection.query(
+            query_embeddings=[query.tolist()],
+            n_results=k,
+            where={"figure_slug": slug} if slug is not None else None,
+            include=[],
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+        found = {int(i) for i in response["ids"][0]}
+        recalls.append(len(found & expected) / max(len(expected), 1))
+    return {
+        "recall": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+    }
+
+
+def sweep(embeddings: np.ndarray, slugs: List[str], spaces: List[str], ms: List[int], construction_efs: List[int],
+          search_efs: List[int], k: int = 5, queries: int = 200, filter_by_figure: bool = True) -> List[dict]:
+    """
+    Runs every combination of settings. Collections are built once per (space, M,
+    construction_ef); search_ef is changed in place between measurements.
+    """
+    import chromadb
+
+    client = chromadb.EphemeralClient()
+    query_vectors, query_slugs = make_queries(embeddings, slugs, queries)
+    if not filter_by_figure:
+        query_slugs = [None] * len(query_slugs)
+    truth = brute_force_top_k(embeddings, slugs, query_vectors, query_slugs, k)
+
+    rows = []
+    for space, m, construction_ef in itertools.product(spaces, ms, construction_efs):
+        collection, build_seconds = build_variant(
+            client, embeddings, slugs, hnsw_metadata(space, m, construction_ef, search_efs[0])
+        )
+        try:
+            for search_ef in search_efs:
+                collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+                rows.append({
+                    "space": space, "M": m, "construction_ef": construction_ef, "search_ef": search_ef,
+                    "build_s": round(build_seconds, 2),
+                    **measure(collection, query_vectors, query_slugs, truth, k),
+                })
+                print(f"[HNSW-SWEEP] {rows[-1]}")
+        finally:
+            client.delete_collection(collection.name)
+    return rows
+
+
+def print_table(rows: List[dict], k: int):
+    header = ["space", "M", "construction_ef", "search_ef", "build_s", "recall", "p50_ms", "p95_ms"]
+    print("\n" + " | ".join(f"recall@{k}" if h == "recall" else h for h in header))
+    for row in rows:
+        print(" | ".join(str(row[h]) for h in header))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep Chroma HNSW settings for recall@k and query latency.")
+    parser.add_argument("--space", nargs="+", default=[HNSW_SPACE], choices=["l2", "ip", "cosine"])
+    parser.add_argument("--m", nargs="+", type=int, default=[HNSW_M])
+    parser.add_argument("--construction-ef", nargs="+", type=int, default=[HNSW_CONSTRUCTION_EF])
+    parser.add_argument("--search-ef", nargs="+", type=int, default=[HNSW_SEARCH_EF])
+    parser.add_argument("--k", type=int, default=5, help="Results per query, as in top_k.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--no-filter", action="store_true", help="Search the whole collection, not one figure.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use this many random vectors instead of the collection.")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of synthetic vectors.")
+    parser.add_argument("--figures", type=int, default=50, help="Figures the synthetic vectors are spread over.")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        corpus, corpus_slugs = synthetic_corpus(args.synthetic, args.dim, args.figures)
+    else:
+        from backend.vector.chroma_client import get_figure_context_collection
+        corpus, corpus_slugs = load_collection_corpus(get_figure_context_collection())
+    if not len(corpus):
+        sys.exit("The collection is empty; ingest context first or pass --synthetic.")
+    print(f"Sweeping over {len(corpus)} vectors of dimension {corpus.shape[1]}")
+
+    results = sweep(corpus, corpus_slugs, args.space, args.m, args.construction_ef, args.search_ef,
+                    k=args.k, queries=args.queries, filter_by_figure=not args.no_filter)
+    print_table(results, args.k)
@@ -1,6 +1,7 @@
-import chromadb
+import argparse
 import os
 import sys
+from typing import Optional
 
 # --- Path Calculation for Project Imports ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -8,54 +9,61 @@ project_root_dir = os.path.dirname(current_dir)
 if project_root_dir not in sys.path:
     sys.path.insert(0, project_root_dir)
 
-from backend.vector.embedding_provider import get_embedding
+from backend.vector.chroma_client import get_figure_context_collection
+from backend.vector.context_sync import INGEST_DB_BATCH_SIZE, INGEST_WRITE_BATCH_SIZE, sync_collection
+from backend.vector.embedding_provider import DEFAULT_BATCH_SIZE
+from backend.vector.numpy_index import export_collection_to_numpy_index, numpy_index_enabled
+from backend.vector.retrieval_cache import bump_context_version
 from backend.figures_database import FigureSessionLocal
 from backend.models import FigureContext
 
-# --- UPDATED: This now points directly to the Render Disk mount path ---
-CHROMA_DATA_PATH = "/data/chroma_db"
-COLLECTION_NAME = "figure_context_collection"
 
-
-def load_context_to_chroma():
-    """
-    Pre-calculates embeddings for all contexts and loads them into ChromaDB.
+def load_context_to_chroma(workers: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+                           write_batch_size: int = INGEST_WRITE_BATCH_SIZE, dry_run: bool = False,
+                           numpy_index: Optional[bool] = None):
     """
-    client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+    Syncs ChromaDB with figures.db: new and edited contexts are chunked, embedded and
+    upserted, and chunks of deleted contexts are removed. Unchanged contexts are left
+    alone, so re-running this on every deploy only costs what changed.
 
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    Rows are streamed from figures.db and written in batches of write_batch_size
+    chunks, so memory use does not grow with the table. With workers > 1 the chunks
+    are embedded on a process pool; each finished batch is written to ChromaDB from
+    this process as soon as it comes back.
+
+    The NumPy index is re-exported after a change only if `numpy_index` is set
+    (default: when RETRIEVAL_ENGINE=numpy), since nothing else reads it.
+    """
+    collection = get_figure_context_collection()
 
     session = FigureSessionLocal()
     try:
-        all_context = session.query(FigureContext).all()
-        if not all_context:
-            print("No context found in figures.db to load into ChromaDB.")
-            return
-
-        print(f"Preparing {len(all_context)} documents for embedding...")
-
-        documents = [context.content for context in all_context]
-        embeddings = [get_embedding(doc) for doc in documents]
-
-        metadatas = [{"figure_slug": context.figure_slug} for context in all_context]
-        ids = [str(context.id) for context in all_context]
-
-        if not ids:
-            print("No documents to add to ChromaDB.")
-            return
+        contexts = session.query(FigureContext).yield_per(INGEST_DB_BATCH_SIZE)
+        summary = sync_collection(contexts, collection, workers=workers, batch_size=batch_size,
+                                  write_batch_size=write_batch_size, dry_run=dry_run)
+        print(f"[SYNC] {'Dry run: ' if dry_run else ''}{summary}")
 
-        print(f"Adding {len(ids)} documents with pre-calculated embeddings to ChromaDB...")
-        collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
-        print("✅ ChromaDB loading complete.")
+        if summary.changed and not dry_run:
+            if numpy_index if numpy_index is not None else numpy_index_enabled():
+                export_collection_to_numpy_index(collection)
+            bump_context_version()
+        print("✅ ChromaDB sync complete.")
+        return summary
 
     finally:
         session.close()
 
 
 if __name__ == '__main__':
-    load_context_to_chroma()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sync FigureContext rows into ChromaDB.")
+    parser.add_argument("--workers", type=int, default=1, help="Embedding worker processes.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Documents per embedding batch.")
+    parser.add_argument("--write-batch-size", type=int, default=INGEST_WRITE_BATCH_SIZE,
+                        help="Chunks embedded and written to Chroma per round trip.")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing.")
+    parser.add_argument("--numpy-index", action="store_true",
+                        help="Re-export the NumPy index even when RETRIEVAL_ENGINE is not numpy.")
+    args = parser.parse_args()
+    load_context_to_chroma(workers=args.workers, batch_size=args.batch_size,
+                           write_batch_size=args.write_batch_size, dry_run=args.dry_run,
+                           numpy_index=args.numpy_index or None)
@@ -0,0 +1,234 @@
+"""
+pregenerate_answers.py
+
+Finds the most frequent first-turn questions per figure in chat_history.db and
+answers them offline, writing a warm answer set that the server loads into the
+answer cache at startup (ANSWER_CACHE_ENABLED=true). Popular questions are then
+served without retrieval or an LLM call, which flattens peak-hour load.
+
+    python backend/tools/pregenerate_answers.py --per-figure 20 --concurrency 4
+    python backend/tools/pregenerate_answers.py --mock --output /tmp/warm_answers.json   # no OpenAI calls
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.answer_cache import WARM_ANSWERS_PATH, figure_fingerprint
+from backend.models import Chat, Thread
+from backend.prompting import build_figure_messages
+from backend.token_budget import count_message_tokens, log_token_usage, prompt_budget, trim_messages
+from backend.vector.context_packer import CONTEXT_CANDIDATES, format_context, pack_context
+from backend.vector.embedding_provider import normalize_query
+
+DEFAULT_MODEL = "gpt-4o"
+
+
+@dataclass
+class PopularQuestion:
+    figure_slug: str
+    question: str
+    count: int
+
+
+def top_first_turn_questions(db: Session, per_figure: int = 20, min_count: int = 2) -> Dict[str, List[PopularQuestion]]:
+    """
+    Counts the opening user question of every figure thread, grouped by normalized text.
+    Each group is represented by its most common original wording.
+    """
+    first_ids = (
+        db.query(func.min(Chat.id).label("id"))
+        .filter(Chat.role == "user", Chat.thread_id.isnot(None))
+        .group_by(Chat.thread_id)
+        .subquery()
+    )
+    rows = (
+        db.query(Thread.figure_slug, Chat.message)
+        .join(first_ids, Chat.id == first_ids.c.id)
+        .join(Thread, Chat.thread_id == Thread.id)
+        .filter(Thread.figure_slug.isnot(None))
+        .all()
+    )
+
+    counts: Dict[tuple, Counter] = {}
+    for figure_slug, message in rows:
+        normalized = normalize_query(message)
+        if normalized:
+            counts.setdefault((figure_slug, normalized), Counter())[message.strip()] += 1
+
+    popular: Dict[str, List[PopularQuestion]] = {}
+    for (figure_slug, _), wordings in counts.items():
+        total = sum(wordings.values())
+        if total >= min_count:
+            popular.setdefault(figure_slug, []).append(
+                PopularQuestion(figure_slug, wordings.most_common(1)[0][0], total)
+            )
+    return {
+        slug: sorted(questions, key=lambda q: q.count, reverse=True)[:per_figure]
+        for slug, questions in popular.items()
+    }
+
+
+class OpenAILLM:
+    """Answers with the same model and temperature as ask_figure_submit."""
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        from backend.llm_client import create_openai_client
+        self.client = create_openai_client()
+        self.model = model
+
+    async def __call__(self, messages: List[dict]) -> str:
+        messages = trim_messages(messages, prompt_budget(self.model), self.model)
+        response = await self.client.chat.completions.create(model=self.model, messages=messages, temperature=0.7)
+        reply = response.choices[0].message.content
+        log_token_usage("pregenerate", self.model, count_message_tokens(messages, self.model), reply, response.usage)
+        return reply
+
+
+class MockLLM:
+    """Stand-in for OpenAILLM that answers instantly and records peak concurrency."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, messages: List[dict]) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return f"[mock answer] {messages[-1]['content']}"
+        finally:
+            self.in_flight -= 1
+
+
+async def pregenerate_answers(questions: List[PopularQuestion], personas: Dict[str, Optional[str]],
+                              llm: Callable, retrieve: Optional[Callable] = None,
+                              concurrency: int = 4, context_version: str = "", collection: str = "") -> List[dict]:
+    """
+    Answers every question with at most `concurrency` LLM calls in flight. `retrieve`
+    is a blocking (question, figure_slug) -> [{"content", ...}] callable run off the
+    event loop; its results are packed exactly as ask_figure_submit packs them.
+    Questions whose generation fails are logged and left out.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def answer(q: PopularQuestion) -> Optional[dict]:
+        async with semaphore:
+            try:
+                chunks = await asyncio.to_thread(retrieve, q.question, q.figure_slug) if retrieve else []
+                context_text = format_context(pack_context(chunks))
+                messages = build_figure_messages(
+                    personas.get(q.figure_slug), context_text, [{"role": "user", "content": q.question}]
+                )
+                reply = await llm(messages)
+            except Exception as e:
+                print(f"⚠️ Failed to answer '{q.question}' for {q.figure_slug}: {e}")
+                return None
+        if not reply:
+            return None
+        return {
+            "figure_slug": q.figure_slug,
+            "question": q.question,
+            "count": q.count,
+            "answer": reply,
+            "fingerprint": figure_fingerprint(personas.get(q.figure_slug), context_version, collection),
+        }
+
+    results = await asyncio.gather(*(answer(q) for q in questions))
+    return [r for r in results if r is not None]
+
+
+def write_warm_answers(answers: List[dict], path: str = WARM_ANSWERS_PATH, embed: Optional[Callable] = None):
+    """
+    Writes the warm answer set atomically. With `embed`, each question's query embedding
+    is stored too so paraphrases of it hit the semantic cache, not just exact repeats.
+    """
+    if embed and answers:
+        for item, embedding in zip(answers, embed([a["question"] for a in answers])):
+            item["embedding"] = [float(x) for x in embedding]
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"generated_at": int(time.time()), "answers": answers}, f)
+    os.replace(tmp_path, path)
+    print(f"[WARM-ANSWERS] Wrote {len(answers)} answers to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate answers for the most popular first-turn questions.")
+    parser.add_argument("--per-figure", type=int, default=20, help="Questions to answer per figure.")
+    parser.add_argument("--min-count", type=int, default=2, help="Ignore questions asked fewer times than this.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum LLM calls in flight.")
+    parser.add_argument("--output", default=None,
+                        help=f"Where to write the warm set (default {WARM_ANSWERS_PATH}; required with --mock).")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--mock", action="store_true", help="Use MockLLM and skip retrieval and embeddings.")
+    args = parser.parse_args()
+    # The server loads WARM_ANSWERS_PATH at startup and serves it to visitors; mock answers must never land there.
+    if args.mock and (args.output is None or os.path.abspath(args.output) == os.path.abspath(WARM_ANSWERS_PATH)):
+        parser.error(f"--mock needs an explicit --output other than {WARM_ANSWERS_PATH}")
+    output = args.output or WARM_ANSWERS_PATH
+
+    from backend.database import SessionLocal
+    from backend.figures_database import FigureSessionLocal
+    from backend.models import HistoricalFigure
+    from backend.vector.chroma_client import get_active_collection_name
+    from backend.vector.retrieval_cache import ContextVersion
+
+    db = SessionLocal()
+    try:
+        popular = top_first_turn_questions(db, per_figure=args.per_figure, min_count=args.min_count)
+    finally:
+        db.close()
+    questions = [q for figure_questions in popular.values() for q in figure_questions]
+    if not questions:
+        print("No first-turn questions met --min-count; nothing to generate.")
+        return
+    print(f"Found {len(questions)} popular questions across {len(popular)} figures")
+
+    fig_db = FigureSessionLocal()
+    try:
+        personas = {
+            f.slug: f.persona_prompt
+            for f in fig_db.query(HistoricalFigure).filter(HistoricalFigure.slug.in_(list(popular))).all()
+        }
+    finally:
+        fig_db.close()
+
+    if args.mock:
+        llm, retrieve, embed = MockLLM(), None, None
+    else:
+        from backend.vector.context_retriever import search_figure_context
+        from backend.vector.embedding_provider import get_query_embeddings
+        llm, embed = OpenAILLM(args.model), get_query_embeddings
+
+        def retrieve(question, figure_slug):
+            return search_figure_context(question, figure_slug, top_k=CONTEXT_CANDIDATES, include_embeddings=True)
+
+    start = time.perf_counter()
+    answers = asyncio.run(pregenerate_answers(
+        questions, personas, llm, retrieve, args.concurrency, ContextVersion().current(),
+        get_active_collection_name()
+    ))
+    print(f"Generated {len(answers)}/{len(questions)} answers in {time.perf_counter() - start:.1f}s")
+    write_warm_answers(answers, output, embed)
+
+
+if __name__ == "__main__":
+    main()
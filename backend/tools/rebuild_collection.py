@@ -0,0 +1,182 @@
+"""
+rebuild_collection.py
+
+Blue/green rebuild of the figure context collection. Builds a fresh, versioned
+collection next to the live one, validates it, then repoints the active-collection
+file that chroma_client reads. Running servers warm the new generation in the
+background and switch to it without a cold query. Old generations are deleted
+afterwards, keeping the previously active one for rollback. "Previous" follows the
+activation history recorded next to the pointer, not the generation names, so a
+generation that was rolled back from is the first to go.
+
+    python backend/tools/rebuild_collection.py --workers 4
+    python backend/tools/rebuild_collection.py --rollback   # repoint at the previous generation
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.vector.chroma_client import (
+    COLLECTION_NAME, activation_history, get_active_collection_name, get_chroma_client, hnsw_metadata,
+    set_active_collection, write_activation_history,
+)
+from backend.vector.context_sync import INGEST_DB_BATCH_SIZE, INGEST_WRITE_BATCH_SIZE, sync_collection
+from backend.vector.embedding_provider import DEFAULT_BATCH_SIZE
+
+GENERATION_PREFIX = f"{COLLECTION_NAME}-"
+
+
+class ValidationError(Exception):
+    pass
+
+
+def new_generation_name() -> str:
+    now = time.time()
+    return f"{GENERATION_PREFIX}{time.strftime('%Y%m%d%H%M%S', time.gmtime(now))}{int(now * 1e6) % 1_000_000:06d}"
+
+
+def list_generations(client) -> List[str]:
+    """Collection generations, oldest first. The legacy unversioned collection counts as oldest."""
+    names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+    return ([COLLECTION_NAME] if COLLECTION_NAME in names else []) + \
+        sorted(n for n in names if n.startswith(GENERATION_PREFIX))
+
+
+def generations_by_activation(client, pointer_path: Optional[str] = None) -> List[str]:
+    """
+    Existing generations ordered by when they were last active, oldest first. Generations
+    missing from the history (built before it existed, or rolled back from) come first.
+    """
+    generations = list_generations(client)
+    history = [name for name in activation_history(pointer_path) if name in generations]
+    return [name for name in generations if name not in history] + history
+
+
+def validate_generation(collection, expected_chunks: int, figure_slugs: List[str],
+                        live_count: Optional[int], max_shrink: float):
+    """
+    Refuses a generation that is missing vectors: its count must equal what was written,
+    every figure with context must have chunks, and it may not be more than `max_shrink`
+    smaller than the live collection (a guard against building from a damaged figures.db).
+    """
+    count = collection.count()
+    if count != expected_chunks:
+        raise ValidationError(f"collection holds {count} vectors, expected {expected_chunks}")
+    missing = [slug for slug in figure_slugs
+               if not collection.get(where={"figure_slug": slug}, limit=1, include=[])["ids"]]
+    if missing:
+        raise ValidationError(f"no chunks for {len(missing)} figures, e.g. {missing[:5]}")
+    if live_count and count < (1 - max_shrink) * live_count:
+        raise ValidationError(f"{count} vectors is more than {max_shrink:.0%} below the live {live_count}")
+
+
+def garbage_collect(client, active: str, keep: int = 1, pointer_path: Optional[str] = None) -> List[str]:
+    """Deletes every generation but the active one and the `keep` most recently active before it."""
+    generations = generations_by_activation(client, pointer_path)
+    if active not in generations:
+        return []
+    older = [name for name in generations if name != active]
+    doomed = older[:max(len(older) - keep, 0)]
+    for name in doomed:
+        client.delete_collection(name)
+        print(f"[CHROMA] Deleted old generation '{name}'")
+    return doomed
+
+
+def rebuild(contexts, figure_slugs: List[str], client=None, workers: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+            write_batch_size: int = INGEST_WRITE_BATCH_SIZE, max_shrink: float = 0.2, keep: int = 1,
+            pointer_path: Optional[str] = None, export_numpy: Optional[bool] = None) -> str:
+    """
+    Builds, validates and activates a new generation; returns its name. On failure the
+    new collection is dropped and the live one stays active. The NumPy index is exported
+    if `export_numpy` is set (default: when RETRIEVAL_ENGINE=numpy).
+    """
+    from backend.vector.numpy_index import export_collection_to_numpy_index, numpy_index_enabled
+    from backend.vector.retrieval_cache import bump_context_version
+
+    client = client or get_chroma_client()
+    live_name = get_active_collection_name(pointer_path)
+    live_names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+    live_count = client.get_collection(live_name).count() if live_name in live_names else None
+
+    name = new_generation_name()
+    collection = client.create_collection(name=name, metadata=hnsw_metadata())
+    print(f"[CHROMA] Building generation '{name}' (live: '{live_name}', {live_count or 0} vectors)")
+    try:
+        summary = sync_collection(contexts, collection, workers=workers, batch_size=batch_size,
+                                  write_batch_size=write_batch_size)
+        validate_generation(collection, summary.upserted_chunks, figure_slugs, live_count, max_shrink)
+    except Exception:
+        client.delete_collection(name)
+        raise
+
+    if export_numpy if export_numpy is not None else numpy_index_enabled():
+        export_collection_to_numpy_index(collection)
+    set_active_collection(name, pointer_path)
+    bump_context_version()
+    garbage_collect(client, name, keep, pointer_path)
+    return name
+
+
+def rollback(client=None, pointer_path: Optional[str] = None) -> str:
+    """
+    Repoints at the generation that was active before the current one. The current one
+    is dropped from the history, so the next rebuild collects it first.
+    """
+    client = client or get_chroma_client()
+    generations = generations_by_activation(client, pointer_path)
+    active = get_active_collection_name(pointer_path)
+    if active not in generations or generations.index(active) == 0:
+        raise ValidationError("no earlier generation to roll back to")
+    previous = generations[generations.index(active) - 1]
+    set_active_collection(previous, pointer_path)
+    write_activation_history([name for name in activation_history(pointer_path) if name != active], pointer_path)
+    return previous
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the figure context collection as a new generation.")
+    parser.add_argument("--workers", type=int, default=1, help="Embedding worker processes.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Documents per embedding batch.")
+    parser.add_argument("--write-batch-size", type=int, default=INGEST_WRITE_BATCH_SIZE,
+                        help="Chunks embedded and written to Chroma per round trip.")
+    parser.add_argument("--max-shrink", type=float, default=0.2,
+                        help="Refuse to switch if the new generation is this much smaller than the live one.")
+    parser.add_argument("--keep", type=int, default=1, help="Older generations to keep for rollback.")
+    parser.add_argument("--rollback", action="store_true", help="Repoint at the previous generation and exit.")
+    parser.add_argument("--numpy-index", action="store_true",
+                        help="Export the NumPy index even when RETRIEVAL_ENGINE is not numpy.")
+    args = parser.parse_args()
+    export_numpy = args.numpy_index or None
+
+    if args.rollback:
+        from backend.vector.numpy_index import export_collection_to_numpy_index, numpy_index_enabled
+        from backend.vector.retrieval_cache import bump_context_version
+        previous = rollback()
+        if export_numpy or numpy_index_enabled():
+            export_collection_to_numpy_index(get_chroma_client().get_collection(previous))
+        bump_context_version()
+        sys.exit(0)
+
+    from backend.figures_database import FigureSessionLocal
+    from backend.models import FigureContext
+
+    session = FigureSessionLocal()
+    try:
+        slugs = [slug for (slug,) in session.query(FigureContext.figure_slug)
+                 .filter(FigureContext.content.isnot(None), FigureContext.content != "").distinct() if slug]
+        try:
+            active = rebuild(session.query(FigureContext).yield_per(INGEST_DB_BATCH_SIZE), slugs,
+                             workers=args.workers, batch_size=args.batch_size,
+                             write_batch_size=args.write_batch_size, max_shrink=args.max_shrink, keep=args.keep,
+                             export_numpy=export_numpy)
+        except ValidationError as e:
+            sys.exit(f"⚠️ New generation rejected, live collection unchanged: {e}")
+        print(f"✅ Rebuilt and activated '{active}'")
+    finally:
+        session.close()
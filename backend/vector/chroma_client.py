@@ -1,5 +1,8 @@
 import chromadb
 import os
+import threading
+import time
+from typing import List
 
 # -- Commented to enable render path
 # --- Robust Path Calculation ---
@@ -9,18 +12,247 @@ project_root_dir = os.path.dirname(os.path.dirname(current_dir))
 CHROMA_DATA_PATH = os.path.join(project_root_dir, "data", "chroma_db")"""
 
 #Render path
-CHROMA_DATA_PATH = "/data/chroma_db"
+CHROMA_DATA_PATH = os.getenv("CHROMA_DATA_PATH", "/data/chroma_db")
 
 COLLECTION_NAME = "figure_context_collection"
 
-# Initialize the persistent client with the absolute path
-client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+# Names the collection generation queries go to. backend/tools/rebuild_collection.py
+# builds "{COLLECTION_NAME}-{timestamp}" generations and repoints this file once a
+# new one is validated; without the file the base COLLECTION_NAME is used. Every
+# activation is also recorded in "{ACTIVE_COLLECTION_FILE}.history", which rollback
+# and garbage collection follow instead of the generation names.
+ACTIVE_COLLECTION_FILE = os.getenv("ACTIVE_COLLECTION_FILE", os.path.join(CHROMA_DATA_PATH, "active_collection"))
+# After a failed switch to a generation, wait this long before trying it again.
+SWITCH_RETRY_SECONDS = float(os.getenv("CHROMA_SWITCH_RETRY_SECONDS", "60"))
+
+# HNSW index settings for the collection (Chroma's own defaults unless overridden).
+# space, M and construction_ef are fixed when a collection is created, so changing
+# them means re-ingesting into a fresh collection; search_ef is applied on connect.
+# backend/tools/hnsw_sweep.py measures the recall/latency trade-off for our corpus.
+HNSW_SPACE = os.getenv("CHROMA_HNSW_SPACE", "l2")
+HNSW_M = int(os.getenv("CHROMA_HNSW_M", "16"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "100"))
+HNSW_SEARCH_EF = int(os.getenv("CHROMA_HNSW_SEARCH_EF", "100"))
+
+# The client and collection handle are created once per process and reused by every
+# query; reset_figure_context_collection() drops them so the next call reconnects.
+_client = None
+_collection = None
+_collection_name = None
+_switching_to = None
+_failed_switch = {"name": None, "at": 0.0}
+_pointer = {"mtime": None, "name": COLLECTION_NAME}
+_lock = threading.Lock()
+warmup_state = {"status": "cold", "seconds": None, "error": None}
+
+
+def get_chroma_client():
+    """Returns the process-wide persistent client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+    return _client
+
+
+def hnsw_metadata(space: str = HNSW_SPACE, m: int = HNSW_M, construction_ef: int = HNSW_CONSTRUCTION_EF,
+                  search_ef: int = HNSW_SEARCH_EF) -> dict:
+    """Collection metadata carrying the HNSW settings, for get_or_create_collection."""
+    return {"hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef}
+
+
+# hnsw:* metadata keys and their names in a collection's configuration_json["hnsw"].
+_HNSW_CONFIGURATION_KEYS = {"hnsw:space": "space", "hnsw:M": "max_neighbors",
+                            "hnsw:construction_ef": "ef_construction", "hnsw:search_ef": "ef_search"}
+
+
+def collection_hnsw_settings(collection) -> dict:
+    """
+    The HNSW settings a collection was built with, as hnsw:* keys. Collections created
+    without metadata (like the legacy one) only carry them in configuration_json.
+    """
+    metadata = collection.metadata or {}
+    configured = (getattr(collection, "configuration_json", None) or {}).get("hnsw") or {}
+    settings = {}
+    for key, config_key in _HNSW_CONFIGURATION_KEYS.items():
+        if key in metadata:
+            settings[key] = metadata[key]
+        elif config_key in configured:
+            settings[key] = configured[config_key]
+    return settings
+
+
+def apply_hnsw_settings(collection, settings: dict = None):
+    """
+    Brings an existing collection's search_ef in line with the configured value and
+    warns when its build-time settings differ from the configuration.
+    """
+    settings = settings or hnsw_metadata()
+    current = collection_hnsw_settings(collection)
+    fixed = [key for key in ("hnsw:space", "hnsw:M", "hnsw:construction_ef")
+             if key in current and current[key] != settings[key]]
+    if fixed:
+        print(f"[CHROMA] Collection '{collection.name}' was built with "
+              f"{ {key: current[key] for key in fixed} }; configured "
+              f"{ {key: settings[key] for key in fixed} }. Rebuild the collection to apply them.")
+
+    ef_search = (getattr(collection, "configuration_json", None) or {}).get("hnsw", {}).get("ef_search")
+    if ef_search is not None and ef_search != settings["hnsw:search_ef"]:
+        collection.modify(configuration={"hnsw": {"ef_search": settings["hnsw:search_ef"]}})
+        print(f"[CHROMA] search_ef {ef_search} -> {settings['hnsw:search_ef']}")
+    return collection
+
+
+def get_active_collection_name(path: str = None) -> str:
+    """Reads the active generation from the pointer file, re-reading only when its mtime changes."""
+    path = path or ACTIVE_COLLECTION_FILE
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return COLLECTION_NAME
+    if (path, mtime) != _pointer["mtime"]:
+        with open(path) as f:
+            _pointer.update(mtime=(path, mtime), name=f.read().strip() or COLLECTION_NAME)
+    return _pointer["name"]
+
+
+def _write_atomically(path: str, text: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def activation_history(path: str = None) -> List[str]:
+    """Generations in the order they were last activated, oldest first."""
+    try:
+        with open(f"{path or ACTIVE_COLLECTION_FILE}.history") as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def write_activation_history(names: List[str], path: str = None):
+    _write_atomically(f"{path or ACTIVE_COLLECTION_FILE}.history", "".join(f"{n}\n" for n in names))
+
+
+def set_active_collection(name: str, path: str = None):
+    """Atomically repoints every server process at another collection generation."""
+    path = path or ACTIVE_COLLECTION_FILE
+    write_activation_history([n for n in activation_history(path) if n != name] + [name], path)
+    _write_atomically(path, name)
+    print(f"[CHROMA] Active collection is now '{name}'")
+
+
+def _open_collection(name: str):
+    """
+    Opens a collection by name. Only the legacy COLLECTION_NAME is created when missing;
+    a versioned generation that does not exist raises instead of coming up empty.
+    """
+    client = get_chroma_client()
+    if name == COLLECTION_NAME:
+        return apply_hnsw_settings(client.get_or_create_collection(name=name, metadata=hnsw_metadata()))
+    return apply_hnsw_settings(client.get_collection(name=name))
+
+
+def served_collection_name() -> str:
+    """
+    The generation this process is querying: the open handle's, or the pointer's before
+    the first query. It lags the pointer while a new generation warms, so caches keyed
+    on it never mix results from two generations.
+    """
+    return _collection_name or get_active_collection_name()
+
+
+def _warm(collection):
+    """Queries with one stored vector so the HNSW index is loaded before real traffic."""
+    if collection.count():
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        collection.query(query_embeddings=[list(sample[0])], n_results=1)
+
+
+def _switch_to(name: str):
+    global _collection, _collection_name, _switching_to
+    try:
+        started = time.perf_counter()
+        collection = _open_collection(name)
+        _warm(collection)
+        with _lock:
+            _collection, _collection_name = collection, name
+        print(f"[CHROMA] Switched to collection '{name}' (warmed in {time.perf_counter() - started:.2f}s)")
+    except Exception as e:
+        print(f"[CHROMA] Could not switch to collection '{name}', retrying in {SWITCH_RETRY_SECONDS:g}s: {e}")
+        with _lock:
+            _failed_switch.update(name=name, at=time.monotonic())
+    finally:
+        with _lock:
+            _switching_to = None
+
 
 def get_figure_context_collection():
     """
     Returns the singleton instance of the ChromaDB collection for figure context.
-    It will create the collection if it doesn't already exist.
+    The legacy collection is created if it doesn't already exist; a versioned generation
+    must have been built by rebuild_collection.
+
+    When the active-collection pointer moves to a new generation, the new collection is
+    opened and warmed on a background thread while queries keep using the current one,
+    so a rebuild never puts a cold index in front of visitors. If that fails, the current
+    one stays in use and the switch is retried after SWITCH_RETRY_SECONDS.
+    """
+    global _collection, _collection_name, _switching_to
+    name = get_active_collection_name()
+    if _collection is None:
+        get_chroma_client()  # outside _lock, which it takes itself on first use
+        with _lock:
+            if _collection is None:
+                _collection = _open_collection(name)
+                _collection_name = name
+    elif _collection_name is not None and name != _collection_name and _switching_to != name:
+        with _lock:
+            backing_off = (_failed_switch["name"] == name
+                           and time.monotonic() - _failed_switch["at"] < SWITCH_RETRY_SECONDS)
+            start = _switching_to != name and not backing_off
+            if start:
+                _switching_to = name
+        if start:
+            threading.Thread(target=_switch_to, args=(name,), name="chroma-switch", daemon=True).start()
+    return _collection
+
+
+def reset_figure_context_collection():
+    """Forgets the cached client and collection so the next query reconnects."""
+    global _client, _collection, _collection_name
+    with _lock:
+        _collection = None
+        _collection_name = None
+        _client = None
+        _failed_switch.update(name=None, at=0.0)
+
+
+def warm_up_collection(dimension: int):
+    """
+    Runs one throwaway query so the HNSW index is read from disk into memory
+    before the first visitor asks anything.
     """
-    # This now creates the collection if it's missing, preventing the crash.
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
-    return collection
\ No newline at end of file
+    warmup_state["status"] = "warming"
+    started = time.perf_counter()
+    try:
+        collection = get_figure_context_collection()
+        if collection.count():
+            collection.query(query_embeddings=[[0.0] * dimension], n_results=1)
+    except Exception as e:
+        print(f"[CHROMA] Warm-up query failed: {e}")
+        warmup_state.update(status="failed", error=str(e))
+        return
+
+    warmup_state.update(status="ready", seconds=round(time.perf_counter() - started, 2), error=None)
+    print(f"[CHROMA] Collection warmed up in {warmup_state['seconds']}s")
+
+
+def start_background_warmup(dimension: int) -> threading.Thread:
+    thread = threading.Thread(target=warm_up_collection, args=(dimension,), name="chroma-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,137 @@
+# backend/vector/chunking.py
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List
+
+# MiniLM truncates input at 256 word pieces; chunks stay below that with some headroom
+# because approx_token_count slightly undercounts rare words that split into pieces.
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+# Bump when the splitting rules change so stored chunks are rebuilt on the next sync.
+CHUNKER_VERSION = "2"
+
+# Split after sentence-ending punctuation, or after a closing quote/bracket that follows it,
+# so the closer stays with its sentence.
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|(?<=[.!?][\"')\]])\s+|\n\s*\n")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def approx_token_count(text: str) -> int:
+    """Counts words and punctuation marks, a close proxy for word-piece tokens."""
+    return len(_TOKEN_RE.findall(text or ""))
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits on sentence-ending punctuation and blank lines."""
+    return [s.strip() for s in _SENTENCE_END_RE.split(text or "") if s and s.strip()]
+
+
+def _split_long_sentence(sentence: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    pieces, current = [], []
+    for word in sentence.split():
+        if current and count_tokens(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+               count_tokens: Callable[[str], int] = approx_token_count) -> List[str]:
+    """
+    Packs whole sentences into chunks of at most `max_tokens`. Each chunk after the
+    first starts with the trailing sentences of the previous one, up to `overlap_tokens`,
+    so a fact spanning a boundary is still retrievable. Sentences longer than a chunk
+    are split on word boundaries.
+    """
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    sentences = []
+    for sentence in split_sentences(text):
+        if count_tokens(sentence) > max_tokens:
+            sentences.extend(_split_long_sentence(sentence, max_tokens, count_tokens))
+        else:
+            sentences.append(sentence)
+
+    chunks: List[str] = []
+    current: List[tuple] = []  # (sentence, tokens)
+    current_tokens = 0
+    for sentence in sentences:
+        tokens = count_tokens(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(s for s, _ in current))
+            carried, carried_tokens = [], 0
+            for s, t in reversed(current):
+                if carried_tokens + t > overlap_tokens or carried_tokens + t + tokens > max_tokens:
+                    break
+                carried.insert(0, (s, t))
+                carried_tokens += t
+            current, current_tokens = carried, carried_tokens
+        current.append((sentence, tokens))
+        current_tokens += tokens
+
+    if current:
+        chunks.append(" ".join(s for s, _ in current))
+    return chunks
+
+
+def context_hash(context, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> str:
+    """
+    Fingerprint of everything a context's chunks are derived from, including the
+    chunking settings, so changing either re-chunks the context on the next sync.
+    """
+    parts = [context.figure_slug or "", context.source_name or "", context.content or "",
+             f"{max_tokens}:{overlap_tokens}:{CHUNKER_VERSION}"]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Chunk:
+    chunk_id: str
+    figure_slug: str
+    context_id: int
+    chunk_index: int
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+
+def chunk_context(context, max_tokens: int = CHUNK_MAX_TOKENS,
+                  overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Chunk]:
+    """
+    Splits one FigureContext into chunks. Ids are "{context_id}-{chunk_index}", and the
+    metadata carries the parent context id and its context_hash so results can be
+    traced back to their row and stale chunks detected.
+    """
+    texts = chunk_text(context.content, max_tokens, overlap_tokens)
+    content_hash = context_hash(context, max_tokens, overlap_tokens)
+    return [
+        Chunk(
+            chunk_id=f"{context.id}-{index}",
+            figure_slug=context.figure_slug,
+            context_id=context.id,
+            chunk_index=index,
+            text=text,
+            metadata={
+                "figure_slug": context.figure_slug,
+                "context_id": context.id,
+                "chunk_index": index,
+                "chunk_count": len(texts),
+                "source_name": context.source_name or "",
+                "context_hash": content_hash,
+            },
+        )
+        for index, text in enumerate(texts)
+    ]
+
+
+def chunk_contexts(contexts: Iterable, max_tokens: int = CHUNK_MAX_TOKENS,
+                   overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Chunk]:
+    chunks = []
+    for context in contexts:
+        if context.content:
+            chunks.extend(chunk_context(context, max_tokens, overlap_tokens))
+    return chunks
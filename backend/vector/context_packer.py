@@ -0,0 +1,94 @@
+# backend/vector/context_packer.py
+
+import os
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from backend.token_budget import count_tokens as count_prompt_tokens
+from backend.vector.lexical_index import tokenize
+
+# How many chunks to retrieve before packing, and how many tokens of them may be sent.
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "12"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+# Results further than this cosine distance from the question are dropped outright. Off by
+# default: similarity ranges differ a lot between embedding providers, so set it per provider
+# only after checking it with backend/tools/eval_context_packing.py.
+CONTEXT_MAX_DISTANCE = float(os.environ["CONTEXT_MAX_DISTANCE"]) if os.getenv("CONTEXT_MAX_DISTANCE") else None
+# Maximal marginal relevance trade-off: 1.0 ranks on relevance only, 0.0 on novelty only.
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# A candidate this similar to an already packed chunk is a duplicate and never sent.
+# Token overlap runs lower than embedding similarity for the same pair of texts.
+DUPLICATE_SIMILARITY = float(os.getenv("CONTEXT_DUPLICATE_SIMILARITY", "0.9"))
+LEXICAL_DUPLICATE_SIMILARITY = 0.6
+
+
+def _similarity(a: dict, b: dict) -> tuple:
+    """Returns (similarity, duplicate threshold) using embeddings when both have them."""
+    if a.get("embedding") is not None and b.get("embedding") is not None:
+        va = np.asarray(a["embedding"], dtype=np.float32)
+        vb = np.asarray(b["embedding"], dtype=np.float32)
+        norm = float(np.linalg.norm(va) * np.linalg.norm(vb))
+        return (float(va @ vb) / norm if norm else 0.0), DUPLICATE_SIMILARITY
+    ta, tb = set(tokenize(a["content"])), set(tokenize(b["content"]))
+    union = ta | tb
+    return (len(ta & tb) / len(union) if union else 1.0), LEXICAL_DUPLICATE_SIMILARITY
+
+
+def pack_context(candidates: List[dict], token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 max_distance: Optional[float] = CONTEXT_MAX_DISTANCE, mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+                 count_tokens: Callable[[str], int] = count_prompt_tokens) -> List[dict]:
+    """
+    Chooses which retrieved chunks go into the prompt.
+
+    Candidates further than `max_distance` are dropped, then chunks are picked greedily
+    by maximal marginal relevance: relevance to the question (1 - distance, or rank for
+    BM25 results that have no distance) minus similarity to chunks already picked.
+    Near-duplicates are skipped entirely, and a chunk that does not fit the remaining
+    `token_budget` is passed over in favour of smaller ones.
+
+    Args:
+        candidates: Retrieval results, best first, as {"content", "metadata"} dicts with
+            optional "distance" and "embedding".
+
+    Returns:
+        The packed results in the order they were chosen.
+    """
+    pool = []
+    for rank, candidate in enumerate(candidates):
+        if not candidate.get("content"):
+            continue
+        distance = candidate.get("distance")
+        if distance is not None and max_distance is not None and distance > max_distance:
+            continue
+        relevance = 1.0 - distance if distance is not None else 1.0 - rank / max(len(candidates), 1)
+        pool.append((candidate, relevance, count_tokens(candidate["content"])))
+
+    packed: List[dict] = []
+    remaining = token_budget
+    while pool and remaining > 0:
+        best, best_score, survivors = None, None, []
+        for item in pool:
+            candidate, relevance, tokens = item
+            redundancy = 0.0
+            duplicate = False
+            for chosen in packed:
+                similarity, threshold = _similarity(candidate, chosen)
+                redundancy = max(redundancy, similarity)
+                duplicate = duplicate or similarity >= threshold
+            if duplicate or tokens > remaining:
+                continue
+            survivors.append(item)
+            score = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = item, score
+        if best is None:
+            break
+        packed.append(best[0])
+        remaining -= best[2]
+        pool = [item for item in survivors if item is not best]
+    return packed
+
+
+def format_context(chunks: List[dict]) -> str:
+    return "\n\n".join(chunk["content"] for chunk in chunks)
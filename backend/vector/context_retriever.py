@@ -1,37 +1,312 @@
-from backend.vector.chroma_client import get_figure_context_collection
-from backend.vector.embedding_provider import get_embedding
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 
-def search_figure_context(query: str, figure_slug: str, top_k: int = 5) -> list[dict]:
+from backend.vector.chroma_client import (
+    collection_hnsw_settings, get_figure_context_collection, reset_figure_context_collection,
+    served_collection_name,
+)
+from backend.vector.embedding_batcher import batcher as embedding_batcher
+from backend.vector.embedding_provider import get_query_embedding, get_query_embeddings
+from backend.vector.lexical_index import get_lexical_index
+from backend.vector.numpy_index import get_numpy_index
+from backend.vector.retrieval_cache import retrieval_cache
+
+# "chroma" queries the Chroma collection; "numpy" does exact search over the
+# memory-mapped per-figure matrices written by the ingest tools.
+RETRIEVAL_ENGINE = os.getenv("RETRIEVAL_ENGINE", "chroma").lower()
+
+# "dense" uses embeddings, "lexical" uses the BM25 index only (no embedding model is
+# loaded), "hybrid" runs both and fuses them with reciprocal rank fusion.
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense").lower()
+if RETRIEVAL_MODE not in RETRIEVAL_MODES:
+    print(f"⚠️ [RETRIEVAL] RETRIEVAL_MODE '{RETRIEVAL_MODE}' is not one of {RETRIEVAL_MODES}; searches will fail")
+RRF_K = 60
+
+# Vector search, BM25 scoring and Chroma's SQLite reads are blocking; async handlers run
+# them here so the event loop stays free. The bound caps how many run at once per process.
+RETRIEVAL_EXECUTOR_WORKERS = int(os.getenv("RETRIEVAL_EXECUTOR_WORKERS", "4"))
+retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_EXECUTOR_WORKERS, thread_name_prefix="retrieval")
+
+
+def query_collection(**query_kwargs) -> dict:
+    """
+    Runs collection.query on the cached collection handle. If the query fails the
+    handle is dropped and the query retried once on a fresh connection.
+    """
+    try:
+        return get_figure_context_collection().query(**query_kwargs)
+    except Exception as e:
+        print(f"[CHROMA] Query failed ({e}); reconnecting and retrying once")
+        reset_figure_context_collection()
+        return get_figure_context_collection().query(**query_kwargs)
+
+
+def _cosine_distance(distance: float, space: str) -> float:
+    """
+    Converts a Chroma distance to cosine distance (1 - cosine similarity). Every
+    embedding provider returns unit vectors, where squared L2 is twice the cosine
+    distance and inner-product distance already equals it.
+    """
+    return distance / 2.0 if space == "l2" else distance
+
+
+def _chroma_results(response: dict, row: int, include_embeddings: bool) -> list[dict]:
+    space = collection_hnsw_settings(get_figure_context_collection()).get("hnsw:space", "l2")
+    vectors = np.asarray(response["embeddings"][row], dtype=np.float32) if include_embeddings else None
+    results = []
+    for j, (doc, meta) in enumerate(zip(response["documents"][row], response["metadatas"][row])):
+        result = {"content": doc, "metadata": meta,
+                  "distance": round(_cosine_distance(float(response["distances"][row][j]), space), 6)}
+        if include_embeddings:
+            result["embedding"] = vectors[j]
+        results.append(result)
+    return results
+
+
+def _result_id(result: dict) -> Optional[str]:
+    """The chunk id ("{context_id}-{chunk_index}") a result was stored under, if its metadata has it."""
+    meta = result.get("metadata") or {}
+    if meta.get("context_id") is None or meta.get("chunk_index") is None:
+        return None
+    return f"{meta['context_id']}-{meta['chunk_index']}"
+
+
+def fetch_embeddings(ids: List[str]) -> Dict[str, np.ndarray]:
+    """Stored document vectors by chunk id, as float32 rows. Never cached."""
+    if not ids:
+        return {}
+    if RETRIEVAL_ENGINE == "numpy":
+        return get_numpy_index().embeddings_for(ids)
+    page = get_figure_context_collection().get(ids=ids, include=["embeddings"])
+    vectors = np.asarray(page["embeddings"], dtype=np.float32)
+    return dict(zip(page["ids"], vectors))
+
+
+def with_embeddings(results: list[dict]) -> list[dict]:
+    """
+    Copies of `results` carrying each document's "embedding", looked up by id in one
+    call. Used for cached results, which are stored without their vectors. If the
+    lookup fails the results come back as they are; the packer then compares text.
+    """
+    ids = {i: _result_id(r) for i, r in enumerate(results) if r.get("embedding") is None}
+    try:
+        vectors = fetch_embeddings([id_ for id_ in ids.values() if id_])
+    except Exception as e:
+        print(f"[CHROMA] Could not fetch embeddings for cached results: {e}")
+        return results
+    return [{**r, "embedding": vectors[ids[i]]} if ids.get(i) in vectors else r for i, r in enumerate(results)]
+
+
+def _cacheable(results: list[dict]) -> list[dict]:
+    # Vectors stay out of the retrieval cache: at 12 candidates per turn they would
+    # outweigh everything else in it many times over.
+    return [{k: v for k, v in r.items() if k != "embedding"} if "embedding" in r else r for r in results]
+
+
+def _query_include(include_embeddings: bool) -> list:
+    return ["documents", "metadatas", "distances"] + (["embeddings"] if include_embeddings else [])
+
+
+def search_by_embedding(query_embedding: List[float], figure_slug: str, top_k: int = 5,
+                        include_embeddings: bool = False) -> list[dict]:
+    """
+    Runs the vector search for an already-embedded query against the configured engine.
+    Results carry their cosine "distance" to the query, and each document's "embedding"
+    (float32) when include_embeddings is set. Bypasses the retrieval cache.
+    """
+    if RETRIEVAL_ENGINE == "numpy":
+        results = get_numpy_index().search(query_embedding, figure_slug, top_k, include_embeddings)
+        print(f"[NUMPY-INDEX] Retrieved {len(results)} documents for figure_slug: '{figure_slug}'")
+        return results
+
+    results = query_collection(
+        query_embeddings=[query_embedding],
+        where={"figure_slug": figure_slug},
+        n_results=top_k,
+        include=_query_include(include_embeddings)
+    )
+
+    print(f"[CHROMA] Retrieved {len(results['documents'][0])} documents")
+
+    return _chroma_results(results, 0, include_embeddings)
+
+
+def fuse_results(dense: list[dict], lexical: list[dict], top_k: int) -> list[dict]:
+    """
+    Reciprocal rank fusion of dense and BM25 results, matched on document text.
+    """
+    scores, docs = {}, {}
+    for results in (dense, lexical):
+        for rank, result in enumerate(results):
+            key = result["content"]
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            docs.setdefault(key, result)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    # BM25 scores are not comparable with fused ranks; dense distance/embedding are kept.
+    return [{k: v for k, v in docs[key].items() if k != "score"} for key in ranked]
+
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    """The mode to search with; an unknown one (e.g. a typo in RETRIEVAL_MODE) is an error, not dense."""
+    resolved = (mode or RETRIEVAL_MODE).lower()
+    if resolved not in RETRIEVAL_MODES:
+        source = "mode" if mode else "RETRIEVAL_MODE"
+        raise ValueError(f"Unknown retrieval {source} '{resolved}'; expected one of {', '.join(RETRIEVAL_MODES)}")
+    return resolved
+
+
+def _cache_key(query: str, figure_slug: str, top_k: int, mode: str) -> tuple:
+    engine = "bm25" if mode == "lexical" else RETRIEVAL_ENGINE
+    return retrieval_cache.key(f"{engine}:{mode}", figure_slug, top_k, query, served_collection_name())
+
+
+def _lexical_search(query: str, figure_slug: str, top_k: int) -> list[dict]:
+    results = get_lexical_index().search(query, figure_slug, top_k)
+    print(f"[LEXICAL] Retrieved {len(results)} documents for figure_slug: '{figure_slug}'")
+    return results
+
+
+def _with_mode(mode: str, query: str, figure_slug: str, top_k: int, dense: list[dict]) -> list[dict]:
+    if mode == "hybrid":
+        return fuse_results(dense, _lexical_search(query, figure_slug, top_k), top_k)
+    return dense
+
+
+def search_figure_context(query: str, figure_slug: str, top_k: int = 5,
+                          query_embedding: Optional[List[float]] = None,
+                          mode: Optional[str] = None, include_embeddings: bool = False) -> list[dict]:
     """
-    Search the Chroma vector store for context chunks most relevant to the query,
-    filtered by a specific historical figure's slug.
+    Search the vector store for context chunks most relevant to the query,
+    filtered by a specific historical figure's slug. Uses Chroma, or the in-memory
+    NumPy index when RETRIEVAL_ENGINE=numpy; both return the same shape.
+
+    Repeated questions are answered from the retrieval cache, which is cleared
+    whenever the ingest tools stamp a new content version.
 
     Args:
         query (str): The user's question or statement.
         figure_slug (str): Slug of the historical figure (e.g., "richard-iii").
         top_k (int): Number of most relevant results to return.
+        query_embedding (list[float], optional): Pre-computed embedding of the query,
+            e.g. from the async micro-batcher. Embedded here when omitted.
+        mode (str, optional): "dense", "lexical" (BM25, no embedding model needed) or
+            "hybrid" (both, fused). Defaults to RETRIEVAL_MODE.
+        include_embeddings (bool): Attach each result's "embedding" (float32), e.g. for the
+            context packer's redundancy check. Cached results have their vectors looked up
+            by id; the cache itself never holds them.
 
     Returns:
         List[dict]: A list of matching documents with their metadata.
     """
     print(f"[CHROMA] Queried for: '{query}' | figure_slug: '{figure_slug}'")
-    collection = get_figure_context_collection()
-    query_embedding = get_embedding(query)
+    mode = _resolve_mode(mode)
+    key = _cache_key(query, figure_slug, top_k, mode)
+    cached = retrieval_cache.get(key)
+    if cached is not None:
+        return with_embeddings(cached) if include_embeddings and mode != "lexical" else cached
 
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        where={"figure_slug": figure_slug},
-        n_results=top_k
-    )
+    if mode == "lexical":
+        results = _lexical_search(query, figure_slug, top_k)
+    else:
+        if query_embedding is None:
+            query_embedding = get_query_embedding(query)
+        dense = search_by_embedding(query_embedding, figure_slug, top_k, include_embeddings=include_embeddings)
+        results = _with_mode(mode, query, figure_slug, top_k, dense)
 
+    retrieval_cache.put(key, _cacheable(results))
+    return with_embeddings(results) if include_embeddings and mode != "lexical" else results
 
-    print(f"[CHROMA] Retrieved {len(results['documents'][0])} documents")
 
-    return [
-        {
-            "content": doc,
-            "metadata": meta
-        }
-        for doc, meta in zip(results["documents"][0], results["metadatas"][0])
-    ]
\ No newline at end of file
+async def search_figure_context_async(query: str, figure_slug: str, top_k: int = 5,
+                                      mode: Optional[str] = None, include_embeddings: bool = False) -> list[dict]:
+    """
+    Async entry point for route handlers: checks the retrieval cache before doing any
+    work, embeds cache misses through the cross-request micro-batcher, and runs the
+    blocking search on the bounded retrieval executor instead of the event loop.
+    """
+    mode = _resolve_mode(mode)
+    key = _cache_key(query, figure_slug, top_k, mode)
+    loop = asyncio.get_running_loop()
+    cached = retrieval_cache.get(key)
+    if cached is not None:
+        if include_embeddings and mode != "lexical":
+            return await loop.run_in_executor(retrieval_executor, with_embeddings, cached)
+        return cached
+
+    if mode == "lexical":
+        results = await loop.run_in_executor(retrieval_executor, _lexical_search, query, figure_slug, top_k)
+    else:
+        query_embedding = await embedding_batcher.embed(query)
+        results = await loop.run_in_executor(
+            retrieval_executor,
+            lambda: _with_mode(mode, query, figure_slug, top_k,
+                               search_by_embedding(query_embedding, figure_slug, top_k,
+                                                   include_embeddings=include_embeddings))
+        )
+
+    retrieval_cache.put(key, _cacheable(results))
+    if include_embeddings and mode == "hybrid" and any(r.get("embedding") is None for r in results):
+        # Hybrid results found only by BM25 come without vectors.
+        results = await loop.run_in_executor(retrieval_executor, with_embeddings, results)
+    return results
+
+
+def search_figure_context_batch(queries: List[Tuple[str, str, int]], mode: Optional[str] = None) -> List[list[dict]]:
+    """
+    Runs many (query, figure_slug, top_k) searches at once.
+
+    Cached results are reused; the remaining queries are embedded in one batch and
+    grouped by figure, so each figure costs a single collection.query call carrying
+    all of its query embeddings. Results come back in the same order as `queries`.
+    """
+    mode = _resolve_mode(mode)
+    results: List[Optional[list[dict]]] = [None] * len(queries)
+    keys = [_cache_key(query, slug, top_k, mode) for query, slug, top_k in queries]
+
+    pending = []
+    for i, key in enumerate(keys):
+        cached = retrieval_cache.get(key)
+        if cached is not None:
+            results[i] = cached
+        elif mode == "lexical":
+            results[i] = _lexical_search(*queries[i])
+            retrieval_cache.put(key, results[i])
+        else:
+            pending.append(i)
+
+    if not pending:
+        return results
+
+    embeddings = get_query_embeddings([queries[i][0] for i in pending])
+    by_slug = {}
+    for i, embedding in zip(pending, embeddings):
+        by_slug.setdefault(queries[i][1], []).append((i, embedding))
+
+    for figure_slug, items in by_slug.items():
+        if RETRIEVAL_ENGINE == "numpy":
+            index = get_numpy_index()
+            group_results = [index.search(embedding, figure_slug, queries[i][2]) for i, embedding in items]
+        else:
+            n_results = max(queries[i][2] for i, _ in items)
+            response = query_collection(
+                query_embeddings=[embedding for _, embedding in items],
+                where={"figure_slug": figure_slug},
+                n_results=n_results,
+                include=_query_include(False)
+            )
+            group_results = [
+                _chroma_results(response, row, False)[:queries[i][2]]
+                for row, (i, _) in enumerate(items)
+            ]
+
+        for (i, _), dense in zip(items, group_results):
+            results[i] = _with_mode(mode, *queries[i], dense)
+            retrieval_cache.put(keys[i], results[i])
+
+    print(f"[CHROMA] Batch of {len(queries)} queries: {len(pending)} searched across {len(by_slug)} figures")
+    return results
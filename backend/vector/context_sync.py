@@ -0,0 +1,129 @@
+# backend/vector/context_sync.py
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from backend.vector.chunking import Chunk, chunk_context, context_hash
+from backend.vector.embedding_provider import DEFAULT_BATCH_SIZE
+from backend.vector.embedding_store import EmbeddingStore
+from backend.vector.parallel_embed import IngestProgress, embedding_pool, iter_embedded_batches
+
+# Chunks embedded and written to Chroma per round trip, and FigureContext rows fetched
+# from figures.db per round trip. Together they bound the ingest's peak memory.
+INGEST_WRITE_BATCH_SIZE = int(os.getenv("INGEST_WRITE_BATCH_SIZE", "256"))
+INGEST_DB_BATCH_SIZE = int(os.getenv("INGEST_DB_BATCH_SIZE", "200"))
+
+
+@dataclass
+class SyncSummary:
+    new_contexts: int = 0
+    changed_contexts: int = 0
+    unchanged_contexts: int = 0
+    removed_contexts: int = 0
+    upserted_chunks: int = 0
+    deleted_chunks: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.upserted_chunks or self.deleted_chunks)
+
+    def __str__(self):
+        return (f"{self.new_contexts} new, {self.changed_contexts} changed, {self.unchanged_contexts} unchanged, "
+                f"{self.removed_contexts} removed contexts; upserted {self.upserted_chunks} chunks, "
+                f"deleted {self.deleted_chunks}")
+
+
+def _indexed_contexts(collection, page_size: int = INGEST_WRITE_BATCH_SIZE):
+    """
+    Pages through the collection's metadata (never its embeddings or documents) and
+    returns ({context_id: (context_hash, chunk_count, [ids])}, [ids with no context]).
+    A context whose chunks disagree on the hash is recorded with hash None.
+    """
+    by_context: Dict[int, tuple] = {}
+    orphans: List[str] = []
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for id_, meta in zip(page["ids"], page["metadatas"]):
+            meta = meta or {}
+            if "context_id" not in meta or "context_hash" not in meta:
+                orphans.append(id_)
+                continue
+            known_hash, count, ids = by_context.get(meta["context_id"], (meta["context_hash"], meta.get("chunk_count"), []))
+            ids.append(id_)
+            by_context[meta["context_id"]] = (known_hash if known_hash == meta["context_hash"] else None, count, ids)
+        if len(page["ids"]) < page_size:
+            return by_context, orphans
+        offset += page_size
+
+
+def sync_collection(contexts: Iterable, collection, workers: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+                    write_batch_size: int = INGEST_WRITE_BATCH_SIZE, store: Optional[EmbeddingStore] = None,
+                    dry_run: bool = False) -> SyncSummary:
+    """
+    Brings the collection in line with the FigureContext rows in `contexts`.
+
+    Chunks are compared with their row by id ("{context_id}-{chunk_index}") and the
+    context_hash in their metadata. Only new or edited rows are re-chunked, embedded and
+    upserted; chunks of deleted rows, the tail chunks of rows that shrank, and vectors
+    from older id schemes ("{id}", "{slug}-{id}") are deleted.
+
+    `contexts` is consumed as a stream (e.g. a yield_per query): changed chunks are
+    buffered up to `write_batch_size`, then embedded and upserted before more rows are
+    read, so memory stays flat however large the table is.
+    """
+    by_context, orphans = _indexed_contexts(collection, write_batch_size)
+    summary = SyncSummary()
+    progress = IngestProgress(None, label="SYNC")
+    pending: List[Chunk] = []
+    live_ids = set()
+
+    def flush(pool):
+        if not dry_run and pending:
+            documents = [chunk.text for chunk in pending]
+            for positions, embeddings in iter_embedded_batches(documents, workers=workers, batch_size=batch_size,
+                                                               store=store, progress=progress, pool=pool):
+                collection.upsert(
+                    ids=[pending[i].chunk_id for i in positions],
+                    embeddings=embeddings,
+                    documents=[documents[i] for i in positions],
+                    metadatas=[pending[i].metadata for i in positions],
+                )
+        summary.upserted_chunks += len(pending)
+        pending.clear()
+
+    with embedding_pool(workers if not dry_run else 1) as pool:
+        for context in contexts:
+            if not context.content:
+                continue
+            live_ids.add(context.id)
+            known_hash, count, existing = by_context.get(context.id, (None, None, []))
+            if existing and known_hash == context_hash(context) and count == len(existing):
+                summary.unchanged_contexts += 1
+                continue
+
+            chunks = chunk_context(context)
+            if existing:
+                summary.changed_contexts += 1
+                new_ids = {chunk.chunk_id for chunk in chunks}
+                orphans.extend(i for i in existing if i not in new_ids)
+            else:
+                summary.new_contexts += 1
+            pending.extend(chunks)
+            if len(pending) >= write_batch_size:
+                flush(pool)
+        flush(pool)
+
+    for context_id, (_, _, ids) in by_context.items():
+        if context_id not in live_ids:
+            summary.removed_contexts += 1
+            orphans.extend(ids)
+
+    summary.deleted_chunks = len(orphans)
+    if not dry_run:
+        for start in range(0, len(orphans), write_batch_size):
+            collection.delete(ids=orphans[start:start + write_batch_size])
+        if summary.upserted_chunks:
+            progress.finish()
+    return summary
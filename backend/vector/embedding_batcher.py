@@ -0,0 +1,125 @@
+# backend/vector/embedding_batcher.py
+
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import List, Optional
+
+from backend.vector import embedding_provider
+
+# Collect queries for up to this many milliseconds, or until this many are waiting.
+BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "2"))
+BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+
+
+class Histogram:
+    """Fixed-bucket histogram; each count is for values <= the bucket's upper bound."""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.total += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+            return {
+                "buckets": dict(zip(labels, self.counts)),
+                "count": self.total,
+                "mean": round(self.sum / self.total, 3) if self.total else 0.0,
+            }
+
+
+class EmbeddingMicroBatcher:
+    """
+    Async queue in front of the embedding provider.
+
+    Concurrent requests each await `embed(query)`; the batcher gathers them for up to
+    `max_wait_ms` or `max_batch` items, runs one batched encode in a worker thread,
+    and resolves every waiting future with its own vector. Cached queries skip the
+    queue entirely.
+    """
+
+    def __init__(self, max_batch: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.wait_ms = Histogram([0.5, 1, 2, 5, 10, 20, 50])
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, query: str) -> List[float]:
+        if not query or not isinstance(query, str):
+            return [0.0] * embedding_provider.get_embedding_dimension()
+
+        key = embedding_provider.query_cache_key(query)
+        cached = embedding_provider.query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, key, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            dispatched = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for _, _, _, enqueued in batch:
+                self.wait_ms.observe((dispatched - enqueued) * 1000)
+
+            queries = [query for query, _, _, _ in batch]
+            try:
+                vectors = await asyncio.to_thread(embedding_provider.provider.encode, queries)
+            except Exception as er:
+                print(f"[EMBED-BATCH] Batch of {len(batch)} failed: {er}")
+                vectors = [[0.0] * embedding_provider.get_embedding_dimension() for _ in batch]
+            else:
+                for (_, key, _, _), vector in zip(batch, vectors):
+                    embedding_provider.query_cache.put(key, vector)
+
+            for (_, _, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.wait_ms.snapshot(),
+        }
+
+
+batcher = EmbeddingMicroBatcher()
@@ -1,58 +1,356 @@
 # backend/vector/embedding_provider.py
 
 import os
-from typing import List
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
 
 # --- Model Configuration ---
 # Read your existing environment variable. Defaults to 'false'.
 USE_OPENAI = os.getenv("USE_OPENAI_EMBEDDING", "false").lower() == "true"
 
+# EMBEDDING_PROVIDER=local|openai|onnx picks the backend explicitly; USE_OPENAI_EMBEDDING still works.
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai" if USE_OPENAI else "local").lower()
+
+# ONNX backend: directory produced by backend/tools/export_onnx_embedder.py.
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "/data/onnx/all-MiniLM-L6-v2")
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "true").lower() == "true"
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "0"))
+
 MODEL_CONFIG = {
     "local": {"model_name": "all-MiniLM-L6-v2", "dimension": 384},
-    "openai": {"model_name": "text-embedding-3-small", "dimension": 1536}
+    "openai": {"model_name": "text-embedding-3-small", "dimension": 1536},
+    "onnx": {"model_name": "all-MiniLM-L6-v2", "dimension": 384},
 }
 
-# --- Initialize the Correct Model ---
-print(f"--- Embedding Provider Initializing ---")
-client = None
-provider_key = "openai" if USE_OPENAI else "local"
+WARMUP_TEXT = "Places in Time warm-up query."
+
+# After a failed client creation (e.g. a network or key problem at startup), wait this
+# long before the next query tries again; until then queries use the fallback vector.
+EMBEDDING_RETRY_SECONDS = float(os.getenv("EMBEDDING_RETRY_SECONDS", "30"))
+
+# Number of texts sent per SentenceTransformer.encode call / OpenAI embeddings request.
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# Query embedding cache limits. Set QUERY_CACHE_MAX_ENTRIES=0 to disable the cache.
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "2048"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "86400"))
+
+
+class EmbeddingProvider:
+    """
+    Lazily loads the configured embedding client on first use (or in a background
+    warm-up thread) so importing this module never pays the torch/model load.
+
+    The `status` attribute moves through 'cold' -> 'warming' -> 'ready', or
+    'failed' if the client could not be created. A failed load is retried by the first
+    call after `retry_seconds`.
+    """
+
+    def __init__(self, provider_key: str):
+        self.provider_key = provider_key
+        self.model_name = MODEL_CONFIG[provider_key]["model_name"]
+        self.dimension = MODEL_CONFIG[provider_key]["dimension"]
+        self.status = "cold"
+        self.error = None
+        self.load_seconds = None
+        self.retry_seconds = EMBEDDING_RETRY_SECONDS
+        self._failed_at = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+
+    @property
+    def model_id(self) -> str:
+        """
+        Identifies the exact vectors this provider produces. The ONNX backend gets its own
+        id because quantized vectors differ slightly from the torch ones.
+        """
+        if self.provider_key == "onnx":
+            return f"{self.model_name}-onnx{'-int8' if ONNX_QUANTIZED else ''}"
+        return self.model_name
+
+    def _create_client(self):
+        # Imports are deferred so the heavy libraries are only loaded when needed.
+        if self.provider_key == "openai":
+            from openai import OpenAI
+            return OpenAI()
+        if self.provider_key == "onnx":
+            from backend.vector.onnx_encoder import OnnxSentenceEncoder
+            return OnnxSentenceEncoder(ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, num_threads=ONNX_NUM_THREADS)
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name)
+
+    def load(self):
+        """
+        Creates the client and runs a warm-up encode. Safe to call from several
+        threads; only the first caller does the work.
+        """
+        if self._client is not None or self._backing_off():
+            return self._client
+
+        with self._lock:
+            if self._client is not None or self._backing_off():
+                return self._client
+
+            self.status = "warming"
+            print(f"--- Embedding Provider Initializing ({self.provider_key}: {self.model_name}) ---")
+            started = time.perf_counter()
+            try:
+                client = self._create_client()
+                if self.provider_key != "openai":
+                    # The first encode allocates the model graph; do it now, not on a visitor's request.
+                    client.encode(WARMUP_TEXT, convert_to_tensor=False)
+            except Exception as e:
+                print(f"FATAL: Could not initialize embedding model client, retrying in "
+                      f"{self.retry_seconds:g}s. Error: {e}")
+                self.status = "failed"
+                self.error = str(e)
+                self._failed_at = time.monotonic()
+                return None
+
+            self._client = client
+            self.error = None
+            self.load_seconds = round(time.perf_counter() - started, 2)
+            self.status = "ready"
+            print(f"--- Embedding Provider Ready in {self.load_seconds}s ---")
+            return self._client
+
+    def _backing_off(self) -> bool:
+        return self.status == "failed" and time.monotonic() - self._failed_at < self.retry_seconds
+
+    def start_background_warmup(self) -> threading.Thread:
+        """
+        Loads the model in a daemon thread so the app can serve requests meanwhile.
+        """
+        thread = threading.Thread(target=self.load, name="embedding-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def get_client(self):
+        return self._client if self._client is not None else self.load()
+
+    def encode(self, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[float]]:
+        """
+        Embeds a list of non-empty strings in one provider call. Raises if the
+        client is unavailable; callers decide how to degrade.
+        """
+        client = self.get_client()
+        if not client:
+            raise RuntimeError(f"Embedding provider '{self.provider_key}' is not available: {self.error}")
+
+        if self.provider_key == "openai":
+            response = client.embeddings.create(
+                input=[text.replace("\n", " ") for text in texts],
+                model=self.model_name
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        return client.encode(texts, batch_size=batch_size, convert_to_tensor=False).tolist()
+
+    def state(self) -> dict:
+        return {
+            "provider": self.provider_key,
+            "model_name": self.model_name,
+            "model_id": self.model_id,
+            "status": self.status,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+def normalize_query(text: str) -> str:
+    """Lower-cases and collapses whitespace so trivially different questions share a cache key."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings with a per-entry TTL.
+
+    Bounded both by entry count and by the bytes held in the float32 vectors;
+    the least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector.tolist()
+                self._remove(key)
+            self.misses += 1
+            return None
 
-try:
-    if USE_OPENAI:
-        client = OpenAI()
-        print(f"Provider: OPENAI (model: {MODEL_CONFIG['openai']['model_name']})")
-    else:
-        client = SentenceTransformer(MODEL_CONFIG['local']['model_name'])
-        print(f"Provider: LOCAL (model: {MODEL_CONFIG['local']['model_name']})")
-except Exception as e:
-    print(f"FATAL: Could not initialize embedding model client. Error: {e}")
-    client = None
+    def put(self, key, vector: List[float]):
+        if self.max_entries <= 0:
+            return
+        packed = array("f", vector)
+        size = packed.itemsize * len(packed)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (packed, time.monotonic() + self.ttl_seconds)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        packed, _ = self._entries.pop(key)
+        self._bytes -= packed.itemsize * len(packed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+provider_key = EMBEDDING_PROVIDER if EMBEDDING_PROVIDER in MODEL_CONFIG else "local"
+provider = EmbeddingProvider(provider_key)
+query_cache = EmbeddingCache(QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL_SECONDS)
 
-print("--- Embedding Provider Ready ---")
 
 def get_embedding_dimension() -> int:
     """Returns the dimension of the currently configured embedding model."""
     return MODEL_CONFIG[provider_key]['dimension']
 
+
 def get_embedding(text: str) -> List[float]:
     """
     Generates an embedding for a single piece of text using the configured provider.
+    The model is loaded on the first call if the background warm-up has not finished.
     """
-    if not client or not text or not isinstance(text, str):
+    if not text or not isinstance(text, str):
         return [0.0] * get_embedding_dimension()
 
     try:
-        if USE_OPENAI:
-            response = client.embeddings.create(
-                input=text.replace("\n", " "),
-                model=MODEL_CONFIG['openai']['model_name']
-            )
-            return response.data[0].embedding
-        else: # Assumes local provider
-            embedding = client.encode(text, convert_to_tensor=False)
-            return embedding.tolist()
+        return provider.encode([text])[0]
     except Exception as er:
         print(f"Error generating embedding for text: '{text[:50]}...'\n{er}")
-        return [0.0] * get_embedding_dimension()
\ No newline at end of file
+        return [0.0] * get_embedding_dimension()
+
+
+def query_cache_key(query: str) -> tuple:
+    return provider.provider_key, provider.model_id, normalize_query(query)
+
+
+def get_query_embedding(query: str) -> List[float]:
+    """
+    Embeds a visitor's question, serving repeats from the in-process LRU cache.
+    Keys include the provider and model so switching models never returns stale vectors.
+    """
+    if not query or not isinstance(query, str):
+        return [0.0] * get_embedding_dimension()
+
+    key = query_cache_key(query)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        embedding = provider.encode([query])[0]
+    except Exception as er:
+        print(f"Error generating embedding for query: '{query[:50]}...'\n{er}")
+        return [0.0] * get_embedding_dimension()
+
+    query_cache.put(key, embedding)
+    return embedding
+
+
+def get_query_embeddings(queries: List[str]) -> List[List[float]]:
+    """
+    Batched form of get_query_embedding(): cached questions are served from the LRU and
+    all the misses are embedded in a single provider call.
+    """
+    dimension = get_embedding_dimension()
+    results: List[Optional[List[float]]] = [None] * len(queries)
+    misses = {}
+    for i, query in enumerate(queries):
+        if not query or not isinstance(query, str):
+            results[i] = [0.0] * dimension
+            continue
+        key = query_cache_key(query)
+        cached = query_cache.get(key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            misses.setdefault(key, []).append(i)
+
+    if misses:
+        texts = [queries[positions[0]] for positions in misses.values()]
+        try:
+            vectors = provider.encode(texts)
+        except Exception as er:
+            print(f"Error generating embeddings for {len(texts)} queries: {er}")
+            vectors = [[0.0] * dimension for _ in texts]
+        else:
+            for key, vector in zip(misses, vectors):
+                query_cache.put(key, vector)
+        for positions, vector in zip(misses.values(), vectors):
+            for i in positions:
+                results[i] = vector
+
+    return results
+
+
+def get_embeddings(texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List[float]]:
+    """
+    Generates embeddings for many texts at once, sending them to the provider in
+    batches of `batch_size`. Empty or non-string entries get a zero vector, so the
+    result always lines up index-for-index with `texts`.
+    """
+    dimension = get_embedding_dimension()
+    results = [[0.0] * dimension for _ in texts]
+    positions = [i for i, text in enumerate(texts) if text and isinstance(text, str)]
+
+    for start in range(0, len(positions), batch_size):
+        batch_positions = positions[start:start + batch_size]
+        try:
+            vectors = provider.encode([texts[i] for i in batch_positions], batch_size=batch_size)
+        except Exception as er:
+            print(f"Error generating embeddings for batch starting at {start}: {er}")
+            continue
+
+        for i, vector in zip(batch_positions, vectors):
+            results[i] = vector
+
+    return results
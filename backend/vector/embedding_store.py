@@ -0,0 +1,136 @@
+# backend/vector/embedding_store.py
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# --- Render Disk path; override with EMBEDDING_STORE_DIR when running locally ---
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "/data/embedding_store")
+
+
+def text_hash(text: str) -> str:
+    """Returns the sha256 hex digest used as the content key for a document."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    On-disk cache of document embeddings keyed by (model name, dimension, sha256 of text).
+
+    The key -> row index lives in SQLite; the vectors themselves are appended to one
+    float32 file per (model, dimension) and read back through a memory map, so
+    looking up thousands of vectors costs a single fancy-index into the page cache.
+    """
+
+    def __init__(self, directory: str = EMBEDDING_STORE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model_name TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (model_name, dimension, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _vector_path(self, model_name: str, dimension: int) -> str:
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        return os.path.join(self.directory, f"{safe_name}-{dimension}.f32")
+
+    def _row_count(self, model_name: str, dimension: int) -> int:
+        path = self._vector_path(model_name, dimension)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // (4 * dimension)
+
+    def get_many(self, model_name: str, dimension: int, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the stored vectors for whichever of `hashes` are present."""
+        if not hashes:
+            return {}
+
+        rows = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = self._conn.execute(
+                    f"SELECT text_hash, row FROM embeddings "
+                    f"WHERE model_name = ? AND dimension = ? AND text_hash IN ({placeholders})",
+                    [model_name, dimension, *chunk],
+                )
+                rows.update(cursor.fetchall())
+            row_count = self._row_count(model_name, dimension)
+
+        rows = {h: r for h, r in rows.items() if r < row_count}
+        if not rows:
+            return {}
+
+        matrix = np.memmap(self._vector_path(model_name, dimension), dtype=np.float32, mode="r",
+                           shape=(row_count, dimension))
+        hits = list(rows.items())
+        vectors = np.asarray(matrix[[r for _, r in hits]])
+        return {h: vectors[i] for i, (h, _) in enumerate(hits)}
+
+    def put_many(self, model_name: str, dimension: int, vectors: Dict[str, List[float]]):
+        """Appends new vectors and records their rows. Existing keys are left untouched."""
+        if not vectors:
+            return
+
+        with self._lock:
+            existing = self._existing_keys(model_name, dimension, list(vectors))
+            new_items = [(h, v) for h, v in vectors.items() if h not in existing]
+            if not new_items:
+                return
+
+            first_row = self._row_count(model_name, dimension)
+            block = np.asarray([v for _, v in new_items], dtype=np.float32).reshape(-1, dimension)
+            # Vectors are written before the index rows, so a crash can only leave unreferenced bytes.
+            with open(self._vector_path(model_name, dimension), "ab") as f:
+                f.write(block.tobytes())
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model_name, dimension, text_hash, row) VALUES (?, ?, ?, ?)",
+                [(model_name, dimension, h, first_row + i) for i, (h, _) in enumerate(new_items)],
+            )
+            self._conn.commit()
+
+    def _existing_keys(self, model_name: str, dimension: int, hashes: List[str]) -> set:
+        found = set()
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = self._conn.execute(
+                f"SELECT text_hash FROM embeddings "
+                f"WHERE model_name = ? AND dimension = ? AND text_hash IN ({placeholders})",
+                [model_name, dimension, *chunk],
+            )
+            found.update(h for (h,) in cursor.fetchall())
+        return found
+
+    def close(self):
+        self._conn.close()
+
+
+_store: Optional[EmbeddingStore] = None
+
+
+def get_embedding_store() -> EmbeddingStore:
+    """Returns the process-wide store, opening it on first use."""
+    global _store
+    if _store is None:
+        _store = EmbeddingStore()
+    return _store
+
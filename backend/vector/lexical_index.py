@@ -0,0 +1,139 @@
+# backend/vector/lexical_index.py
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from backend.vector.retrieval_cache import ContextVersion
+
+# Okapi BM25 parameters.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "had",
+    "has", "have", "he", "her", "his", "how", "i", "in", "is", "it", "its", "me", "my", "of",
+    "on", "or", "she", "that", "the", "their", "them", "they", "this", "to", "was", "were",
+    "what", "when", "where", "which", "who", "why", "will", "with", "you", "your",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class FigureBM25:
+    """BM25 statistics for the documents of a single figure."""
+
+    def __init__(self, documents: List[dict]):
+        self.documents = documents
+        self.doc_lengths = []
+        self.postings: Dict[str, List[tuple]] = {}
+        for doc_id, doc in enumerate(documents):
+            counts = Counter(tokenize(doc["content"]))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+
+        n = len(documents)
+        self.avg_length = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+        # Precompute each document's length normalisation once.
+        self.length_norm = [
+            BM25_K1 * (1 - BM25_B + BM25_B * (length / self.avg_length if self.avg_length else 0.0))
+            for length in self.doc_lengths
+        ]
+
+    def search(self, query: str, top_k: int) -> List[dict]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + self.length_norm[doc_id])
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [
+            {"content": self.documents[doc_id]["content"], "metadata": self.documents[doc_id]["metadata"],
+             "score": round(score, 4)}
+            for doc_id, score in ranked
+        ]
+
+
+class LexicalIndex:
+    """
+    In-memory inverted index per figure_slug over the FigureContext documents.
+
+    Needs no embedding model, so RETRIEVAL_MODE=lexical can run on instances that
+    never load torch or ONNX.
+    """
+
+    def __init__(self, rows: Iterable[dict] = ()):
+        self.figures: Dict[str, FigureBM25] = {}
+        self.version = None
+        self.build(rows)
+
+    def build(self, rows: Iterable[dict]):
+        grouped: Dict[str, List[dict]] = {}
+        for row in rows:
+            if row.get("content"):
+                grouped.setdefault(row["figure_slug"], []).append({
+                    "content": row["content"],
+                    "metadata": {"figure_slug": row["figure_slug"], **(row.get("metadata") or {})},
+                })
+        self.figures = {slug: FigureBM25(docs) for slug, docs in grouped.items()}
+
+    def search(self, query: str, figure_slug: str, top_k: int = 5) -> List[dict]:
+        figure = self.figures.get(figure_slug)
+        if not figure or top_k <= 0:
+            return []
+        return figure.search(query, top_k)
+
+
+def load_context_rows() -> List[dict]:
+    """
+    Reads every FigureContext from figures.db as plain dicts for the index, split into
+    the same chunks the ingest tools embed so hybrid fusion matches on identical text.
+    """
+    from backend.figures_database import FigureSessionLocal
+    from backend.models import FigureContext
+    from backend.vector.chunking import chunk_contexts
+
+    session = FigureSessionLocal()
+    try:
+        return [
+            {"figure_slug": chunk.figure_slug, "content": chunk.text, "metadata": chunk.metadata}
+            for chunk in chunk_contexts(session.query(FigureContext).all())
+        ]
+    finally:
+        session.close()
+
+
+_index: Optional[LexicalIndex] = None
+_lock = threading.Lock()
+_version = ContextVersion()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """
+    Returns the process-wide index, building it from figures.db on first use and
+    rebuilding it whenever the ingest tools stamp a new content version.
+    """
+    global _index
+    version = _version.current()
+    if _index is None or _index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                index = LexicalIndex(load_context_rows())
+                index.version = version
+                _index = index
+                print(f"[LEXICAL] Built BM25 index for {len(index.figures)} figures")
+    return _index
@@ -0,0 +1,248 @@
+# backend/vector/numpy_index.py
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# --- Render Disk path; override with NUMPY_INDEX_DIR when running locally ---
+NUMPY_INDEX_DIR = os.getenv("NUMPY_INDEX_DIR", "/data/vector_index")
+
+EMBEDDINGS_FILE = "embeddings.npy"
+MANIFEST_FILE = "index.json"
+
+
+# Rows read from Chroma per page when exporting the collection.
+EXPORT_PAGE_SIZE = int(os.getenv("NUMPY_EXPORT_PAGE_SIZE", "1000"))
+
+
+def numpy_index_enabled() -> bool:
+    """
+    Only RETRIEVAL_ENGINE=numpy reads the index, so the ingest tools skip the export
+    (a full pass over the collection) on other engines unless asked for it.
+    """
+    return os.getenv("RETRIEVAL_ENGINE", "chroma").lower() == "numpy"
+
+
+def _slug_order(metadatas: List[dict]):
+    """Returns the row order grouping each figure's vectors together, and each slug's [start, end]."""
+    order = sorted(range(len(metadatas)), key=lambda i: (metadatas[i] or {}).get("figure_slug") or "")
+    slugs: Dict[str, List[int]] = {}
+    for row, i in enumerate(order):
+        slug = (metadatas[i] or {}).get("figure_slug") or ""
+        start_end = slugs.setdefault(slug, [row, row])
+        start_end[1] = row + 1
+    return order, slugs
+
+
+def _write_manifest_and_swap(directory: str, tmp_embeddings: str, manifest: dict):
+    tmp_manifest = os.path.join(directory, f".{MANIFEST_FILE}.tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_embeddings, os.path.join(directory, EMBEDDINGS_FILE))
+    # The manifest goes last: readers treat its mtime as the index version.
+    os.replace(tmp_manifest, os.path.join(directory, MANIFEST_FILE))
+
+
+def build_numpy_index(ids: List[str], embeddings, documents: List[str], metadatas: List[dict],
+                      directory: str = NUMPY_INDEX_DIR) -> int:
+    """
+    Writes an exact-search index: one contiguous, L2-normalized float32 matrix with the
+    rows of each figure_slug stored next to each other, plus a JSON manifest holding
+    each slug's row range, the documents and their metadata.
+
+    Files are written under temporary names and swapped in with os.replace, so a
+    running server never reads a half-written index. Returns the number of vectors.
+    """
+    os.makedirs(directory, exist_ok=True)
+    order, slugs = _slug_order(metadatas)
+
+    if ids:
+        matrix = np.asarray(embeddings, dtype=np.float32)[order]
+        matrix /= np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+
+    manifest = {
+        "slugs": slugs,
+        "ids": [ids[i] for i in order],
+        "documents": [documents[i] for i in order],
+        "metadatas": [metadatas[i] for i in order],
+    }
+
+    tmp_embeddings = os.path.join(directory, f".{EMBEDDINGS_FILE}.tmp")
+    with open(tmp_embeddings, "wb") as f:
+        np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+    _write_manifest_and_swap(directory, tmp_embeddings, manifest)
+    return len(ids)
+
+
+def export_collection_to_numpy_index(collection, directory: str = NUMPY_INDEX_DIR,
+                                     page_size: int = EXPORT_PAGE_SIZE) -> int:
+    """
+    Snapshots every vector in a Chroma collection into the NumPy index files.
+
+    Works in two paged passes so embeddings are never all in memory at once: the first
+    reads ids, documents and metadata to fix each row's position, the second streams
+    embeddings straight into a memory-mapped .npy file.
+    """
+    ids, documents, metadatas = [], [], []
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+    if not ids:
+        return build_numpy_index([], [], [], [], directory)
+
+    os.makedirs(directory, exist_ok=True)
+    order, slugs = _slug_order(metadatas)
+    row_of = {ids[i]: row for row, i in enumerate(order)}
+    tmp_embeddings = os.path.join(directory, f".{EMBEDDINGS_FILE}.tmp")
+    matrix = None
+    for offset in range(0, len(ids), page_size):
+        page = collection.get(ids=ids[offset:offset + page_size], include=["embeddings"])
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(tmp_embeddings, mode="w+", dtype=np.float32,
+                                               shape=(len(ids), vectors.shape[1]))
+        matrix[[row_of[id_] for id_ in page["ids"]]] = vectors
+    matrix.flush()
+    del matrix
+
+    manifest = {
+        "slugs": slugs,
+        "ids": [ids[i] for i in order],
+        "documents": [documents[i] for i in order],
+        "metadatas": [metadatas[i] for i in order],
+    }
+    _write_manifest_and_swap(directory, tmp_embeddings, manifest)
+    print(f"[NUMPY-INDEX] Wrote {len(ids)} vectors to {directory}")
+    return len(ids)
+
+
+@dataclass(frozen=True)
+class _IndexSnapshot:
+    """One loaded version of the index. Replaced as a whole, never modified in place."""
+    version: Optional[float] = None
+    matrix: Optional[np.ndarray] = None
+    slugs: Dict[str, List[int]] = field(default_factory=dict)
+    ids: List[str] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[dict] = field(default_factory=list)
+    row_of: Dict[str, int] = field(default_factory=dict)
+
+
+class NumpyFigureIndex:
+    """
+    Exact top-k retrieval over the per-figure matrices.
+
+    The embedding matrix is opened with mmap_mode='r', so every worker process on the
+    host shares the same page-cache copy instead of holding its own. A reload builds a
+    new snapshot and swaps it in with a single assignment; each search reads one
+    snapshot, so it never pairs the new rows with the old matrix or the reverse.
+    """
+
+    def __init__(self, directory: str = NUMPY_INDEX_DIR):
+        self.directory = directory
+        self._snapshot = _IndexSnapshot()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    @property
+    def version(self) -> Optional[float]:
+        return self._snapshot.version
+
+    @property
+    def matrix(self) -> Optional[np.ndarray]:
+        return self._snapshot.matrix
+
+    @property
+    def ids(self) -> List[str]:
+        return self._snapshot.ids
+
+    def load(self):
+        version = os.path.getmtime(self.manifest_path)
+        with open(self.manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        matrix = np.load(os.path.join(self.directory, EMBEDDINGS_FILE), mmap_mode="r")
+
+        self._snapshot = _IndexSnapshot(
+            version=version, matrix=matrix, slugs=manifest["slugs"], ids=manifest["ids"],
+            documents=manifest["documents"], metadatas=manifest["metadatas"],
+            row_of={id_: row for row, id_ in enumerate(manifest["ids"])},
+        )
+        print(f"[NUMPY-INDEX] Loaded {len(manifest['ids'])} vectors for {len(manifest['slugs'])} figures")
+
+    def _current(self) -> _IndexSnapshot:
+        if self._snapshot.matrix is None:
+            self.load()
+        return self._snapshot
+
+    def reload_if_changed(self):
+        try:
+            version = os.path.getmtime(self.manifest_path)
+        except FileNotFoundError:
+            return
+        if version != self.version:
+            self.load()
+
+    def search(self, query_embedding: List[float], figure_slug: str, top_k: int = 5,
+               include_embeddings: bool = False) -> List[dict]:
+        """
+        Returns up to top_k {"content", "metadata", "distance"} results, highest cosine
+        similarity (lowest cosine distance) first, plus each row's "embedding" (a float32
+        view into the mapped matrix) if asked.
+        """
+        snapshot = self._current()
+        span = snapshot.slugs.get(figure_slug)
+        if not span or top_k <= 0:
+            return []
+
+        matrix = snapshot.matrix
+        start, end = span
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[0] != matrix.shape[1]:
+            return []
+
+        scores = matrix[start:end] @ (query / norm)
+        k = min(top_k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+
+        results = []
+        for i in top.tolist():
+            result = {"content": snapshot.documents[start + i], "metadata": snapshot.metadatas[start + i],
+                      "distance": round(1.0 - float(scores[i]), 6)}
+            if include_embeddings:
+                result["embedding"] = matrix[start + i]
+            results.append(result)
+        return results
+
+    def embeddings_for(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored vectors by document id, as float32 views; unknown ids are left out."""
+        snapshot = self._current()
+        return {id_: snapshot.matrix[snapshot.row_of[id_]] for id_ in ids if id_ in snapshot.row_of}
+
+
+_index: Optional[NumpyFigureIndex] = None
+
+
+def get_numpy_index() -> NumpyFigureIndex:
+    """Returns the process-wide index, loading it on first use and after a rebuild."""
+    global _index
+    if _index is None:
+        _index = NumpyFigureIndex()
+        _index.load()
+    else:
+        _index.reload_if_changed()
+    return _index
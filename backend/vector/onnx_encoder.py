@@ -0,0 +1,73 @@
+# backend/vector/onnx_encoder.py
+
+import os
+from typing import List, Union
+
+import numpy as np
+
+# Matches the max_seq_length of the sentence-transformers all-MiniLM-L6-v2 model.
+MAX_SEQ_LENGTH = 256
+
+
+def mean_pool_and_normalize(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Reproduces the sentence-transformers Pooling(mean) + Normalize modules:
+    averages token vectors over the attention mask, then L2-normalizes.
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    pooled = summed / counts
+    norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return (pooled / norms).astype(np.float32)
+
+
+class OnnxSentenceEncoder:
+    """
+    Runs an exported (optionally int8-quantized) MiniLM through ONNX Runtime on CPU.
+
+    Exposes the same `encode()` call shape as SentenceTransformer so the embedding
+    provider can use either interchangeably. Build the model directory with
+    backend/tools/export_onnx_embedder.py.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, num_threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = "model-int8.onnx" if quantized else "model.onnx"
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"ONNX model not found at {model_path}. Run backend/tools/export_onnx_embedder.py first.")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_tensor: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+            feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, feed)[0]
+            outputs.append(mean_pool_and_normalize(token_embeddings, attention_mask))
+
+        embeddings = np.vstack(outputs) if outputs else np.zeros((0, 384), dtype=np.float32)
+        return embeddings[0] if single else embeddings
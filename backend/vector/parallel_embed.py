@@ -0,0 +1,115 @@
+# backend/vector/parallel_embed.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from multiprocessing import get_context
+from typing import Iterator, List, Optional, Tuple
+
+from backend.vector import embedding_provider
+from backend.vector.embedding_store import EmbeddingStore, get_embedding_store, text_hash
+
+
+class IngestProgress:
+    """Prints running document counts and throughput (docs/sec) during ingest."""
+
+    def __init__(self, total: Optional[int], label: str = "INGEST"):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def advance(self, count: int):
+        self.done += count
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        done = f"{self.done}/{self.total}" if self.total is not None else str(self.done)
+        print(f"[{self.label}] {done} docs | {rate:.1f} docs/sec")
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        print(f"[{self.label}] Finished {self.done} docs in {elapsed:.1f}s ({rate:.1f} docs/sec)")
+
+
+def _init_worker(threads_per_worker: int):
+    # Must run before torch/onnxruntime are imported in the worker, so the
+    # workers don't all spin up a thread per core and fight over the CPU.
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)
+    os.environ["MKL_NUM_THREADS"] = str(threads_per_worker)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+
+@contextmanager
+def embedding_pool(workers: int):
+    """
+    Yields a process pool for iter_embedded_batches(pool=...), or None when workers <= 1.
+    Streaming ingest embeds many small windows; sharing one pool across them avoids
+    spawning workers and reloading the model for every window.
+    """
+    if workers <= 1:
+        yield None
+        return
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+        yield pool
+
+
+def _embed_shard(positions: List[int], texts: List[str], batch_size: int) -> Tuple[List[int], List[List[float]]]:
+    # Each worker process lazily loads its own copy of the model on the first shard.
+    return positions, embedding_provider.get_embeddings(texts, batch_size=batch_size)
+
+
+def iter_embedded_batches(texts: List[str], workers: int = 1,
+                          batch_size: int = embedding_provider.DEFAULT_BATCH_SIZE,
+                          store: Optional[EmbeddingStore] = None,
+                          progress: Optional[IngestProgress] = None,
+                          pool: Optional[ProcessPoolExecutor] = None) -> Iterator[Tuple[List[int], List[List[float]]]]:
+    """
+    Embeds `texts` and yields (positions, vectors) batches as soon as each is ready,
+    so the caller can write to Chroma while other batches are still being embedded.
+
+    Vectors already in the embedding store are yielded first without touching the model.
+    The rest are sharded into batches of `batch_size`; with `workers > 1` they run on a
+    process pool (or the given `pool`) and come back in completion order. Only this
+    (parent) process writes to the store, which keeps its SQLite index single-writer.
+    """
+    store = store or get_embedding_store()
+    model_id = embedding_provider.provider.model_id
+    dimension = embedding_provider.get_embedding_dimension()
+
+    hashes = [text_hash(t) for t in texts]
+    cached = store.get_many(model_id, dimension, hashes)
+
+    hit_positions = [i for i, h in enumerate(hashes) if h in cached]
+    for start in range(0, len(hit_positions), batch_size):
+        chunk = hit_positions[start:start + batch_size]
+        if progress:
+            progress.advance(len(chunk))
+        yield chunk, [cached[hashes[i]].tolist() for i in chunk]
+
+    miss_positions = [i for i, h in enumerate(hashes) if h not in cached]
+    print(f"[EMBED-STORE] {len(hit_positions)} cached, {len(miss_positions)} to embed on {workers} worker(s)")
+    shards = [miss_positions[s:s + batch_size] for s in range(0, len(miss_positions), batch_size)]
+
+    def persist(positions, vectors):
+        store.put_many(model_id, dimension, {hashes[i]: v for i, v in zip(positions, vectors) if any(v)})
+        if progress:
+            progress.advance(len(positions))
+
+    if pool is None and workers <= 1:
+        for shard in shards:
+            positions, vectors = _embed_shard(shard, [texts[i] for i in shard], batch_size)
+            persist(positions, vectors)
+            yield positions, vectors
+        return
+
+    with (embedding_pool(workers) if pool is None else nullcontext(pool)) as executor:
+        futures = [executor.submit(_embed_shard, shard, [texts[i] for i in shard], batch_size) for shard in shards]
+        for future in as_completed(futures):
+            positions, vectors = future.result()
+            persist(positions, vectors)
+            yield positions, vectors
+
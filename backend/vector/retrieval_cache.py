@@ -0,0 +1,124 @@
+# backend/vector/retrieval_cache.py
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+from backend.vector.chroma_client import CHROMA_DATA_PATH
+from backend.vector.embedding_provider import normalize_query
+
+# Written by the ingest tools whenever they change the collection; every cached
+# result carries the version it was computed under.
+CONTEXT_VERSION_FILE = os.getenv("CONTEXT_VERSION_FILE", os.path.join(CHROMA_DATA_PATH, "context_version"))
+
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "4096"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "86400"))
+
+
+def bump_context_version(path: str = CONTEXT_VERSION_FILE) -> str:
+    """Stamps a new content version. Call after any ingest that changes the collection."""
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+    print(f"[RETRIEVAL-CACHE] Context version is now {version}")
+    return version
+
+
+class ContextVersion:
+    """Reads the version stamp, re-reading the file only when its mtime changes."""
+
+    def __init__(self, path: str = CONTEXT_VERSION_FILE):
+        self.path = path
+        self._mtime = None
+        self._version = ""
+
+    def current(self) -> str:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return ""
+        if mtime != self._mtime:
+            with open(self.path) as f:
+                self._version = f.read().strip()
+            self._mtime = mtime
+        return self._version
+
+
+class RetrievalCache:
+    """
+    LRU of top-k retrieval results keyed by (engine, figure_slug, top_k, normalized query,
+    collection generation). The whole cache is dropped as soon as the content version changes.
+    The version changes when a rebuild repoints the collection, before each server has
+    switched over; the generation in the key keeps results from the old one from being
+    cached for the new one.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RETRIEVAL_CACHE_TTL_SECONDS,
+                 version: Optional[ContextVersion] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = version or ContextVersion()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._cache_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(engine: str, figure_slug: str, top_k: int, query: str, collection: str = "") -> tuple:
+        return engine, figure_slug, top_k, normalize_query(query), collection
+
+    def _check_version(self):
+        current = self.version.current()
+        if current != self._cache_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._cache_version = current
+
+    def get(self, key) -> Optional[List[dict]]:
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[0])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, results: List[dict]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (list(results), time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "content_version": self._cache_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+retrieval_cache = RetrievalCache()
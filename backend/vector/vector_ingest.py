@@ -1,5 +1,7 @@
+import argparse
 import os
 import sys
+from typing import Optional
 
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -7,35 +9,47 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, project_root)
 
 from backend.models import FigureContext
-from backend.database import SessionLocalFigure
+from backend.figures_database import FigureSessionLocal
 from backend.vector.chroma_client import get_figure_context_collection
-from backend.vector.embedding_provider import get_embedding
+from backend.vector.context_sync import INGEST_DB_BATCH_SIZE, INGEST_WRITE_BATCH_SIZE, sync_collection
+from backend.vector.embedding_provider import DEFAULT_BATCH_SIZE
+from backend.vector.numpy_index import export_collection_to_numpy_index, numpy_index_enabled
+from backend.vector.retrieval_cache import bump_context_version
 
 
-def ingest_all_context_chunks():
+def ingest_all_context_chunks(workers: int = 1, batch_size: int = DEFAULT_BATCH_SIZE,
+                              write_batch_size: int = INGEST_WRITE_BATCH_SIZE, numpy_index: Optional[bool] = None):
     """
-    Embeds all FigureContext content and stores in Chroma with figure_slug metadata.
+    Splits all FigureContext content into sentence-aware, token-bounded chunks and syncs
+    them into Chroma with figure_slug, context_id and chunk_index metadata. Uses the same
+    ids and change detection as load_context_to_chroma, so either can be run.
+    Rows are streamed with yield_per and written write_batch_size chunks at a time.
+    With workers > 1 embedding is sharded across a process pool. The NumPy index is
+    re-exported only if `numpy_index` is set (default: when RETRIEVAL_ENGINE=numpy).
     """
-    session = SessionLocalFigure()
+    session = FigureSessionLocal()
     collection = get_figure_context_collection()
-    count = 0
 
     try:
-        contexts = session.query(FigureContext).all()
-        for ctx in contexts:
-            if ctx.content:
-                embedding = get_embedding(ctx.content)
-                collection.add(
-                    documents=[ctx.content],
-                    embeddings=[embedding],
-                    metadatas=[{"figure_slug": ctx.figure_slug}],
-                    ids=[f"{ctx.figure_slug}-{ctx.id}"]
-                )
-                count += 1
-        print(f"✅ Ingested {count} FigureContext chunks into Chroma.")
+        summary = sync_collection(session.query(FigureContext).yield_per(INGEST_DB_BATCH_SIZE), collection,
+                                  workers=workers, batch_size=batch_size, write_batch_size=write_batch_size)
+        if summary.changed:
+            if numpy_index if numpy_index is not None else numpy_index_enabled():
+                export_collection_to_numpy_index(collection)
+            bump_context_version()
+        print(f"✅ Synced FigureContext chunks into Chroma: {summary}")
     finally:
         session.close()
 
 
 if __name__ == "__main__":
-    ingest_all_context_chunks()
+    parser = argparse.ArgumentParser(description="Embed FigureContext rows into the Chroma collection.")
+    parser.add_argument("--workers", type=int, default=1, help="Embedding worker processes.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Documents per embedding batch.")
+    parser.add_argument("--write-batch-size", type=int, default=INGEST_WRITE_BATCH_SIZE,
+                        help="Chunks embedded and written to Chroma per round trip.")
+    parser.add_argument("--numpy-index", action="store_true",
+                        help="Re-export the NumPy index even when RETRIEVAL_ENGINE is not numpy.")
+    args = parser.parse_args()
+    ingest_all_context_chunks(workers=args.workers, batch_size=args.batch_size,
+                              write_batch_size=args.write_batch_size, numpy_index=args.numpy_index or None)
@@ -157,30 +157,60 @@ document.addEventListener("DOMContentLoaded", () => {
             messageInput.value = "";
 
             try {
-                const response = await fetch(`${backendUrl}/ask`, {
+                // Tokens arrive as server-sent events; the reply bubble fills in as the figure "speaks".
+                const formData = new FormData();
+                formData.append('user_id', userId);
+                formData.append('figure_slug', figureSlug);
+                formData.append('message', messageText);
+                if (threadId) formData.append('thread_id', threadId);
+
+                const response = await fetch(`${backendUrl}/figures/ask/stream`, {
                     method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'Authorization': `Bearer ${token}`
-                    },
-                    body: JSON.stringify({
-                        user_id: parseInt(userId), message: messageText, figure_slug: figureSlug,
-                        thread_id: threadId ? parseInt(threadId) : null
-                    })
+                    headers: { 'Authorization': `Bearer ${token}` },
+                    body: formData
                 });
 
-                thinkingIndicator.style.display = "none";
-                submitButton.disabled = false;
+                if (!response.ok || !response.body) {
+                    thinkingIndicator.style.display = "none";
+                    submitButton.disabled = false;
+                    appendMessageToChat('assistant', 'Error', 'Sorry, an error occurred.');
+                    return;
+                }
 
-                if (response.ok) {
-                    const newChatMessage = await response.json();
-                    appendMessageToChat('assistant', figureName, newChatMessage.message);
-                    if (!threadId && newChatMessage.thread_id) {
-                        document.getElementById("thread_id").value = newChatMessage.thread_id;
+                let replyContent = null;
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    const events = buffer.split('\n\n');
+                    buffer = events.pop();
+                    for (const block of events) {
+                        const eventLine = block.split('\n').find(line => line.startsWith('event: '));
+                        const dataLine = block.split('\n').find(line => line.startsWith('data: '));
+                        if (!eventLine || !dataLine) continue;
+                        const eventName = eventLine.slice(7);
+                        const data = JSON.parse(dataLine.slice(6));
+                        if (eventName === 'meta' && !threadId) {
+                            threadId = data.thread_id;
+                            document.getElementById("thread_id").value = threadId;
+                        } else if (eventName === 'token') {
+                            if (!replyContent) {
+                                thinkingIndicator.style.display = "none";
+                                replyContent = appendMessageToChat('assistant', figureName, '');
+                            }
+                            replyContent.textContent += data.text;
+                            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+                        } else if (eventName === 'error') {
+                            appendMessageToChat('assistant', 'Error', 'Sorry, the answer was cut short.');
+                        }
                     }
-                } else {
-                     appendMessageToChat('assistant', 'Error', 'Sorry, an error occurred.');
                 }
+
+                thinkingIndicator.style.display = "none";
+                submitButton.disabled = false;
             } catch (error) {
                  thinkingIndicator.style.display = "none";
                  submitButton.disabled = false;
@@ -199,6 +229,7 @@ document.addEventListener("DOMContentLoaded", () => {
             messageWrapper.appendChild(messageBubble);
             messagesContainer.appendChild(messageWrapper);
             messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            return messageBubble.querySelector('.message-content');
         }
     }
 });
\ No newline at end of file
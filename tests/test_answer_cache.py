@@ -0,0 +1,53 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import answer_cache as answer_cache_module
+from backend.answer_cache import SemanticAnswerCache, figure_fingerprint
+
+
+def make_cache(**kwargs):
+    options = dict(enabled=True, threshold=0.9, ttl_seconds=60, max_per_figure=3)
+    options.update(kwargs)
+    return SemanticAnswerCache(**options)
+
+
+def test_near_duplicate_question_hits():
+    cache = make_cache()
+    fp = figure_fingerprint("You are Richard III.", "v1")
+    cache.store("richard-iii", "How did you die?", "At Bosworth.", fp, [1.0, 0.0, 0.0])
+
+    assert cache.lookup("richard-iii", "How did you die?", fp) == "At Bosworth."
+    assert cache.lookup("richard-iii", "In what way did you die?", fp, [0.95, 0.05, 0.0]) == "At Bosworth."
+    assert cache.lookup("richard-iii", "Who were your children?", fp, [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("anne-boleyn", "How did you die?", fp, [1.0, 0.0, 0.0]) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 1)
+
+
+def test_persona_or_context_change_invalidates():
+    cache = make_cache()
+    old = figure_fingerprint("You are Richard III.", "v1")
+    cache.store("richard-iii", "How did you die?", "At Bosworth.", old)
+
+    assert cache.lookup("richard-iii", "How did you die?", figure_fingerprint("You are King Richard.", "v1")) is None
+    assert cache.lookup("richard-iii", "How did you die?", figure_fingerprint("You are Richard III.", "v2")) is None
+    assert cache.lookup("richard-iii", "How did you die?",
+                        figure_fingerprint("You are Richard III.", "v1", "figure_context_collection-2")) is None
+
+
+def test_ttl_and_size_cap(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", lambda: clock[0])
+    cache = make_cache(max_per_figure=2)
+    fp = figure_fingerprint(None, "")
+
+    for i in range(3):
+        cache.store("alfred", f"question {i}", f"answer {i}", fp)
+    assert cache.lookup("alfred", "question 0", fp) is None
+    assert cache.lookup("alfred", "question 2", fp) == "answer 2"
+
+    clock[0] += 61
+    assert cache.lookup("alfred", "question 2", fp) is None
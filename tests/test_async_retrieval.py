@@ -0,0 +1,67 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.vector import context_retriever
+from backend.vector.retrieval_cache import ContextVersion, RetrievalCache
+
+
+def test_event_loop_stays_responsive_during_retrieval(tmp_path, monkeypatch):
+    monkeypatch.setattr(context_retriever, "retrieval_cache",
+                        RetrievalCache(100, 60, ContextVersion(str(tmp_path / "v"))))
+    monkeypatch.setattr(context_retriever, "retrieval_executor", ThreadPoolExecutor(max_workers=2))
+
+    async def fake_embed(query):
+        return [1.0]
+
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+    overlapped = threading.Event()
+
+    def slow_search(query_embedding, figure_slug, top_k=5, include_embeddings=False):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            if in_flight[0] >= 2:
+                overlapped.set()
+        # Stands in for a blocking encode + Chroma query; returns early once two searches overlap.
+        overlapped.wait(timeout=2)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return [{"content": figure_slug, "metadata": {}}]
+
+    monkeypatch.setattr(context_retriever.embedding_batcher, "embed", fake_embed)
+    monkeypatch.setattr(context_retriever, "search_by_embedding", slow_search)
+
+    async def run():
+        lags = []
+
+        async def ticker():
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started - 0.01)
+
+        tick = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(
+            context_retriever.search_figure_context_async(f"question {i}", f"figure-{i}", mode="dense")
+            for i in range(4)
+        ))
+        tick.cancel()
+        return results, lags
+
+    results, lags = asyncio.run(run())
+
+    assert [r[0]["content"] for r in results] == [f"figure-{i}" for i in range(4)]
+    # Searches ran side by side, but never more than the 2-thread executor allows.
+    assert overlapped.is_set()
+    assert peak[0] == 2
+    # The loop kept ticking while the searches blocked their threads.
+    assert len(lags) >= 3
+    assert max(lags) < 0.5
@@ -0,0 +1,102 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+from backend.vector import chroma_client, context_retriever
+from backend.vector.retrieval_cache import ContextVersion, RetrievalCache
+
+VECTORS = {
+    "battle": [1.0, 0.0, 0.0],
+    "family": [0.0, 1.0, 0.0],
+    "death": [0.0, 0.0, 1.0],
+}
+
+
+class CountingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.metadata = collection.metadata
+        self.calls = []
+
+    def query(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.collection.query(**kwargs)
+
+
+def test_batch_groups_by_figure_and_keeps_order(tmp_path, monkeypatch):
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection("batch_search_test")
+    for slug in ("richard-iii", "anne-boleyn"):
+        collection.add(
+            ids=[f"{slug}-{topic}" for topic in VECTORS],
+            embeddings=list(VECTORS.values()),
+            documents=[f"{slug}: {topic}" for topic in VECTORS],
+            metadatas=[{"figure_slug": slug} for _ in VECTORS],
+        )
+
+    counting = CountingCollection(collection)
+    monkeypatch.setattr(chroma_client, "_collection", counting)
+    monkeypatch.setattr(context_retriever, "RETRIEVAL_ENGINE", "chroma")
+    monkeypatch.setattr(context_retriever, "retrieval_cache",
+                        RetrievalCache(100, 60, ContextVersion(str(tmp_path / "v"))))
+    embedded = []
+
+    def fake_query_embeddings(queries):
+        embedded.append(list(queries))
+        return [VECTORS[q] for q in queries]
+
+    monkeypatch.setattr(context_retriever, "get_query_embeddings", fake_query_embeddings)
+
+    queries = [
+        ("battle", "richard-iii", 1),
+        ("family", "anne-boleyn", 2),
+        ("death", "richard-iii", 1),
+        ("battle", "anne-boleyn", 1),
+    ]
+    results = context_retriever.search_figure_context_batch(queries)
+
+    assert [r[0]["content"] for r in results] == [
+        "richard-iii: battle", "anne-boleyn: family", "richard-iii: death", "anne-boleyn: battle"
+    ]
+    assert len(results[1]) == 2 and len(results[0]) == 1
+    assert len(embedded) == 1
+    assert len(counting.calls) == 2
+    assert all(len(call["query_embeddings"]) == 2 for call in counting.calls)
+
+    # A repeat of the same batch is served entirely from the retrieval cache.
+    assert context_retriever.search_figure_context_batch(queries) == results
+    assert len(counting.calls) == 2
+    client.delete_collection("batch_search_test")
+
+
+def test_batch_items_bound_top_k_and_reject_per_item_mode():
+    from pydantic import ValidationError
+    from backend.routers.figures import MAX_SEARCH_TOP_K, BatchSearchQuery
+
+    for top_k in (0, -1, MAX_SEARCH_TOP_K + 1):
+        with pytest.raises(ValidationError):
+            BatchSearchQuery(queries=[{"query": "q", "figure_slug": "richard-iii", "top_k": top_k}])
+
+    with pytest.raises(ValidationError):
+        BatchSearchQuery(queries=[{"query": "q", "figure_slug": "richard-iii", "mode": "lexical"}])
+
+    batch = BatchSearchQuery(queries=[{"query": "q", "figure_slug": "richard-iii"}], mode="lexical")
+    assert batch.queries[0].top_k == 5
+
+
+def test_unknown_mode_is_rejected():
+    from pydantic import ValidationError
+    from backend.routers.figures import BatchSearchQuery, SearchQuery
+
+    with pytest.raises(ValidationError):
+        SearchQuery(query="q", figure_slug="richard-iii", mode="hybird")
+    with pytest.raises(ValidationError):
+        BatchSearchQuery(queries=[{"query": "q", "figure_slug": "richard-iii"}], mode="hybird")
+    with pytest.raises(ValueError, match="hybird"):
+        context_retriever.search_figure_context("q", "richard-iii", mode="hybird")
+    assert context_retriever._resolve_mode("Hybrid") == "hybrid"
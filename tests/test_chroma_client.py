@@ -0,0 +1,44 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+from backend.vector import chroma_client, context_retriever
+
+
+@pytest.fixture
+def chroma_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(chroma_client, "CHROMA_DATA_PATH", str(tmp_path))
+    chroma_client.reset_figure_context_collection()
+    yield tmp_path
+    chroma_client.reset_figure_context_collection()
+
+
+def test_collection_handle_is_reused(chroma_dir):
+    first = chroma_client.get_figure_context_collection()
+    assert chroma_client.get_figure_context_collection() is first
+
+
+def test_warm_up_runs_a_query(chroma_dir):
+    collection = chroma_client.get_figure_context_collection()
+    collection.add(ids=["1"], embeddings=[[0.1, 0.2, 0.3]], documents=["doc"], metadatas=[{"figure_slug": "x"}])
+    chroma_client.warm_up_collection(dimension=3)
+    assert chroma_client.warmup_state["status"] == "ready"
+
+
+def test_query_reconnects_once_on_error(chroma_dir, monkeypatch):
+    class Broken:
+        def query(self, **kwargs):
+            raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(chroma_client, "_collection", Broken())
+    collection = chroma_client.get_chroma_client().get_or_create_collection(chroma_client.COLLECTION_NAME)
+    collection.add(ids=["1"], embeddings=[[0.1, 0.2, 0.3]], documents=["doc"], metadatas=[{"figure_slug": "x"}])
+
+    results = context_retriever.query_collection(query_embeddings=[[0.1, 0.2, 0.3]], n_results=1)
+    assert results["documents"][0] == ["doc"]
+    assert not isinstance(chroma_client._collection, Broken)
@@ -0,0 +1,60 @@
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.vector.chunking import (
+    approx_token_count, chunk_context, chunk_contexts, chunk_text, context_hash, split_sentences,
+)
+
+
+def sentence(n):
+    return f"Sentence number {n} describes one event of the reign in a few words."
+
+
+def test_chunks_are_token_bounded_and_sentence_aligned():
+    sentences = [sentence(n) for n in range(40)]
+    chunks = chunk_text(" ".join(sentences), max_tokens=60, overlap_tokens=15)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert approx_token_count(chunk) <= 60
+        assert all(s in sentences for s in split_sentences(chunk))
+    # Every sentence survives chunking.
+    assert {s for chunk in chunks for s in split_sentences(chunk)} == set(sentences)
+
+
+def test_closing_quotes_and_brackets_stay_with_their_sentence():
+    assert split_sentences('He said "Go now." Then (he left.) Did he? Yes.') == [
+        'He said "Go now."', "Then (he left.)", "Did he?", "Yes.",
+    ]
+
+
+def test_consecutive_chunks_overlap():
+    chunks = chunk_text(" ".join(sentence(n) for n in range(20)), max_tokens=60, overlap_tokens=15)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        assert split_sentences(previous)[-1] == split_sentences(current)[0]
+
+
+def test_overlong_sentence_is_split_on_words():
+    chunks = chunk_text(" ".join(["word"] * 250) + ".", max_tokens=100, overlap_tokens=0)
+
+    assert len(chunks) == 3
+    assert all(approx_token_count(chunk) <= 100 for chunk in chunks)
+
+
+def test_chunk_ids_and_metadata_point_at_the_parent_context():
+    context = SimpleNamespace(id=7, figure_slug="richard-iii", source_name=None,
+                              content="\n\n".join(sentence(n) for n in range(30)))
+
+    chunks = chunk_context(context, max_tokens=60, overlap_tokens=10)
+
+    assert [c.chunk_id for c in chunks] == [f"7-{i}" for i in range(len(chunks))]
+    assert chunks[0].metadata == {
+        "figure_slug": "richard-iii", "context_id": 7, "chunk_index": 0,
+        "chunk_count": len(chunks), "source_name": "", "context_hash": context_hash(context, 60, 10),
+    }
+    assert chunk_contexts([context, SimpleNamespace(id=8, figure_slug="x", source_name="", content="")],
+                          max_tokens=60, overlap_tokens=10) == chunks
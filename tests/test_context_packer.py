@@ -0,0 +1,49 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.vector.context_packer import format_context, pack_context
+
+WIKI = "Richard III was King of England from 1483 until his death at the Battle of Bosworth Field in 1485."
+DBPEDIA = "Richard III was King of England from 1483 until his death in 1485 at the Battle of Bosworth Field."
+FAMILY = "He married Anne Neville, and their only son Edward of Middleham died in 1484."
+TOWER = "The fate of the Princes in the Tower remains one of history's enduring mysteries."
+
+
+def result(content, distance=None, embedding=None):
+    r = {"content": content, "metadata": {"figure_slug": "richard-iii"}}
+    if distance is not None:
+        r["distance"] = distance
+    if embedding is not None:
+        r["embedding"] = embedding
+    return r
+
+
+def test_near_duplicates_and_distant_results_are_dropped():
+    candidates = [
+        result(WIKI, 0.20, [1.0, 0.0, 0.0]),
+        result(DBPEDIA, 0.21, [0.99, 0.05, 0.0]),
+        result(FAMILY, 0.40, [0.2, 1.0, 0.0]),
+        result(TOWER, 0.90, [0.0, 0.0, 1.0]),
+    ]
+
+    packed = pack_context(candidates, token_budget=1000, max_distance=0.65)
+
+    assert [r["content"] for r in packed] == [WIKI, FAMILY]
+
+
+def test_token_budget_prefers_chunks_that_fit():
+    long_chunk = " ".join(["filler"] * 80) + "."
+    candidates = [result(WIKI, 0.1), result(long_chunk, 0.2), result(FAMILY, 0.3)]
+
+    packed = pack_context(candidates, token_budget=60, max_distance=None)
+
+    assert [r["content"] for r in packed] == [WIKI, FAMILY]
+    assert format_context(packed) == f"{WIKI}\n\n{FAMILY}"
+
+
+def test_lexical_results_fall_back_to_token_overlap():
+    packed = pack_context([result(WIKI), result(DBPEDIA), result(TOWER)], token_budget=1000)
+
+    assert [r["content"] for r in packed] == [WIKI, TOWER]
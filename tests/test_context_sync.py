@@ -0,0 +1,89 @@
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+from backend.vector import embedding_provider
+from backend.vector.context_sync import sync_collection
+from backend.vector.embedding_store import EmbeddingStore
+
+LONG = " ".join(f"Sentence {n} recounts another campaign of the long war in some detail." for n in range(60))
+
+
+def context(id_, content, slug="richard-iii"):
+    return SimpleNamespace(id=id_, figure_slug=slug, source_name="wikipedia", content=content)
+
+
+def test_sync_only_touches_what_changed(tmp_path, monkeypatch):
+    embedded = []
+
+    def fake_get_embeddings(texts, batch_size=64):
+        embedded.extend(texts)
+        return [[float(len(t) % 7 + 1)] + [0.0] * 383 for t in texts]
+
+    monkeypatch.setattr(embedding_provider, "get_embeddings", fake_get_embeddings)
+    store = EmbeddingStore(str(tmp_path))
+    collection = chromadb.EphemeralClient().get_or_create_collection("context_sync_test")
+    # Vectors written under the old id schemes are cleared out on the first sync.
+    collection.add(ids=["1", "richard-iii-1"], embeddings=[[1.0] + [0.0] * 383] * 2,
+                   documents=["old", "old"], metadatas=[{"figure_slug": "richard-iii"}] * 2)
+
+    contexts = [context(1, "Richard was born at Fotheringhay."), context(2, LONG), context(3, "")]
+    first = sync_collection(contexts, collection, store=store)
+
+    assert (first.new_contexts, first.deleted_chunks) == (2, 2)
+    ids = set(collection.get()["ids"])
+    assert "1-0" in ids and "2-1" in ids and "1" not in ids
+    assert collection.count() == first.upserted_chunks
+
+    embedded.clear()
+    second = sync_collection(contexts, collection, store=store)
+    assert (second.unchanged_contexts, second.upserted_chunks, second.deleted_chunks) == (2, 0, 0)
+    assert not second.changed and embedded == []
+
+    edited = [context(1, "Richard was born at Fotheringhay Castle in 1452."), context(2, "Short now.")]
+    third = sync_collection(edited, collection, store=store)
+    assert (third.changed_contexts, third.upserted_chunks) == (2, 2)
+    assert sorted(collection.get()["ids"]) == ["1-0", "2-0"]
+
+    dry = sync_collection([edited[0]], collection, store=store, dry_run=True)
+    assert (dry.removed_contexts, dry.deleted_chunks) == (1, 1)
+    assert collection.count() == 2
+
+    final = sync_collection([edited[0]], collection, store=store)
+    assert collection.get()["ids"] == ["1-0"] and final.removed_contexts == 1
+
+
+def test_sync_streams_rows_in_bounded_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_provider, "get_embeddings",
+                        lambda texts, batch_size=64: [[1.0] + [0.0] * 383 for _ in texts])
+    collection = chromadb.EphemeralClient().get_or_create_collection("context_sync_stream_test")
+    upserts = []
+    original_upsert = collection.upsert
+    read = []
+
+    class RecordingCollection:
+        def __getattr__(self, name):
+            return getattr(collection, name)
+
+        def upsert(self, **kwargs):
+            # Rows are consumed lazily: each write happens before the whole table is read.
+            upserts.append((len(kwargs["ids"]), len(read)))
+            original_upsert(**kwargs)
+
+    def rows():
+        for i in range(1, 41):
+            read.append(i)
+            yield context(i, f"Fact number {i} about the reign.")
+
+    summary = sync_collection(rows(), RecordingCollection(), write_batch_size=8, batch_size=4,
+                              store=EmbeddingStore(str(tmp_path)))
+
+    assert summary.upserted_chunks == collection.count() == 40
+    assert max(size for size, _ in upserts) <= 8
+    assert upserts[0][1] < 40
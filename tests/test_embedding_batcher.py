@@ -0,0 +1,55 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.vector import embedding_provider
+from backend.vector.embedding_batcher import EmbeddingMicroBatcher
+from backend.vector.embedding_provider import EmbeddingCache
+
+
+class RecordingProvider:
+    provider_key = "local"
+    model_id = "fake-model"
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=64):
+        self.batches.append(list(texts))
+        return [[float(len(t))] * 384 for t in texts]
+
+
+def test_concurrent_queries_share_one_encode(monkeypatch):
+    fake = RecordingProvider()
+    monkeypatch.setattr(embedding_provider, "provider", fake)
+    monkeypatch.setattr(embedding_provider, "query_cache", EmbeddingCache(100, 10_000_000, 60))
+    batcher = EmbeddingMicroBatcher(max_batch=8, max_wait_ms=50)
+
+    queries = [f"question {'x' * i}" for i in range(20)]
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed(q) for q in queries))
+
+    vectors = asyncio.run(run())
+
+    assert [v[0] for v in vectors] == [float(len(q)) for q in queries]
+    assert [len(b) for b in fake.batches] == [8, 8, 4]
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 3
+    assert stats["queue_wait_ms"]["count"] == 20
+
+
+def test_cached_queries_skip_the_queue(monkeypatch):
+    fake = RecordingProvider()
+    monkeypatch.setattr(embedding_provider, "provider", fake)
+    monkeypatch.setattr(embedding_provider, "query_cache", EmbeddingCache(100, 10_000_000, 60))
+    batcher = EmbeddingMicroBatcher(max_batch=8, max_wait_ms=1)
+
+    async def run():
+        await batcher.embed("Who were your children?")
+        return await batcher.embed("who were your  children?")
+
+    asyncio.run(run())
+    assert len(fake.batches) == 1
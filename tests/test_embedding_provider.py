@@ -0,0 +1,171 @@
+import sys
+import os
+import subprocess
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from backend.vector import embedding_provider
+from backend.vector.embedding_provider import EmbeddingCache, EmbeddingProvider
+
+
+class FakeEncoder:
+    """Stands in for SentenceTransformer so the tests don't need torch."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, convert_to_tensor=False, **kwargs):
+        self.calls += 1
+        if isinstance(text, list):
+            return np.ones((len(text), 384), dtype=np.float32)
+        return np.ones(384, dtype=np.float32)
+
+
+def test_import_does_not_load_model():
+    code = (
+        "import sys; import backend.vector.context_retriever; "
+        "from backend.vector.embedding_provider import provider; "
+        "assert 'sentence_transformers' not in sys.modules; "
+        "assert provider.status == 'cold'"
+    )
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_provider_loads_once_and_warms_up(monkeypatch):
+    provider = EmbeddingProvider("local")
+    fake = FakeEncoder()
+    created = []
+
+    def create():
+        created.append(1)
+        return fake
+
+    monkeypatch.setattr(provider, "_create_client", create)
+    assert provider.status == "cold"
+
+    threads = [threading.Thread(target=provider.load) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert provider.status == "ready"
+    assert len(created) == 1
+    assert fake.calls == 1  # the warm-up encode
+    assert provider.state()["load_seconds"] is not None
+
+
+def test_background_warmup(monkeypatch):
+    provider = EmbeddingProvider("local")
+    monkeypatch.setattr(provider, "_create_client", FakeEncoder)
+    provider.start_background_warmup().join(timeout=5)
+    assert provider.is_ready
+
+
+def test_failed_load_returns_zero_vector(monkeypatch):
+    provider = EmbeddingProvider("local")
+
+    def boom():
+        raise RuntimeError("no model")
+
+    monkeypatch.setattr(provider, "_create_client", boom)
+    monkeypatch.setattr(embedding_provider, "provider", provider)
+
+    assert embedding_provider.get_embedding("hello") == [0.0] * 384
+    assert provider.status == "failed"
+    assert provider.error == "no model"
+
+
+def test_failed_load_is_retried_after_backoff(monkeypatch):
+    provider = EmbeddingProvider("local")
+    clock = [100.0]
+    attempts = []
+
+    def flaky():
+        attempts.append(clock[0])
+        if len(attempts) == 1:
+            raise RuntimeError("connection reset")
+        return FakeEncoder()
+
+    monkeypatch.setattr(embedding_provider.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(provider, "_create_client", flaky)
+
+    assert provider.load() is None
+    clock[0] += provider.retry_seconds / 2
+    assert provider.load() is None  # still backing off
+    assert len(attempts) == 1
+
+    clock[0] += provider.retry_seconds
+    assert provider.load() is not None
+    assert provider.status == "ready" and provider.error is None
+    assert len(attempts) == 2
+
+
+def test_get_embeddings_batches_and_keeps_order(monkeypatch):
+    provider = EmbeddingProvider("local")
+    batches = []
+
+    class RecordingEncoder(FakeEncoder):
+        def encode(self, text, convert_to_tensor=False, **kwargs):
+            if isinstance(text, list):
+                batches.append(list(text))
+                return np.array([[float(len(t))] * 384 for t in text], dtype=np.float32)
+            return super().encode(text)
+
+    monkeypatch.setattr(provider, "_create_client", RecordingEncoder)
+    monkeypatch.setattr(embedding_provider, "provider", provider)
+
+    texts = ["a", "", "bbb", None, "cc", "dddd", "eeeee"]
+    vectors = embedding_provider.get_embeddings(texts, batch_size=2)
+
+    assert batches == [["a", "bbb"], ["cc", "dddd"], ["eeeee"]]
+    assert [v[0] for v in vectors] == [1.0, 0.0, 3.0, 0.0, 2.0, 4.0, 5.0]
+
+
+def test_query_cache_lru_ttl_and_stats(monkeypatch):
+    cache = EmbeddingCache(max_entries=2, max_bytes=10_000, ttl_seconds=60)
+    cache.put("a", [1.0, 2.0])
+    cache.put("b", [3.0, 4.0])
+    assert cache.get("a") == [1.0, 2.0]  # 'a' is now most recent
+    cache.put("c", [5.0, 6.0])           # evicts 'b'
+
+    assert cache.get("b") is None
+    assert cache.get("c") == [5.0, 6.0]
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["bytes"] == 16
+    assert stats["evictions"] == 1
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+    clock = [1000.0]
+    monkeypatch.setattr(embedding_provider.time, "monotonic", lambda: clock[0])
+    cache.put("d", [7.0])
+    clock[0] += 61
+    assert cache.get("d") is None
+
+
+def test_query_cache_byte_cap():
+    cache = EmbeddingCache(max_entries=100, max_bytes=384 * 4 * 2, ttl_seconds=60)
+    for i in range(5):
+        cache.put(i, [float(i)] * 384)
+    assert cache.stats()["size"] == 2
+    assert cache.get(4) is not None
+
+
+def test_get_query_embedding_hits_cache(monkeypatch):
+    provider = EmbeddingProvider("local")
+    fake = FakeEncoder()
+    monkeypatch.setattr(provider, "_create_client", lambda: fake)
+    monkeypatch.setattr(embedding_provider, "provider", provider)
+    monkeypatch.setattr(embedding_provider, "query_cache", EmbeddingCache(10, 1_000_000, 60))
+
+    embedding_provider.get_query_embedding("How did you die?")
+    embedding_provider.get_query_embedding("  how did   you DIE? ")
+
+    assert fake.calls == 2  # warm-up + one real encode
+    assert embedding_provider.query_cache.stats()["hits"] == 1
@@ -0,0 +1,28 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.vector.embedding_store import EmbeddingStore, text_hash
+
+
+def test_store_round_trip(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many("model-a", 3, {"h1": [1.0, 2.0, 3.0], "h2": [4.0, 5.0, 6.0]})
+    store.put_many("model-a", 3, {"h1": [9.0, 9.0, 9.0], "h3": [7.0, 8.0, 9.0]})
+
+    found = store.get_many("model-a", 3, ["h1", "h2", "h3", "missing"])
+    assert set(found) == {"h1", "h2", "h3"}
+    assert found["h1"].tolist() == [1.0, 2.0, 3.0]  # first write wins
+    assert found["h3"].tolist() == [7.0, 8.0, 9.0]
+
+    # Same hash under another model or dimension is a separate entry.
+    assert store.get_many("model-b", 3, ["h1"]) == {}
+    store.close()
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.get_many("model-a", 3, ["h2"])["h2"].tolist() == [4.0, 5.0, 6.0]
+
+
+def test_text_hash_is_sha256():
+    assert text_hash("abc") == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
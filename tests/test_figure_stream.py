@@ -0,0 +1,138 @@
+import sys
+import os
+import asyncio
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, models, schemas, summarizer
+from backend.database import Base, get_db_chat
+from backend.figures_database import FigureBase
+from backend.llm_client import create_openai_client
+from backend.routers import figures
+from backend.tools.fake_openai_server import create_app
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://fake/v1")
+
+    fig_engine = create_engine(f"sqlite:///{tmp_path / 'figures.db'}", connect_args={"check_same_thread": False})
+    FigureBase.metadata.create_all(bind=fig_engine)
+    FigureSession = sessionmaker(bind=fig_engine)
+    fig_db = FigureSession()
+    fig_db.add(models.HistoricalFigure(name="Richard III", slug="richard-iii", persona_prompt="You are Richard III."))
+    fig_db.commit()
+    fig_db.close()
+    monkeypatch.setattr(figures, "FigureSessionLocal", FigureSession)
+
+    async def no_context(**kwargs):
+        return []
+    monkeypatch.setattr(figures, "search_figure_context_async", no_context)
+    monkeypatch.setattr(figures.answer_cache, "enabled", False)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(summarizer, "SessionLocal", Session)
+    monkeypatch.setattr(figures, "SessionLocal", Session)
+    db = Session()
+    user = crud.create_user(db, schemas.UserCreate(username="visitor", hashed_password="x"))
+
+    fake = create_app(reply="Now is the winter of our discontent.", token_delay=0)
+    client = create_openai_client(httpx.AsyncClient(transport=httpx.ASGITransport(app=fake), base_url="http://fake"))
+    yield Session, db, user, fake, client
+    db.close()
+
+
+def test_stream_forwards_tokens_and_stores_reply(setup):
+    Session, db, user, fake, client = setup
+
+    def override_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(figures.router)
+    app.dependency_overrides[get_db_chat] = override_db
+    app.state.openai_client = client
+
+    response = TestClient(app).post("/figures/ask/stream", data={
+        "figure_slug": "richard-iii", "user_id": user.id, "message": "Who are you?",
+    })
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert events[0][0] == "meta" and events[-1][0] == "done"
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Now is the winter of our discontent."
+    assert fake.state.requests[0]["stream"] is True
+
+    messages = crud.get_messages_by_thread(db, events[0][1]["thread_id"])
+    assert [(m.role, m.message) for m in messages] == [
+        ("user", "Who are you?"), ("assistant", "Now is the winter of our discontent."),
+    ]
+    assert messages[-1].id == events[-1][1]["message_id"]
+
+
+def test_disconnect_stores_partial_reply(setup):
+    Session, db, user, fake, client = setup
+
+    async def run():
+        turn = await figures.start_figure_turn(db, "richard-iii", user.id, "Who are you?", None)
+        stream = figures.stream_figure_reply(turn, user.id, "Who are you?", client)
+        received = [await stream.__anext__() for _ in range(3)]  # meta + two tokens
+        await stream.aclose()  # what Starlette does when the visitor goes away
+        return turn, received
+
+    turn, received = asyncio.run(run())
+
+    partial = "".join(json.loads(e.split("data: ", 1)[1])["text"] for e in received[1:])
+    messages = crud.get_messages_by_thread(Session(), turn.thread.id)
+    assert messages[-1].role == "assistant"
+    assert messages[-1].message == partial == "Now is "
+
+
+def test_disconnect_after_cached_answer_stores_it(setup):
+    Session, db, user, fake, client = setup
+
+    user_id = user.id
+
+    async def run():
+        turn = await figures.start_figure_turn(db, "richard-iii", user_id, "Who are you?", None)
+        turn.thread.id  # loaded while the request's session is open, as ask_figure_stream does
+        db.close()  # the request's session is gone before the stream runs
+        turn.reply = "I am Richard, by the grace of God."
+        stream = figures.stream_figure_reply(turn, user_id, "Who are you?", client)
+        await stream.__anext__()  # meta
+        await stream.__anext__()  # the cached answer
+        await stream.aclose()
+        return turn
+
+    turn = asyncio.run(run())
+
+    messages = crud.get_messages_by_thread(Session(), turn.thread.id)
+    assert [(m.role, m.message, m.model_used) for m in messages][-1] == (
+        "assistant", "I am Richard, by the grace of God.", "answer-cache")
+    assert fake.state.requests == []
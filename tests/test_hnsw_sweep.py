@@ -0,0 +1,63 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+from backend.vector import chroma_client
+from backend.tools.hnsw_sweep import brute_force_top_k, make_queries, sweep, synthetic_corpus
+
+
+def test_brute_force_respects_the_figure_filter():
+    embeddings, slugs = synthetic_corpus(60, 8, figures=3)
+    queries, query_slugs = make_queries(embeddings, slugs, 10, noise=0.0)
+
+    truth = brute_force_top_k(embeddings, slugs, queries, query_slugs, k=4)
+
+    for expected, slug in zip(truth, query_slugs):
+        assert len(expected) == 4
+        assert {slugs[i] for i in expected} == {slug}
+
+
+def test_sweep_reports_each_setting_combination():
+    embeddings, slugs = synthetic_corpus(400, 16, figures=4)
+
+    rows = sweep(embeddings, slugs, spaces=["cosine"], ms=[8, 16], construction_efs=[100],
+                 search_efs=[10, 200], k=5, queries=20)
+
+    assert [(r["M"], r["search_ef"]) for r in rows] == [(8, 10), (8, 200), (16, 10), (16, 200)]
+    assert all(0.0 <= r["recall"] <= 1.0 and r["p95_ms"] >= r["p50_ms"] for r in rows)
+    assert rows[-1]["recall"] >= 0.9
+
+
+def test_collection_gets_configured_search_ef(monkeypatch):
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(
+        "hnsw_settings_test", metadata=chroma_client.hnsw_metadata("cosine", 16, 100, 20)
+    )
+
+    chroma_client.apply_hnsw_settings(collection, chroma_client.hnsw_metadata("cosine", 16, 100, 64))
+
+    assert client.get_collection("hnsw_settings_test").configuration_json["hnsw"]["ef_search"] == 64
+    client.delete_collection("hnsw_settings_test")
+
+
+def test_settings_of_collection_without_metadata_come_from_its_configuration(capsys):
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection("hnsw_legacy_test")  # like the legacy collection: no metadata
+    assert collection.metadata is None
+
+    assert chroma_client.collection_hnsw_settings(collection) == {
+        "hnsw:space": "l2", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 100,
+    }
+    chroma_client.apply_hnsw_settings(collection, chroma_client.hnsw_metadata("cosine", 32, 100, 100))
+    assert "Rebuild the collection" in capsys.readouterr().out
+    client.delete_collection("hnsw_legacy_test")
+
+    cosine = client.get_or_create_collection("hnsw_legacy_cosine_test", configuration={"hnsw": {"space": "cosine"}})
+    assert cosine.metadata is None
+    assert chroma_client.collection_hnsw_settings(cosine)["hnsw:space"] == "cosine"
+    client.delete_collection("hnsw_legacy_cosine_test")
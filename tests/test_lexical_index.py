@@ -0,0 +1,62 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.vector import context_retriever
+from backend.vector.lexical_index import LexicalIndex, tokenize
+from backend.vector.retrieval_cache import ContextVersion, RetrievalCache
+
+ROWS = [
+    {"figure_slug": "richard-iii", "content": "Richard was killed at the Battle of Bosworth Field in 1485."},
+    {"figure_slug": "richard-iii", "content": "Richard married Anne Neville; their son Edward died young."},
+    {"figure_slug": "richard-iii", "content": "His remains were found under a car park in Leicester."},
+    {"figure_slug": "anne-boleyn", "content": "Anne Boleyn was executed at the Tower of London in 1536."},
+    {"figure_slug": "anne-boleyn", "content": ""},
+]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("How did you die at Bosworth?") == ["die", "bosworth"]
+
+
+def test_bm25_ranks_matching_document_first_per_figure():
+    index = LexicalIndex(ROWS)
+    results = index.search("Where was Richard killed in battle?", "richard-iii", top_k=2)
+    assert results[0]["content"].startswith("Richard was killed")
+    assert all(r["metadata"]["figure_slug"] == "richard-iii" for r in results)
+
+    assert index.search("Tower of London", "richard-iii", top_k=3) == []
+    assert index.search("Tower of London", "anne-boleyn")[0]["content"].startswith("Anne Boleyn")
+    assert len(index.figures["anne-boleyn"].documents) == 1
+    assert index.search("anything", "unknown-figure") == []
+
+
+def test_lexical_mode_never_embeds(tmp_path, monkeypatch):
+    index = LexicalIndex(ROWS)
+    monkeypatch.setattr(context_retriever, "get_lexical_index", lambda: index)
+    monkeypatch.setattr(context_retriever, "retrieval_cache",
+                        RetrievalCache(10, 60, ContextVersion(str(tmp_path / "v"))))
+
+    def no_embedding(query):
+        raise AssertionError("lexical mode must not embed")
+
+    monkeypatch.setattr(context_retriever, "get_query_embedding", no_embedding)
+    results = context_retriever.search_figure_context("Who was your son?", "richard-iii", mode="lexical")
+    assert "son Edward" in results[0]["content"]
+
+
+def test_hybrid_fuses_dense_and_lexical(tmp_path, monkeypatch):
+    index = LexicalIndex(ROWS)
+    monkeypatch.setattr(context_retriever, "get_lexical_index", lambda: index)
+    monkeypatch.setattr(context_retriever, "retrieval_cache",
+                        RetrievalCache(10, 60, ContextVersion(str(tmp_path / "v"))))
+    monkeypatch.setattr(context_retriever, "get_query_embedding", lambda q: [0.0])
+    dense = [{"content": ROWS[2]["content"], "metadata": {"figure_slug": "richard-iii"}},
+             {"content": ROWS[0]["content"], "metadata": {"figure_slug": "richard-iii"}}]
+    monkeypatch.setattr(context_retriever, "search_by_embedding", lambda e, s, k, include_embeddings=False: dense)
+
+    results = context_retriever.search_figure_context("killed in battle", "richard-iii", top_k=2, mode="hybrid")
+    # The Bosworth document is ranked by both retrievers, so it wins the fusion.
+    assert results[0]["content"] == ROWS[0]["content"]
+    assert len(results) == 2
@@ -0,0 +1,74 @@
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, schemas, summarizer
+from backend.database import Base, get_db_chat
+from backend.llm_client import CHAT_TIMEOUT, OPENAI_CONNECT_TIMEOUT, create_http_client, get_openai_client
+from backend.routers import chat
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        reply = SimpleNamespace(content=f"Echo: {kwargs['messages'][-1]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=reply)], usage=None)
+
+
+def test_http_client_timeouts():
+    http_client = create_http_client()
+
+    assert http_client.timeout.connect == OPENAI_CONNECT_TIMEOUT
+    assert http_client.timeout.read == CHAT_TIMEOUT
+
+
+def test_chat_complete_awaits_the_injected_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(summarizer, "SessionLocal", Session)
+    db = Session()
+    user = crud.create_user(db, schemas.UserCreate(username="visitor", hashed_password="x"))
+    thread = crud.create_thread(db, schemas.ThreadCreate(user_id=user.id, title="t"))
+
+    def override_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    completions = FakeCompletions()
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.dependency_overrides[get_db_chat] = override_db
+    app.state.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    response = TestClient(app).post("/chat/complete", data={
+        "user_id": user.id, "message": "Who built Stonehenge?", "thread_id": thread.id,
+    }, follow_redirects=False)
+
+    assert response.status_code == 303
+    assert completions.calls[0]["timeout"] == CHAT_TIMEOUT
+    messages = crud.get_messages_by_thread(db, thread.id)
+    assert [m.message for m in messages] == ["Who built Stonehenge?", "Echo: Who built Stonehenge?"]
+
+
+def test_dependency_creates_client_once_without_lifespan(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    app = FastAPI()
+    request = SimpleNamespace(app=app)
+
+    first = get_openai_client(request)
+    assert get_openai_client(request) is first
@@ -0,0 +1,74 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+
+from backend.vector.numpy_index import NumpyFigureIndex, build_numpy_index, export_collection_to_numpy_index
+
+
+def make_corpus(rng, per_slug=30, dim=16):
+    ids, embeddings, documents, metadatas = [], [], [], []
+    for slug in ("richard-iii", "anne-boleyn", "alfred-the-great"):
+        for i in range(per_slug):
+            ids.append(f"{slug}-{i}")
+            embeddings.append(rng.normal(size=dim))
+            documents.append(f"{slug} doc {i}")
+            metadatas.append({"figure_slug": slug})
+    order = rng.permutation(len(ids))
+    return ([ids[i] for i in order], [embeddings[i] for i in order],
+            [documents[i] for i in order], [metadatas[i] for i in order])
+
+
+def test_search_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(0)
+    ids, embeddings, documents, metadatas = make_corpus(rng)
+    assert build_numpy_index(ids, embeddings, documents, metadatas, str(tmp_path)) == 90
+
+    index = NumpyFigureIndex(str(tmp_path))
+    query = rng.normal(size=16)
+    results = index.search(query.tolist(), "anne-boleyn", top_k=5)
+
+    candidates = [i for i, m in enumerate(metadatas) if m["figure_slug"] == "anne-boleyn"]
+    unit = lambda v: np.asarray(v) / np.linalg.norm(v)
+    expected = sorted(candidates, key=lambda i: -unit(embeddings[i]) @ unit(query))[:5]
+
+    assert [r["content"] for r in results] == [documents[i] for i in expected]
+    assert all(r["metadata"]["figure_slug"] == "anne-boleyn" for r in results)
+    assert isinstance(index.matrix, np.memmap)
+
+
+def test_small_figure_unknown_slug_and_reload(tmp_path):
+    build_numpy_index(["a"], [[1.0, 0.0]], ["only doc"], [{"figure_slug": "solo"}], str(tmp_path))
+    index = NumpyFigureIndex(str(tmp_path))
+    assert [r["content"] for r in index.search([1.0, 1.0], "solo", top_k=5)] == ["only doc"]
+    assert index.search([1.0, 1.0], "nobody", top_k=5) == []
+    before = index._snapshot
+
+    build_numpy_index(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], ["x", "y"],
+                      [{"figure_slug": "solo"}, {"figure_slug": "solo"}], str(tmp_path))
+    os.utime(index.manifest_path, (index.version + 10, index.version + 10))
+    index.reload_if_changed()
+    assert [r["content"] for r in index.search([0.0, 1.0], "solo", top_k=1)] == ["y"]
+    # A reload swaps in a whole new snapshot; one taken before it stays self-consistent.
+    assert index._snapshot is not before
+    assert before.ids == ["a"] and before.matrix.shape[0] == 1 and before.slugs["solo"] == [0, 1]
+
+
+def test_export_from_chroma_collection(tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    rng = np.random.default_rng(1)
+    ids, embeddings, documents, metadatas = make_corpus(rng, per_slug=10)
+
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection("numpy_export_test", metadata={"hnsw:space": "cosine"})
+    collection.add(ids=ids, embeddings=[e.tolist() for e in embeddings], documents=documents, metadatas=metadatas)
+
+    assert export_collection_to_numpy_index(collection, str(tmp_path), page_size=7) == 30
+    query = rng.normal(size=16).tolist()
+    chroma = collection.query(query_embeddings=[query], where={"figure_slug": "richard-iii"}, n_results=3)
+    numpy_results = NumpyFigureIndex(str(tmp_path)).search(query, "richard-iii", top_k=3)
+    assert [r["content"] for r in numpy_results] == chroma["documents"][0]
+    client.delete_collection("numpy_export_test")
@@ -0,0 +1,44 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+
+from backend.vector.embedding_provider import ONNX_MODEL_DIR
+from backend.vector.onnx_encoder import mean_pool_and_normalize
+
+SENTENCES = [
+    "How did you die?",
+    "Who were your children?",
+    "What battles did you fight in?",
+    "Richard III was King of England from 1483 until his death at Bosworth Field.",
+]
+
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    tokens = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    pooled = mean_pool_and_normalize(tokens, mask)
+    assert np.allclose(pooled, [[1.0, 0.0]])
+    assert np.isclose(np.linalg.norm(pooled[0]), 1.0)
+
+
+@pytest.mark.parametrize("quantized,tolerance", [(False, 0.999), (True, 0.98)])
+def test_onnx_matches_torch_vectors(quantized, tolerance):
+    pytest.importorskip("onnxruntime")
+    st = pytest.importorskip("sentence_transformers")
+    model_file = "model-int8.onnx" if quantized else "model.onnx"
+    if not os.path.exists(os.path.join(ONNX_MODEL_DIR, model_file)):
+        pytest.skip("ONNX model not exported; run backend/tools/export_onnx_embedder.py")
+
+    from backend.vector.onnx_encoder import OnnxSentenceEncoder
+
+    reference = st.SentenceTransformer("all-MiniLM-L6-v2").encode(SENTENCES)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    vectors = OnnxSentenceEncoder(ONNX_MODEL_DIR, quantized=quantized).encode(SENTENCES, batch_size=2)
+
+    assert vectors.shape == reference.shape
+    cosines = (vectors * reference).sum(axis=1)
+    assert cosines.min() >= tolerance
@@ -0,0 +1,34 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.vector import embedding_provider
+from backend.vector.embedding_store import EmbeddingStore
+from backend.vector.parallel_embed import IngestProgress, iter_embedded_batches
+
+
+def test_iter_embedded_batches_streams_and_reuses_store(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_get_embeddings(texts, batch_size=64):
+        calls.append(list(texts))
+        return [[float(len(t))] * 384 for t in texts]
+
+    monkeypatch.setattr(embedding_provider, "get_embeddings", fake_get_embeddings)
+    store = EmbeddingStore(str(tmp_path))
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    progress = IngestProgress(len(texts))
+    seen = {}
+    for positions, vectors in iter_embedded_batches(texts, workers=1, batch_size=2, store=store, progress=progress):
+        seen.update(zip(positions, vectors))
+
+    assert calls == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert {i: v[0] for i, v in seen.items()} == {0: 1.0, 1: 2.0, 2: 3.0, 3: 4.0, 4: 5.0}
+    assert progress.done == 5
+
+    calls.clear()
+    batches = list(iter_embedded_batches(texts + ["ffffff"], workers=1, batch_size=10, store=store))
+    assert calls == [["ffffff"]]
+    assert sorted(i for positions, _ in batches for i in positions) == [0, 1, 2, 3, 4, 5]
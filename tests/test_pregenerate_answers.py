@@ -0,0 +1,80 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.answer_cache import SemanticAnswerCache, figure_fingerprint
+from backend.database import Base
+from backend.models import Chat, Thread, User
+from backend.tools.pregenerate_answers import (
+    MockLLM, pregenerate_answers, top_first_turn_questions, write_warm_answers,
+)
+
+
+def make_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat_history.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def add_thread(db, figure_slug, *messages):
+    thread = Thread(user_id=1, title="t", figure_slug=figure_slug)
+    db.add(thread)
+    db.flush()
+    for role, text in messages:
+        db.add(Chat(user_id=1, role=role, message=text, thread_id=thread.id))
+    db.flush()
+
+
+def test_counts_only_the_first_user_question_per_thread(tmp_path):
+    db = make_session(tmp_path)
+    db.add(User(id=1, username="u", hashed_password="x"))
+    for _ in range(3):
+        add_thread(db, "richard-iii", ("user", "How did you die?"), ("assistant", "At Bosworth."),
+                   ("user", "Who were your children?"))
+    add_thread(db, "richard-iii", ("user", "  how did you DIE? "))
+    add_thread(db, "richard-iii", ("user", "Who were your children?"))
+    add_thread(db, "anne-boleyn", ("user", "Why were you executed?"))
+    add_thread(db, "anne-boleyn", ("user", "Why were you executed?"))
+    add_thread(db, None, ("user", "How did you die?"))
+    db.commit()
+
+    popular = top_first_turn_questions(db, per_figure=5, min_count=2)
+
+    assert set(popular) == {"richard-iii", "anne-boleyn"}
+    assert [(q.question, q.count) for q in popular["richard-iii"]] == [("How did you die?", 4)]
+    assert [(q.question, q.count) for q in popular["anne-boleyn"]] == [("Why were you executed?", 2)]
+
+
+def test_pregenerated_answers_are_served_from_the_cache(tmp_path):
+    db = make_session(tmp_path)
+    db.add(User(id=1, username="u", hashed_password="x"))
+    for slug in ("richard-iii", "anne-boleyn", "henry-viii"):
+        for question in ("How did you die?", "Where were you born?"):
+            add_thread(db, slug, ("user", question))
+            add_thread(db, slug, ("user", question))
+    db.commit()
+
+    questions = [q for qs in top_first_turn_questions(db).values() for q in qs]
+    personas = {"richard-iii": "You are Richard III."}
+    llm = MockLLM(delay=0.01)
+    retrieve = lambda question, slug: [{"content": f"{slug} context"}]
+
+    answers = asyncio.run(pregenerate_answers(questions, personas, llm, retrieve, concurrency=2, context_version="v1"))
+
+    assert len(answers) == llm.calls == 6
+    assert llm.max_in_flight == 2
+
+    path = str(tmp_path / "warm_answers.json")
+    write_warm_answers(answers, path)
+    cache = SemanticAnswerCache(enabled=True)
+    assert cache.load_warm_answers(path) == 6
+
+    fingerprint = figure_fingerprint("You are Richard III.", "v1")
+    assert cache.lookup("richard-iii", "how did you die?", fingerprint) == "[mock answer] How did you die?"
+    # A warm set generated under an older persona or context version never matches.
+    assert cache.lookup("richard-iii", "How did you die?", figure_fingerprint("You are Richard III.", "v2")) is None
@@ -0,0 +1,174 @@
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+from backend.tools import rebuild_collection as rebuild_tool
+from backend.vector import chroma_client, context_retriever, embedding_provider, retrieval_cache
+from backend.vector.embedding_store import EmbeddingStore
+from backend.vector.retrieval_cache import bump_context_version
+
+
+def contexts(n, slugs=("richard-iii", "anne-boleyn")):
+    return [SimpleNamespace(id=i, figure_slug=slugs[i % len(slugs)], source_name="wikipedia",
+                            content=f"Fact {i} about the figure.") for i in range(1, n + 1)]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_provider, "get_embeddings",
+                        lambda texts, batch_size=64: [[1.0] + [0.0] * 383 for _ in texts])
+    monkeypatch.setattr(retrieval_cache, "bump_context_version", lambda: "v")
+    store = EmbeddingStore(str(tmp_path / "store"))
+    monkeypatch.setattr("backend.vector.parallel_embed.get_embedding_store", lambda: store)
+    client = chromadb.EphemeralClient()
+    yield client
+    for name in rebuild_tool.list_generations(client):
+        client.delete_collection(name)
+
+
+def test_rebuild_switches_pointer_and_collects_old_generations(client, tmp_path):
+    pointer = str(tmp_path / "active_collection")
+    slugs = ["richard-iii", "anne-boleyn"]
+
+    names = []
+    for _ in range(3):
+        names.append(rebuild_tool.rebuild(contexts(6), slugs, client=client, pointer_path=pointer,
+                                          export_numpy=False, keep=1))
+        time.sleep(0.001)
+
+    assert chroma_client.get_active_collection_name(pointer) == names[-1]
+    assert rebuild_tool.list_generations(client) == names[1:]
+    assert client.get_collection(names[-1]).count() == 6
+
+    assert rebuild_tool.rollback(client, pointer) == names[1]
+    assert chroma_client.get_active_collection_name(pointer) == names[1]
+
+
+def test_invalid_generation_is_dropped_and_live_stays_active(client, tmp_path):
+    pointer = str(tmp_path / "active_collection")
+    live = rebuild_tool.rebuild(contexts(10), ["richard-iii", "anne-boleyn"], client=client,
+                                pointer_path=pointer, export_numpy=False)
+
+    with pytest.raises(rebuild_tool.ValidationError, match="no chunks"):
+        rebuild_tool.rebuild(contexts(10), ["richard-iii", "henry-viii"], client=client,
+                             pointer_path=pointer, export_numpy=False)
+    with pytest.raises(rebuild_tool.ValidationError, match="below the live"):
+        rebuild_tool.rebuild(contexts(4), ["richard-iii"], client=client, pointer_path=pointer,
+                             export_numpy=False, max_shrink=0.2)
+
+    assert chroma_client.get_active_collection_name(pointer) == live
+    assert rebuild_tool.list_generations(client) == [live]
+
+
+def test_server_switches_to_new_generation_in_background(client, tmp_path, monkeypatch):
+    pointer = str(tmp_path / "active_collection")
+    monkeypatch.setattr(chroma_client, "ACTIVE_COLLECTION_FILE", pointer)
+    monkeypatch.setattr(chroma_client, "_client", client)
+    monkeypatch.setattr(chroma_client, "_collection", None)
+    monkeypatch.setattr(chroma_client, "_collection_name", None)
+
+    first = rebuild_tool.rebuild(contexts(4), ["richard-iii"], client=client, pointer_path=pointer,
+                                 export_numpy=False, keep=2)
+    assert chroma_client.get_figure_context_collection().name == first
+
+    second = rebuild_tool.rebuild(contexts(6), ["richard-iii"], client=client, pointer_path=pointer,
+                                  export_numpy=False, keep=2)
+    os.utime(pointer, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    # The old generation keeps serving until the new one has been opened and warmed.
+    assert chroma_client.get_figure_context_collection().name == first
+    deadline = time.time() + 5
+    while chroma_client.get_figure_context_collection().name != second and time.time() < deadline:
+        time.sleep(0.01)
+    assert chroma_client.get_figure_context_collection().name == second
+    chroma_client.reset_figure_context_collection()
+
+
+def test_rollback_is_followed_by_the_next_collection(client, tmp_path):
+    pointer = str(tmp_path / "active_collection")
+    names = []
+    for _ in range(3):
+        names.append(rebuild_tool.rebuild(contexts(6), ["richard-iii"], client=client, pointer_path=pointer,
+                                          export_numpy=False, keep=1))
+        time.sleep(0.001)
+    rebuild_tool.rollback(client, pointer)
+
+    # The generation rolled back from goes first, not the one we rolled back to.
+    latest = rebuild_tool.rebuild(contexts(6), ["richard-iii"], client=client, pointer_path=pointer,
+                                  export_numpy=False, keep=1)
+    assert rebuild_tool.list_generations(client) == [names[1], latest]
+    assert rebuild_tool.rollback(client, pointer) == names[1]
+
+
+def test_missing_generation_keeps_current_collection(client, tmp_path, monkeypatch):
+    pointer = str(tmp_path / "active_collection")
+    monkeypatch.setattr(chroma_client, "ACTIVE_COLLECTION_FILE", pointer)
+    monkeypatch.setattr(chroma_client, "_client", client)
+    monkeypatch.setattr(chroma_client, "_collection", None)
+    monkeypatch.setattr(chroma_client, "_collection_name", None)
+    live = rebuild_tool.rebuild(contexts(4), ["richard-iii"], client=client, pointer_path=pointer,
+                                export_numpy=False)
+    assert chroma_client.get_figure_context_collection().name == live
+
+    threads = []
+    real_thread = chroma_client.threading.Thread
+
+    def recording_thread(*args, **kwargs):
+        thread = real_thread(*args, **kwargs)
+        threads.append(thread)
+        return thread
+    monkeypatch.setattr(chroma_client.threading, "Thread", recording_thread)
+
+    chroma_client.set_active_collection(f"{rebuild_tool.GENERATION_PREFIX}missing", pointer)
+    os.utime(pointer, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert chroma_client.get_figure_context_collection().name == live
+    threads[0].join(5)
+    for _ in range(3):
+        assert chroma_client.get_figure_context_collection().name == live
+    # The failed switch is not retried on every query, and nothing was created.
+    assert len(threads) == 1
+    assert f"{rebuild_tool.GENERATION_PREFIX}missing" not in rebuild_tool.list_generations(client)
+    chroma_client.reset_figure_context_collection()
+
+
+def test_search_returns_new_generation_after_switch(client, tmp_path, monkeypatch):
+    pointer = str(tmp_path / "active_collection")
+    stamp = str(tmp_path / "context_version")
+    monkeypatch.setattr(chroma_client, "ACTIVE_COLLECTION_FILE", pointer)
+    monkeypatch.setattr(chroma_client, "_client", client)
+    monkeypatch.setattr(chroma_client, "_collection", None)
+    monkeypatch.setattr(chroma_client, "_collection_name", None)
+    monkeypatch.setattr(retrieval_cache, "bump_context_version", lambda: bump_context_version(stamp))
+    cache = retrieval_cache.RetrievalCache(max_entries=10, ttl_seconds=60,
+                                           version=retrieval_cache.ContextVersion(stamp))
+    monkeypatch.setattr(context_retriever, "retrieval_cache", cache)
+    monkeypatch.setattr(context_retriever, "RETRIEVAL_ENGINE", "chroma")
+
+    def generation(text):
+        return [SimpleNamespace(id=1, figure_slug="richard-iii", source_name="wikipedia", content=text)]
+
+    def search():
+        return context_retriever.search_figure_context("Where did you die?", "richard-iii", top_k=1,
+                                                       query_embedding=[1.0] + [0.0] * 383, mode="dense")
+
+    rebuild_tool.rebuild(generation("Old text about Bosworth."), ["richard-iii"], client=client,
+                         pointer_path=pointer, export_numpy=False, keep=2)
+    assert search()[0]["content"] == "Old text about Bosworth."
+
+    second = rebuild_tool.rebuild(generation("New text about Bosworth."), ["richard-iii"], client=client,
+                                  pointer_path=pointer, export_numpy=False, keep=2)
+    os.utime(pointer, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    # Queried while the new generation warms: still the old text, cached for the old generation only.
+    assert search()[0]["content"] == "Old text about Bosworth."
+    deadline = time.time() + 5
+    while chroma_client.served_collection_name() != second and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert search()[0]["content"] == "New text about Bosworth."
+    chroma_client.reset_figure_context_collection()
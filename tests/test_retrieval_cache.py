@@ -0,0 +1,94 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.vector import context_retriever
+from backend.vector.retrieval_cache import ContextVersion, RetrievalCache, bump_context_version
+
+
+def test_cache_is_invalidated_by_new_content_version(tmp_path):
+    stamp = str(tmp_path / "context_version")
+    cache = RetrievalCache(max_entries=10, ttl_seconds=60, version=ContextVersion(stamp))
+    key = cache.key("chroma", "richard-iii", 5, "How did you die?")
+
+    cache.put(key, [{"content": "Bosworth", "metadata": {}}])
+    assert cache.get(cache.key("chroma", "richard-iii", 5, "  how did YOU die? ")) is not None
+
+    bump_context_version(stamp)
+    assert cache.get(key) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_cache_key_separates_figure_and_top_k(tmp_path):
+    cache = RetrievalCache(max_entries=10, ttl_seconds=60, version=ContextVersion(str(tmp_path / "v")))
+    cache.put(cache.key("chroma", "richard-iii", 5, "q"), [{"content": "a"}])
+    assert cache.get(cache.key("chroma", "anne-boleyn", 5, "q")) is None
+    assert cache.get(cache.key("chroma", "richard-iii", 3, "q")) is None
+
+
+def test_repeat_question_skips_embedding_and_search(tmp_path, monkeypatch):
+    cache = RetrievalCache(max_entries=10, ttl_seconds=60, version=ContextVersion(str(tmp_path / "v")))
+    monkeypatch.setattr(context_retriever, "retrieval_cache", cache)
+    calls = {"embed": 0, "search": 0}
+
+    async def fake_embed(query):
+        calls["embed"] += 1
+        return [1.0]
+
+    def fake_search(query_embedding, figure_slug, top_k=5, include_embeddings=False):
+        calls["search"] += 1
+        return [{"content": "doc", "metadata": {"figure_slug": figure_slug}}]
+
+    monkeypatch.setattr(context_retriever.embedding_batcher, "embed", fake_embed)
+    monkeypatch.setattr(context_retriever, "search_by_embedding", fake_search)
+
+    async def ask_twice():
+        await context_retriever.search_figure_context_async("Who were your children?", "richard-iii")
+        return await context_retriever.search_figure_context_async("who were your children?", "richard-iii")
+
+    assert asyncio.run(ask_twice())[0]["content"] == "doc"
+    assert calls == {"embed": 1, "search": 1}
+    assert context_retriever.search_figure_context("Who were your children?", "richard-iii")[0]["content"] == "doc"
+    assert calls == {"embed": 1, "search": 1}
+
+
+def test_cached_results_hold_no_embeddings(tmp_path, monkeypatch):
+    import numpy as np
+
+    cache = RetrievalCache(max_entries=10, ttl_seconds=60, version=ContextVersion(str(tmp_path / "v")))
+    monkeypatch.setattr(context_retriever, "retrieval_cache", cache)
+    vectors = {"7-0": np.array([1.0, 0.0], dtype=np.float32), "7-1": np.array([0.0, 1.0], dtype=np.float32)}
+    fetched = []
+
+    async def fake_embed(query):
+        return [1.0, 0.0]
+
+    def fake_search(query_embedding, figure_slug, top_k=5, include_embeddings=False):
+        return [{"content": f"chunk {i}", "metadata": {"context_id": 7, "chunk_index": i}, "distance": 0.1,
+                 **({"embedding": vectors[f"7-{i}"]} if include_embeddings else {})} for i in range(2)]
+
+    def fake_fetch(ids):
+        fetched.append(list(ids))
+        return {id_: vectors[id_] for id_ in ids}
+
+    monkeypatch.setattr(context_retriever.embedding_batcher, "embed", fake_embed)
+    monkeypatch.setattr(context_retriever, "search_by_embedding", fake_search)
+    monkeypatch.setattr(context_retriever, "fetch_embeddings", fake_fetch)
+
+    async def ask_twice():
+        first = await context_retriever.search_figure_context_async("q", "richard-iii", include_embeddings=True)
+        second = await context_retriever.search_figure_context_async("q", "richard-iii", include_embeddings=True)
+        return first, second
+
+    first, second = asyncio.run(ask_twice())
+
+    assert all("embedding" not in r for r in cache.get(context_retriever._cache_key("q", "richard-iii", 5, "dense")))
+    assert fetched == [["7-0", "7-1"]]  # only the cache hit looks vectors up
+    for results in (first, second):
+        assert [r["embedding"].dtype for r in results] == [np.float32, np.float32]
+        assert np.array_equal(results[1]["embedding"], vectors["7-1"])
+    # Plain searches share the same cache entry and never fetch vectors.
+    assert "embedding" not in context_retriever.search_figure_context("q", "richard-iii")[0]
+    assert len(fetched) == 1
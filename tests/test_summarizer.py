@@ -0,0 +1,102 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, schemas, summarizer
+from backend.database import Base
+from backend.llm_client import create_openai_client
+from backend.tools.fake_openai_server import create_app
+
+
+@pytest.fixture
+def thread(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://fake/v1")
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(summarizer, "SessionLocal", Session)
+    db = Session()
+    user = crud.create_user(db, schemas.UserCreate(username="visitor", hashed_password="x"))
+    thread = crud.create_thread(db, schemas.ThreadCreate(user_id=user.id, title="t"))
+    yield db, thread
+    db.close()
+
+
+def add_turns(db, thread, start, count):
+    for i in range(start, start + count):
+        for role in ("user", "assistant"):
+            crud.create_chat_message(db, schemas.ChatMessageCreate(
+                user_id=thread.user_id, role=role, message=f"{role} message {i} " + "word " * 40,
+                thread_id=thread.id
+            ))
+
+
+def fake_client(reply):
+    fake = create_app(reply=reply, token_delay=0)
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake), base_url="http://fake")
+    return fake, create_openai_client(http_client)
+
+
+def test_short_thread_is_left_alone(thread):
+    db, thread = thread
+    add_turns(db, thread, 0, 2)
+    fake, client = fake_client("unused")
+
+    assert asyncio.run(summarizer.summarize_thread(db, thread.id, client, trigger_tokens=10_000)) is None
+    assert fake.state.requests == []
+    assert len(summarizer.conversation_history(db, thread.id)) == 4
+
+
+def test_rolling_summary_bounds_history(thread):
+    db, thread = thread
+    add_turns(db, thread, 0, 6)
+    fake, client = fake_client("They discussed Bosworth.")
+
+    stored = asyncio.run(summarizer.summarize_thread(db, thread.id, client, trigger_tokens=100, keep_messages=4))
+
+    assert stored.role == "summary"
+    messages = crud.get_messages_by_thread(db, thread.id)
+    assert stored.summary_of == messages[7].id
+    assert "user message 0" in fake.state.requests[0]["messages"][1]["content"]
+    history = summarizer.conversation_history(db, thread.id)
+    assert history[0] == {"role": "system", "content": "Summary of the earlier conversation:\nThey discussed Bosworth."}
+    assert [h["content"] for h in history[1:]] == [m.message for m in messages[8:]]
+    # Summary rows never show up as conversation messages.
+    assert all(m.role != "summary" for m in messages)
+
+    # The next summary folds the previous one together with the newer messages only.
+    add_turns(db, thread, 6, 4)
+    fake, client = fake_client("They discussed Bosworth and the princes.")
+    second = asyncio.run(summarizer.summarize_thread(db, thread.id, client, trigger_tokens=100, keep_messages=4))
+
+    prompt = fake.state.requests[0]["messages"][1]["content"]
+    assert "They discussed Bosworth." in prompt
+    assert "user message 3 " not in prompt and "user message 4 " in prompt
+    assert crud.get_latest_summary(db, thread.id).id == second.id
+    assert len(summarizer.conversation_history(db, thread.id)) == 5
+
+
+def test_background_summary_swallows_api_errors(thread, monkeypatch):
+    db, thread = thread
+    add_turns(db, thread, 0, 20)
+    calls = []
+
+    async def failing(*args, **kwargs):
+        calls.append(kwargs)
+        raise httpx.ConnectError("down")
+    client = create_openai_client()
+    monkeypatch.setattr(client.chat.completions, "create", failing)
+
+    asyncio.run(summarizer.summarize_in_background(thread.id, client))
+
+    assert len(calls) == 1
+    assert crud.get_latest_summary(db, thread.id) is None
+    assert summarizer._in_progress == set()
@@ -0,0 +1,67 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import token_budget
+from backend.token_budget import count_message_tokens, count_tokens, prompt_budget, trim_messages, truncate_text
+
+TEXT = "Richard III was King of England from 1483 until his death at Bosworth in 1485. " * 20
+
+
+def test_counts_and_message_overhead():
+    assert count_tokens("") == 0
+    assert count_tokens(TEXT) >= len(TEXT.split())
+    messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": TEXT}]
+    assert count_message_tokens(messages) == (
+        count_tokens("Be brief.") + count_tokens(TEXT)
+        + 2 * token_budget.MESSAGE_OVERHEAD_TOKENS + token_budget.REPLY_PRIMING_TOKENS
+    )
+
+
+def test_truncate_text_fits_budget():
+    cut = truncate_text(TEXT, 25)
+    assert 20 <= count_tokens(cut) <= 25
+    assert TEXT.startswith(cut)
+    assert truncate_text("short", 25) == "short"
+    assert truncate_text(TEXT, 0) == ""
+
+
+def test_prompt_budget_respects_small_context_windows(monkeypatch):
+    monkeypatch.setattr(token_budget, "PROMPT_TOKEN_BUDGET", 6000)
+    assert prompt_budget("gpt-4o") == 6000
+    assert prompt_budget("gpt-4", budget=20_000) == 8192 - token_budget.COMPLETION_TOKEN_RESERVE
+    assert prompt_budget("gpt-4", budget=100) == 100
+
+
+def test_trim_drops_oldest_history_then_shortens_context():
+    messages = [
+        {"role": "system", "content": "You are Richard III."},
+        {"role": "system", "content": "Relevant historical context:\n" + TEXT},
+        {"role": "user", "content": "first " + TEXT},
+        {"role": "assistant", "content": "second " + TEXT},
+        {"role": "user", "content": "And Bosworth?"},
+    ]
+    assert trim_messages(messages, 100_000) == messages
+
+    trimmed = trim_messages(messages, count_message_tokens(messages) - count_tokens("first " + TEXT))
+    assert [m["content"].split()[0] for m in trimmed] == ["You", "Relevant", "second", "And"]
+
+    tight = trim_messages(messages, 200)
+    assert [m["role"] for m in tight] == ["system", "system", "user"]
+    assert tight[0] == messages[0] and tight[-1] == messages[-1]
+    assert count_message_tokens(tight) <= 200
+    assert messages[1]["content"].endswith(TEXT)  # the caller's list is left untouched
+
+
+def test_unloadable_encoding_falls_back_to_estimate(monkeypatch):
+    def offline(*args):
+        raise ConnectionError("could not download o200k_base")
+    monkeypatch.setitem(sys.modules, "tiktoken", type(sys)("tiktoken"))
+    monkeypatch.setattr(sys.modules["tiktoken"], "encoding_for_model", offline, raising=False)
+    token_budget._encoding.cache_clear()
+    try:
+        assert not token_budget.tokenizer_available()
+        assert count_tokens(TEXT) >= len(TEXT.split())
+    finally:
+        token_budget._encoding.cache_clear()